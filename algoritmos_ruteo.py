@@ -0,0 +1,730 @@
+"""
+Algoritmos de construcción de rutas sobre arreglos de NumPy
+
+Las funciones trabajan con índices de cliente (posiciones en los arreglos
+de entrada) y devuelven listas de rutas, cada una como lista de índices en
+orden de visita. AnalizadorRutas se encarga de convertirlas al formato de
+diccionarios que usan los mapas y reportes.
+"""
+
+import os
+import time
+import heapq
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from distancias import distancia_km, distancias_desde
+from indice_espacial import IndiceEspacial
+
+
+def pares_vecinos(lats, lons, vecinos=30, limite_completo=400):
+    """
+    Pares de clientes (i < j) candidatos a compartir ruta
+
+    Con pocos clientes se devuelven todos los pares; con más, solo los pares
+    entre cada cliente y sus `vecinos` más cercanos, que son los únicos con
+    ahorros relevantes.
+
+    Returns:
+        tuple: (arreglo i, arreglo j)
+    """
+    n = len(lats)
+    if n <= limite_completo:
+        return np.triu_indices(n, k=1)
+
+    # Celdas con tantos puntos como vecinos pedidos: casi siempre bastan las 3×3 más cercanas
+    indice = IndiceEspacial(lats, lons, clientes_por_celda=vecinos)
+    cercanos, _ = indice.k_vecinos_todos(vecinos)
+    origen = np.repeat(np.arange(n), cercanos.shape[1])
+    destino = cercanos.ravel()
+    # Cada par una sola vez, codificado como i * n + j con i < j
+    claves = np.unique(np.minimum(origen, destino) * n + np.maximum(origen, destino))
+    return claves // n, claves % n
+
+
+def rutas_por_ahorros(lats, lons, cajas, lat_centro, lon_centro, max_clientes, max_cajas,
+                      vecinos=30, metodo='haversine'):
+    """
+    Construye rutas con el algoritmo de ahorros de Clarke-Wright (versión paralela)
+
+    Cada cliente empieza en su propia ruta. Unir dos rutas por sus extremos
+    i y j ahorra s(i, j) = d(0, i) + d(0, j) - d(i, j) km; los pares se
+    recorren de mayor a menor ahorro y se unen mientras ambos clientes sean
+    extremos de rutas distintas y la ruta unida respete los límites.
+
+    Los ahorros se calculan vectorizados para todos los pares candidatos y se
+    ordenan una sola vez: como no cambian durante las uniones, el orden es el
+    mismo que daría una cola de prioridad.
+
+    Args:
+        lats, lons: Coordenadas de los clientes
+        cajas: Cajas equivalentes de cada cliente
+        lat_centro, lon_centro: Coordenadas del centro de distribución
+        max_clientes: Máximo de clientes por ruta
+        max_cajas: Máximo de cajas por ruta
+        vecinos: Vecinos por cliente considerados cuando hay muchos clientes
+        metodo: Método de distancia (ver distancias.py)
+
+    Returns:
+        list: Rutas como listas de índices en orden de visita
+    """
+    lats = np.asarray(lats, dtype='float64')
+    lons = np.asarray(lons, dtype='float64')
+    cajas = np.asarray(cajas, dtype='float64')
+    n = len(lats)
+    if n == 0:
+        return []
+
+    # Ahorros de todos los pares candidatos, en una sola operación
+    d0 = distancias_desde(lat_centro, lon_centro, lats, lons, metodo)
+    i, j = pares_vecinos(lats, lons, vecinos)
+    ahorros = d0[i] + d0[j] - distancia_km(lats[i], lons[i], lats[j], lons[j], metodo)
+    positivos = ahorros > 0
+    i, j, ahorros = i[positivos], j[positivos], ahorros[positivos]
+    orden = np.argsort(-ahorros, kind='stable')
+
+    # Estado de las rutas: cada cliente empieza solo
+    ruta_de = np.arange(n)
+    rutas = {r: [r] for r in range(n)}
+    cajas_ruta = {r: cajas[r] for r in range(n)}
+
+    for a, b in zip(i[orden].tolist(), j[orden].tolist()):
+        ra, rb = ruta_de[a], ruta_de[b]
+        if ra == rb:
+            continue
+        ruta_a, ruta_b = rutas[ra], rutas[rb]
+        if len(ruta_a) + len(ruta_b) > max_clientes or cajas_ruta[ra] + cajas_ruta[rb] > max_cajas:
+            continue
+
+        # Solo se unen clientes que están en un extremo de su ruta
+        if ruta_a[-1] == a:
+            izquierda = ruta_a
+        elif ruta_a[0] == a:
+            izquierda = ruta_a[::-1]
+        else:
+            continue
+        if ruta_b[0] == b:
+            derecha = ruta_b
+        elif ruta_b[-1] == b:
+            derecha = ruta_b[::-1]
+        else:
+            continue
+
+        unida = izquierda + derecha
+        rutas[ra] = unida
+        cajas_ruta[ra] += cajas_ruta[rb]
+        ruta_de[derecha] = ra
+        del rutas[rb], cajas_ruta[rb]
+
+    return list(rutas.values())
+
+
+def distancia_rutas(rutas, lats, lons, lat_centro, lon_centro, metodo='haversine'):
+    """
+    Distancia (km) de cada ruta: centro -> clientes en orden de visita -> centro
+
+    Todas las rutas se evalúan en una sola llamada vectorizada, intercalando el
+    centro entre ellas.
+
+    Returns:
+        np.ndarray: Distancia de cada ruta
+    """
+    if not rutas:
+        return np.empty(0)
+    lats = np.asarray(lats, dtype='float64')
+    lons = np.asarray(lons, dtype='float64')
+    largos = np.array([len(ruta) for ruta in rutas])
+    # Secuencia centro, ruta 1, centro, ruta 2, ..., centro (el centro se marca con -1)
+    secuencia = np.full(largos.sum() + len(rutas) + 1, -1, dtype=np.int64)
+    inicios = np.cumsum(np.r_[0, largos[:-1] + 1]) + 1
+    for inicio, ruta in zip(inicios, rutas):
+        secuencia[inicio:inicio + len(ruta)] = ruta
+    es_centro = secuencia < 0
+    lat_s = np.where(es_centro, lat_centro, lats[secuencia])
+    lon_s = np.where(es_centro, lon_centro, lons[secuencia])
+    tramos = distancia_km(lat_s[:-1], lon_s[:-1], lat_s[1:], lon_s[1:], metodo)
+    return np.add.reduceat(tramos, inicios - 1)
+
+
+def angulos_polares(lats, lons, lat_centro, lon_centro):
+    """Ángulo (grados, 0-360, antihorario desde el este) de cada cliente visto desde el centro"""
+    x = (np.asarray(lons, dtype='float64') - lon_centro) * np.cos(np.radians(lat_centro))
+    y = np.asarray(lats, dtype='float64') - lat_centro
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def cortar_secuencia(orden, cajas, max_clientes, max_cajas):
+    """
+    Corta una secuencia de clientes en rutas consecutivas que respetan los límites
+
+    Cada ruta toma clientes de la secuencia mientras no supere el máximo de
+    clientes ni el de cajas; el punto de corte por cajas se busca sobre la suma
+    acumulada, por lo que el costo depende del número de rutas y no de clientes.
+    Un cliente que por sí solo supera el máximo de cajas forma su propia ruta.
+
+    Returns:
+        list: Rutas como listas de índices
+    """
+    acumulado = np.cumsum(np.asarray(cajas, dtype='float64')[orden])
+    rutas = []
+    inicio = 0
+    n = len(orden)
+    while inicio < n:
+        base = acumulado[inicio - 1] if inicio else 0.0
+        fin = int(np.searchsorted(acumulado, base + max_cajas, side='right'))
+        fin = max(min(fin, inicio + max_clientes, n), inicio + 1)
+        rutas.append(orden[inicio:fin].tolist())
+        inicio = fin
+    return rutas
+
+
+def rutas_por_barrido(lats, lons, cajas, lat_centro, lon_centro, max_clientes, max_cajas, angulo_inicial=0.0):
+    """
+    Construye rutas con el algoritmo de barrido (sweep) alrededor del centro
+
+    Los clientes se ordenan por ángulo polar a partir de `angulo_inicial` (y
+    por distancia al centro dentro del mismo ángulo) y la secuencia se corta en
+    rutas con los límites de clientes y cajas. Cuesta O(n log n).
+
+    Args:
+        angulo_inicial: Ángulo (grados) donde empieza el barrido
+
+    Returns:
+        list: Rutas como listas de índices en orden de barrido
+    """
+    angulos = (angulos_polares(lats, lons, lat_centro, lon_centro) - angulo_inicial) % 360.0
+    radios = np.hypot(np.asarray(lats, dtype='float64') - lat_centro, np.asarray(lons, dtype='float64') - lon_centro)
+    orden = np.lexsort((radios, angulos))
+    return cortar_secuencia(orden, cajas, max_clientes, max_cajas)
+
+
+def limitar_rutas(rutas, cajas, rutas_disponibles=None):
+    """
+    Ordena las rutas de mayor a menor volumen y conserva las disponibles
+
+    Returns:
+        tuple: (rutas conservadas, volumen de cada una, rutas descartadas)
+    """
+    volumenes = np.array([float(np.sum(cajas[ruta])) for ruta in rutas])
+    orden = np.argsort(-volumenes, kind='stable')
+    if rutas_disponibles:
+        descartadas = [rutas[r] for r in orden[rutas_disponibles:]]
+        orden = orden[:rutas_disponibles]
+    else:
+        descartadas = []
+    return [rutas[r] for r in orden], volumenes[orden], descartadas
+
+
+def asignar_dias(cajas, rutas_por_dia, max_clientes, max_cajas, preferidos=None):
+    """
+    Reparte los clientes entre los días y entre las rutas de cada día
+
+    Empaquetado por peor ajuste decreciente con montículos: los clientes se
+    toman de mayor a menor volumen y cada uno va a su día preferido si cabe
+    en él, o si no al día con menor carga relativa a sus rutas disponibles
+    donde quepa; dentro del día va a la ruta con menos cajas, o a una ruta
+    nueva si en ninguna queda espacio y el día todavía tiene rutas
+    disponibles. Así las cajas quedan balanceadas entre los días y ningún día
+    usa más rutas de las que tiene. El costo es O(n log n) para n clientes.
+
+    Args:
+        cajas: Cajas de cada cliente
+        rutas_por_dia: Rutas disponibles en cada día (None = sin límite, 0 = no se trabaja)
+        max_clientes: Máximo de clientes por ruta
+        max_cajas: Máximo de cajas por ruta
+        preferidos: Posición del día preferido de cada cliente (-1 = sin preferencia)
+
+    Returns:
+        tuple: (rutas de cada día como listas de índices, índices de los clientes que no caben)
+    """
+    cajas = np.asarray(cajas, dtype='float64')
+    # Peso de cada día en el balance: sus rutas disponibles (los días sin límite pesan como el mayor)
+    limitados = [rutas for rutas in rutas_por_dia if rutas is not None]
+    pesos = [rutas if rutas is not None else max(limitados, default=1) or 1 for rutas in rutas_por_dia]
+
+    rutas_dia = [[] for _ in rutas_por_dia]
+    abiertas = [[] for _ in rutas_por_dia]  # Por día, montículo (cajas, ruta) de las rutas con espacio
+    cargas = [0.0] * len(rutas_por_dia)
+    dias = [(0.0, dia) for dia, rutas in enumerate(rutas_por_dia) if rutas != 0]  # (carga relativa, día)
+    heapq.heapify(dias)
+    sin_asignar = []
+
+    def colocar(dia, cliente, volumen):
+        """Agrega el cliente a una ruta del día si cabe; devuelve False si no"""
+        monticulo = abiertas[dia]
+        # Las rutas que ya tienen el máximo de clientes no reciben más
+        while monticulo and len(rutas_dia[dia][monticulo[0][1]]) >= max_clientes:
+            heapq.heappop(monticulo)
+        if monticulo and monticulo[0][0] + volumen <= max_cajas:
+            cajas_ruta, ruta = heapq.heappop(monticulo)
+            rutas_dia[dia][ruta].append(cliente)
+            heapq.heappush(monticulo, (cajas_ruta + volumen, ruta))
+        elif rutas_por_dia[dia] is None or len(rutas_dia[dia]) < rutas_por_dia[dia]:
+            rutas_dia[dia].append([cliente])
+            heapq.heappush(monticulo, (volumen, len(rutas_dia[dia]) - 1))
+        else:
+            return False
+        cargas[dia] += volumen
+        heapq.heappush(dias, (cargas[dia] / pesos[dia], dia))
+        return True
+
+    for cliente in np.argsort(-cajas, kind='stable').tolist():
+        volumen = cajas[cliente]
+        preferido = int(preferidos[cliente]) if preferidos is not None else -1
+        if preferido >= 0 and rutas_por_dia[preferido] != 0 and colocar(preferido, cliente, volumen):
+            continue
+        probados = []
+        while dias:
+            carga, dia = heapq.heappop(dias)
+            if carga != cargas[dia] / pesos[dia]:
+                continue  # Entrada vieja: el día ya tiene otra con su carga actual
+            if colocar(dia, cliente, volumen):
+                break
+            probados.append((carga, dia))
+        else:
+            sin_asignar.append(cliente)
+        for entrada in probados:
+            heapq.heappush(dias, entrada)
+
+    return rutas_dia, sin_asignar
+
+
+def mejorar_entre_rutas(rutas, matriz, filas, d0, cajas, vecinos, max_clientes, max_cajas,
+                        max_iteraciones=50, tiempo_limite=10.0):
+    """
+    Mejora un conjunto de rutas con búsqueda local entre rutas
+
+    Aplica tres movimientos entre paradas de rutas distintas, siempre que
+    reduzcan la distancia total y respeten los límites de clientes y cajas:
+
+    - relocate: mueve una parada u junto a una parada v de otra ruta
+    - swap: intercambia u y v entre sus rutas
+    - 2-opt*: une el inicio de la ruta de u con el final de la ruta de v
+      (arista u -> v) y el inicio de la ruta de v con el final de la de u
+
+    Solo se prueban pares (u, v) donde v es uno de los vecinos más cercanos de
+    u, y cada movimiento se evalúa con su diferencia de costo (las pocas
+    aristas que cambian), por lo que cada pasada es casi lineal. Se aplica la
+    primera mejora encontrada y se repiten pasadas hasta que ninguna mejora o
+    se agota el presupuesto de pasadas o de tiempo.
+
+    Args:
+        rutas: Rutas como listas de índices de parada
+        matriz: Matriz de distancias (km) indexable como matriz[fila_a, fila_b]
+        filas: Fila de la matriz de cada parada
+        d0: Distancia (km) del centro a cada parada
+        cajas: Cajas de cada parada
+        vecinos: Arreglo m×k con las paradas vecinas de cada parada (-1 = ninguna)
+        max_clientes: Máximo de paradas por ruta
+        max_cajas: Máximo de cajas por ruta
+        max_iteraciones: Máximo de pasadas completas sobre las paradas
+        tiempo_limite: Segundos máximos de búsqueda
+
+    Returns:
+        tuple: (rutas mejoradas sin rutas vacías, diccionario con estadísticas)
+    """
+    inicio = time.perf_counter()
+    filas = np.asarray(filas).tolist()
+    d0 = np.asarray(d0, dtype='float64').tolist()
+    cajas = np.asarray(cajas, dtype='float64').tolist()
+    vecinos = np.asarray(vecinos).tolist()
+    rutas = [list(ruta) for ruta in rutas]
+    tolerancia = 1e-6
+
+    def d(a, b):
+        """Distancia entre paradas; -1 representa el centro"""
+        if a < 0:
+            return d0[b] if b >= 0 else 0.0
+        if b < 0:
+            return d0[a]
+        return float(matriz[filas[a], filas[b]])
+
+    def costo_ruta(ruta):
+        if not ruta:
+            return 0.0
+        return d0[ruta[0]] + sum(d(a, b) for a, b in zip(ruta, ruta[1:])) + d0[ruta[-1]]
+
+    m = len(d0)
+    ruta_de = [-1] * m
+    posicion = [0] * m
+    acumulado = [None] * len(rutas)
+
+    def reindexar(r):
+        total = 0.0
+        suma = []
+        for p, parada in enumerate(rutas[r]):
+            ruta_de[parada] = r
+            posicion[parada] = p
+            total += cajas[parada]
+            suma.append(total)
+        acumulado[r] = suma
+
+    def carga(r):
+        return acumulado[r][-1] if acumulado[r] else 0.0
+
+    for r in range(len(rutas)):
+        reindexar(r)
+
+    def anterior(s):
+        p = posicion[s]
+        return rutas[ruta_de[s]][p - 1] if p > 0 else -1
+
+    def siguiente(s):
+        ruta = rutas[ruta_de[s]]
+        p = posicion[s]
+        return ruta[p + 1] if p + 1 < len(ruta) else -1
+
+    def relocate(u, v):
+        ru, rv = ruta_de[u], ruta_de[v]
+        if len(rutas[rv]) + 1 > max_clientes or carga(rv) + cajas[u] > max_cajas:
+            return False
+        pu, nu = anterior(u), siguiente(u)
+        pv, nv = anterior(v), siguiente(v)
+        retiro = d(pu, u) + d(u, nu) - d(pu, nu)
+        despues = d(v, u) + d(u, nv) - d(v, nv)
+        antes = d(pv, u) + d(u, v) - d(pv, v)
+        if min(despues, antes) - retiro >= -tolerancia:
+            return False
+        rutas[ru].pop(posicion[u])
+        rutas[rv].insert(posicion[v] + (1 if despues <= antes else 0), u)
+        reindexar(ru)
+        reindexar(rv)
+        return True
+
+    def swap(u, v):
+        ru, rv = ruta_de[u], ruta_de[v]
+        if (carga(ru) - cajas[u] + cajas[v] > max_cajas or
+                carga(rv) - cajas[v] + cajas[u] > max_cajas):
+            return False
+        pu, nu = anterior(u), siguiente(u)
+        pv, nv = anterior(v), siguiente(v)
+        delta = (d(pu, v) + d(v, nu) - d(pu, u) - d(u, nu) +
+                 d(pv, u) + d(u, nv) - d(pv, v) - d(v, nv))
+        if delta >= -tolerancia:
+            return False
+        rutas[ru][posicion[u]], rutas[rv][posicion[v]] = v, u
+        reindexar(ru)
+        reindexar(rv)
+        return True
+
+    def dos_opt_estrella(u, v):
+        ru, rv = ruta_de[u], ruta_de[v]
+        a, b = rutas[ru], rutas[rv]
+        i, j = posicion[u], posicion[v]
+        # Nuevas rutas: a[:i+1] + b[j:] y b[:j] + a[i+1:]
+        if i + 1 + len(b) - j > max_clientes or j + len(a) - i - 1 > max_clientes:
+            return False
+        prefijo_a = acumulado[ru][i]
+        prefijo_b = acumulado[rv][j - 1] if j > 0 else 0.0
+        if (prefijo_a + carga(rv) - prefijo_b > max_cajas or
+                prefijo_b + carga(ru) - prefijo_a > max_cajas):
+            return False
+        nu, pv = siguiente(u), anterior(v)
+        delta = d(u, v) + d(pv, nu) - d(u, nu) - d(pv, v)
+        if delta >= -tolerancia:
+            return False
+        rutas[ru], rutas[rv] = a[:i + 1] + b[j:], b[:j] + a[i + 1:]
+        reindexar(ru)
+        reindexar(rv)
+        return True
+
+    movimientos_disponibles = (('relocate', relocate), ('swap', swap), ('2-opt*', dos_opt_estrella))
+    movimientos = {nombre: 0 for nombre, _ in movimientos_disponibles}
+    distancia_inicial = sum(costo_ruta(ruta) for ruta in rutas)
+
+    iteraciones = 0
+    agotado = False
+    mejoro = True
+    while mejoro and iteraciones < max_iteraciones and not agotado:
+        mejoro = False
+        iteraciones += 1
+        for u in range(m):
+            if ruta_de[u] < 0:
+                continue
+            if time.perf_counter() - inicio > tiempo_limite:
+                agotado = True
+                break
+            for v in vecinos[u]:
+                if v < 0 or ruta_de[v] < 0 or ruta_de[v] == ruta_de[u]:
+                    continue
+                aplicado = next((nombre for nombre, movimiento in movimientos_disponibles if movimiento(u, v)), None)
+                if aplicado:
+                    movimientos[aplicado] += 1
+                    mejoro = True
+                    break
+
+    rutas = [ruta for ruta in rutas if ruta]
+    distancia_final = sum(costo_ruta(ruta) for ruta in rutas)
+    return rutas, {
+        'distancia_inicial': distancia_inicial,
+        'distancia_final': distancia_final,
+        'iteraciones': iteraciones,
+        'movimientos': movimientos,
+        'tiempo': time.perf_counter() - inicio,
+        'tiempo_agotado': agotado,
+    }
+
+
+def _matriz_con_centro(lats, lons, lat_centro, lon_centro, metodo, dtype='float64', tam_bloque=None):
+    """
+    Matriz de distancias (n+1)×(n+1) de una ruta, con el centro en la posición 0
+
+    Con tam_bloque la matriz se llena por bloques de filas, de modo que los
+    temporales en float64 del cálculo ocupan tam_bloque×(n+1) y no (n+1)²
+    (ver matriz_distancias.AlmacenMatrizDistancias._calcular_filas).
+    """
+    lat_p = np.r_[lat_centro, np.asarray(lats, dtype='float64')]
+    lon_p = np.r_[lon_centro, np.asarray(lons, dtype='float64')]
+    if tam_bloque is None:
+        return distancia_km(lat_p[:, None], lon_p[:, None], lat_p[None, :], lon_p[None, :], metodo).astype(dtype, copy=False)
+    matriz = np.empty((len(lat_p), len(lat_p)), dtype=dtype)
+    for inicio in range(0, len(lat_p), tam_bloque):
+        bloque = slice(inicio, inicio + tam_bloque)
+        matriz[bloque] = distancia_km(lat_p[bloque, None], lon_p[bloque, None], lat_p[None, :], lon_p[None, :], metodo)
+    return matriz
+
+
+def _mejor_dos_opt(recorrido, matriz):
+    """Mejor movimiento 2-opt del recorrido: (delta, i, j) invirtiendo recorrido[i+1:j+1]"""
+    a, b = recorrido[:-1], recorrido[1:]
+    aristas = matriz[a, b]
+    delta = matriz[a[:, None], a[None, :]] + matriz[b[:, None], b[None, :]] - aristas[:, None] - aristas[None, :]
+    delta[np.tril_indices(len(a), k=1)] = np.inf
+    i, j = np.unravel_index(np.argmin(delta), delta.shape)
+    return delta[i, j], i, j
+
+
+def _mejor_or_opt(recorrido, matriz, largo):
+    """
+    Mejor movimiento Or-opt de segmentos de `largo` paradas
+
+    Returns:
+        tuple: (delta, inicio del segmento, arista destino k, invertido)
+    """
+    n = len(recorrido) - 2  # paradas sin contar el centro al inicio y al final
+    if n < largo + 1:
+        return np.inf, 0, 0, False
+    inicios = np.arange(1, n - largo + 2)
+    primeros, ultimos = recorrido[inicios], recorrido[inicios + largo - 1]
+    previos, siguientes = recorrido[inicios - 1], recorrido[inicios + largo]
+    retiro = matriz[previos, primeros] + matriz[ultimos, siguientes] - matriz[previos, siguientes]
+
+    a, b = recorrido[:-1], recorrido[1:]
+    aristas = matriz[a, b]
+    directo = matriz[a[None, :], primeros[:, None]] + matriz[ultimos[:, None], b[None, :]] - aristas[None, :]
+    invertido = matriz[a[None, :], ultimos[:, None]] + matriz[primeros[:, None], b[None, :]] - aristas[None, :]
+    # No se inserta en las aristas que tocan el propio segmento
+    k = np.arange(len(a))[None, :]
+    prohibido = (k >= inicios[:, None] - 1) & (k <= inicios[:, None] + largo - 1)
+    directo[prohibido] = np.inf
+    invertido[prohibido] = np.inf
+
+    mejor = np.minimum(directo, invertido) - retiro[:, None]
+    s, k = np.unravel_index(np.argmin(mejor), mejor.shape)
+    return mejor[s, k], int(inicios[s]), int(k), bool(invertido[s, k] < directo[s, k])
+
+
+def secuenciar_paradas(lats, lons, lat_centro, lon_centro, metodo='haversine', max_movimientos=1000):
+    """
+    Ordena las paradas de una ruta (recorrido que sale y vuelve al centro)
+
+    Construye el recorrido con vecino más cercano desde el centro y lo mejora
+    con 2-opt y Or-opt (segmentos de 1 a 3 paradas, en ambos sentidos). Cada
+    movimiento se elige evaluando todas las opciones a la vez sobre la matriz
+    de distancias de la ruta.
+
+    Returns:
+        tuple: (orden de visita como índices de las paradas, distancia del tramo
+        que llega a cada parada en ese orden, distancia de regreso al centro)
+    """
+    n = len(lats)
+    if n == 0:
+        return [], [], 0.0
+    matriz = _matriz_con_centro(lats, lons, lat_centro, lon_centro, metodo)
+
+    # Vecino más cercano desde el centro
+    recorrido = [0]
+    pendiente = np.ones(n + 1, dtype=bool)
+    pendiente[0] = False
+    for _ in range(n):
+        distancias = np.where(pendiente, matriz[recorrido[-1]], np.inf)
+        siguiente = int(np.argmin(distancias))
+        recorrido.append(siguiente)
+        pendiente[siguiente] = False
+    recorrido = np.array(recorrido + [0])
+
+    # 2-opt y Or-opt hasta que ningún movimiento mejore
+    tolerancia = 1e-9
+    for _ in range(max_movimientos):
+        delta, i, j = _mejor_dos_opt(recorrido, matriz) if n >= 3 else (np.inf, 0, 0)
+        if delta < -tolerancia:
+            recorrido[i + 1:j + 1] = recorrido[i + 1:j + 1][::-1]
+            continue
+        opciones = [(_mejor_or_opt(recorrido, matriz, largo), largo) for largo in (1, 2, 3)]
+        (delta, inicio, k, invertido), largo = min(opciones, key=lambda opcion: opcion[0][0])
+        if delta >= -tolerancia:
+            break
+        segmento = recorrido[inicio:inicio + largo]
+        if invertido:
+            segmento = segmento[::-1]
+        resto = np.r_[recorrido[:inicio], recorrido[inicio + largo:]]
+        # La arista destino k (entre recorrido[k] y recorrido[k+1]) se corre si estaba después del segmento
+        destino = k + 1 if k < inicio else k + 1 - largo
+        recorrido = np.r_[resto[:destino], segmento, resto[destino:]]
+
+    tramos = matriz[recorrido[:-2], recorrido[1:-1]]
+    return (recorrido[1:-1] - 1).tolist(), tramos.tolist(), float(matriz[recorrido[-2], 0])
+
+
+def _secuenciar_tarea(tarea):
+    return secuenciar_paradas(*tarea)
+
+
+def _con_progreso(resultados, total, progreso):
+    """Recorre los resultados avisando a progreso(completados, total) después de cada uno"""
+    for completados, resultado in enumerate(resultados, 1):
+        if progreso is not None:
+            progreso(completados, total)
+        yield resultado
+
+
+def secuenciar_rutas(coordenadas_rutas, lat_centro, lon_centro, metodo='haversine', procesos=None, minimo_paralelo=64,
+                     progreso=None):
+    """
+    Secuencia varias rutas, en paralelo con un grupo de procesos cuando son muchas
+
+    Args:
+        coordenadas_rutas: Lista de (lats, lons) de cada ruta
+        procesos: Procesos del grupo (None = todos los núcleos, 1 = en serie)
+        minimo_paralelo: Rutas a partir de las cuales conviene usar procesos
+        progreso: Función opcional progreso(rutas_secuenciadas, total) llamada al terminar cada ruta
+
+    Returns:
+        list: Resultado de secuenciar_paradas para cada ruta
+    """
+    tareas = [(lats, lons, lat_centro, lon_centro, metodo) for lats, lons in coordenadas_rutas]
+    if procesos != 1 and len(tareas) >= minimo_paralelo:
+        trabajadores = procesos or os.cpu_count() or 1
+        try:
+            with ProcessPoolExecutor(max_workers=trabajadores) as ejecutor:
+                secuencias = ejecutor.map(_secuenciar_tarea, tareas, chunksize=max(1, len(tareas) // (4 * trabajadores)))
+                return list(_con_progreso(secuencias, len(tareas), progreso))
+        except (OSError, RuntimeError) as e:
+            print(f"⚠️  No se pudo secuenciar en paralelo ({e}); se secuencia en serie")
+    return list(_con_progreso(map(_secuenciar_tarea, tareas), len(tareas), progreso))
+
+
+# Paradas por día a partir de las cuales se omite la búsqueda local (la matriz float32 del día
+# ocuparía más de ~100 MB en cada proceso)
+MAX_PARADAS_MEJORA_DIA = 5000
+# Filas de la matriz del día calculadas por bloque (limita los temporales en float64)
+FILAS_BLOQUE_MATRIZ_DIA = 256
+
+
+def resolver_dia(datos, rutas, lat_centro, lon_centro, max_clientes, max_cajas, metodo='haversine',
+                 mejora=None):
+    """
+    Resuelve las rutas de un día: búsqueda local entre rutas y secuenciación
+
+    Args:
+        datos: Arreglo 3×n con la latitud, longitud y cajas de todos los clientes
+        rutas: Rutas del día como listas de índices de cliente
+        max_clientes, max_cajas: Límites de cada ruta
+        metodo: Fórmula de distancia (ver distancias)
+        mejora: Parámetros de mejorar_entre_rutas (max_iteraciones, tiempo_limite, vecinos),
+            o None para solo secuenciar
+
+    Returns:
+        tuple: (rutas con sus índices de cliente en orden de visita, distancia del tramo
+        que llega a cada parada, distancia de regreso de cada ruta, estadísticas de la
+        búsqueda local o None)
+    """
+    paradas = np.fromiter(itertools.chain.from_iterable(rutas), dtype=np.int64)
+    lats, lons, cajas = (np.array(fila[paradas]) for fila in datos)
+    locales = []
+    inicio = 0
+    for ruta in rutas:
+        locales.append(list(range(inicio, inicio + len(ruta))))
+        inicio += len(ruta)
+
+    resumen = None
+    if mejora is not None and 1 < len(locales) and len(paradas) <= MAX_PARADAS_MEJORA_DIA:
+        opciones = dict(mejora)
+        vecinos = opciones.pop('vecinos', 10)
+        matriz = _matriz_con_centro(lats, lons, lat_centro, lon_centro, metodo, 'float32', FILAS_BLOQUE_MATRIZ_DIA)
+        cercanos, _ = IndiceEspacial(lats, lons, clientes_por_celda=vecinos).k_vecinos_todos(vecinos)
+        locales, resumen = mejorar_entre_rutas(locales, matriz, np.arange(1, len(paradas) + 1), matriz[0, 1:],
+                                               cajas, cercanos, max_clientes, max_cajas, **opciones)
+
+    rutas_dia, tramos, regresos = [], [], []
+    for ruta in locales:
+        orden, tramos_ruta, regreso = secuenciar_paradas(lats[ruta], lons[ruta], lat_centro, lon_centro, metodo)
+        rutas_dia.append(paradas[np.asarray(ruta)[orden]].tolist())
+        tramos.append(tramos_ruta)
+        regresos.append(regreso)
+    return rutas_dia, tramos, regresos, resumen
+
+
+def _resolver_dia_tarea(tarea):
+    """Resuelve un día leyendo los datos de los clientes de la memoria compartida"""
+    nombre_memoria, forma, argumentos = tarea
+    try:
+        memoria = shared_memory.SharedMemory(name=nombre_memoria, track=False)
+    except TypeError:  # Python < 3.13
+        memoria = shared_memory.SharedMemory(name=nombre_memoria)
+    try:
+        datos = np.ndarray(forma, dtype='float64', buffer=memoria.buf)
+        resultado = resolver_dia(datos, *argumentos)
+        del datos  # La vista debe liberarse antes de cerrar el bloque
+        return resultado
+    finally:
+        memoria.close()
+
+
+def resolver_dias(rutas_por_dia, lats, lons, cajas, lat_centro, lon_centro, max_clientes, max_cajas,
+                  metodo='haversine', mejora=None, procesos=None, progreso=None):
+    """
+    Resuelve cada día de una proyección como una tarea independiente
+
+    Con varios días se usa un grupo de procesos; la latitud, longitud y cajas
+    de todos los clientes se copian una sola vez a un bloque de memoria
+    compartida de solo lectura y cada tarea recibe únicamente el nombre del
+    bloque y los índices de sus rutas, en lugar de una copia de los datos.
+
+    Args:
+        rutas_por_dia: Rutas de cada día como listas de índices de cliente
+        lats, lons, cajas: Datos de todos los clientes
+        procesos: Procesos del grupo (None = todos los núcleos, 1 = en serie)
+        progreso: Función opcional progreso(dias_resueltos, total) llamada al terminar cada día
+        (demás argumentos: ver resolver_dia)
+
+    Returns:
+        list: Resultado de resolver_dia para cada día (None en los días sin rutas)
+    """
+    datos = np.vstack([np.asarray(lats, dtype='float64'), np.asarray(lons, dtype='float64'),
+                       np.asarray(cajas, dtype='float64')])
+    dias = [dia for dia, rutas in enumerate(rutas_por_dia) if rutas]
+    argumentos = {dia: (rutas_por_dia[dia], lat_centro, lon_centro, max_clientes, max_cajas, metodo, mejora)
+                  for dia in dias}
+    resultados = [None] * len(rutas_por_dia)
+
+    trabajadores = min(procesos or os.cpu_count() or 1, len(dias))
+    if trabajadores > 1:
+        memoria = shared_memory.SharedMemory(create=True, size=max(datos.nbytes, 1))
+        try:
+            np.ndarray(datos.shape, dtype='float64', buffer=memoria.buf)[:] = datos
+            with ProcessPoolExecutor(max_workers=trabajadores) as ejecutor:
+                tareas = [(memoria.name, datos.shape, argumentos[dia]) for dia in dias]
+                for dia, resultado in zip(dias, _con_progreso(ejecutor.map(_resolver_dia_tarea, tareas), len(dias), progreso)):
+                    resultados[dia] = resultado
+            return resultados
+        except (OSError, RuntimeError) as e:
+            print(f"⚠️  No se pudieron resolver los días en paralelo ({e}); se resuelven en serie")
+        finally:
+            memoria.close()
+            memoria.unlink()
+
+    for dia, resultado in zip(dias, _con_progreso((resolver_dia(datos, *argumentos[dia]) for dia in dias), len(dias), progreso)):
+        resultados[dia] = resultado
+    return resultados
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Análisis por lotes: genera rutas, mapas y reportes de todos los centros en paralelo
+
+El libro se carga una sola vez, se separa por centro y cada centro se analiza
+en un proceso distinto (filtrado, limpieza, ruteo, mapa y reporte Excel) con
+su propia carpeta de OrganizadorArchivos. Al final se escribe un resumen
+combinado con una fila por centro.
+
+Uso: python analisis_lotes.py [archivo_excel] [hoja] [metodo_ruteo] [procesos]
+"""
+
+import os
+import sys
+import time
+import contextlib
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from analisis_rutas import AnalizadorRutas
+from organizador_archivos import OrganizadorArchivos
+
+# Parámetros de ruteo por defecto de cada centro
+PARAMETROS_LOTE = {
+    'max_clientes_por_ruta': 15,
+    'rutas_disponibles': None,
+    'max_cajas_por_ruta': 694,
+    'metodo_ruteo': 'proximidad',
+    'mejora_local': None,
+    'waze_integration': False,
+    'modo_mapa': 'auto',
+}
+
+
+def analizar_centro(centro, df_centro, archivo_excel, hoja_nombre, parametros, carpeta_base="Reportes"):
+    """
+    Analiza un centro y guarda sus archivos en una carpeta propia
+
+    Se ejecuta en un proceso del grupo; los mensajes del análisis se guardan
+    en analisis.log dentro de la carpeta del centro para no mezclarse con los
+    de otros procesos.
+
+    Args:
+        centro: Nombre del centro
+        df_centro: Filas del libro que pertenecen al centro
+        archivo_excel, hoja_nombre: Origen de los datos (solo informativo)
+        parametros: Parámetros de ruteo (ver PARAMETROS_LOTE)
+        carpeta_base: Carpeta donde se crean las carpetas de reporte
+
+    Returns:
+        dict: Fila del resumen combinado
+    """
+    inicio = time.perf_counter()
+    organizador = OrganizadorArchivos(carpeta_base)
+    carpeta = organizador.crear_carpeta_reporte(centro, "lote")
+    fila = {'Centro': centro, 'Carpeta': carpeta}
+
+    try:
+        with open(os.path.join(carpeta, "analisis.log"), 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+            analizador = AnalizadorRutas(archivo_excel, hoja_nombre, usar_cache=False)
+            # El paralelismo es entre centros: cada proceso secuencia sus rutas y genera sus archivos en serie
+            analizador.procesos = 1
+            analizador.df = df_centro
+
+            resultado = analizador.filtrar_por_centro(centro)
+            if resultado is None:
+                raise ValueError("No se pudo filtrar el centro")
+            df_filtrado, columnas_clave = resultado
+
+            resultado_rutas = analizador.generar_sugerido_rutas(
+                df_filtrado, columnas_clave,
+                parametros['max_clientes_por_ruta'], parametros['rutas_disponibles'], False,
+                parametros['max_cajas_por_ruta'],
+                metodo_ruteo=parametros['metodo_ruteo'], mejora_local=parametros['mejora_local']
+            )
+            if resultado_rutas is None:
+                raise ValueError("No se pudieron generar rutas")
+            rutas, df_ordenado, centro_coords = resultado_rutas
+
+            metodo_mapa = 'generar_mapa_con_waze' if parametros['waze_integration'] else 'generar_mapa'
+            organizador.archivos_generados += analizador.generar_artefactos([
+                ('mapa', organizador.obtener_ruta_archivo("mapa_rutas.html", "mapa"), metodo_mapa, (rutas, centro_coords),
+                 {'modo_mapa': parametros['modo_mapa']}),
+                ('excel', organizador.obtener_ruta_archivo("reporte_rutas.xlsx", "excel"), 'generar_reporte_excel', (rutas, df_ordenado, columnas_clave)),
+            ])
+            organizador.generar_reporte_resumen()
+
+        fila.update({
+            'Estado': 'OK',
+            'Rutas': len(rutas),
+            'Clientes': sum(ruta['total_clientes'] for ruta in rutas),
+            'Total Cajas': sum(ruta['total_cajas'] for ruta in rutas),
+            'Distancia Total (km)': sum(ruta.get('distancia_total', 0) for ruta in rutas),
+        })
+    except Exception as e:
+        fila.update({'Estado': f'Error: {e}'})
+
+    fila['Tiempo (s)'] = round(time.perf_counter() - inicio, 2)
+    return fila
+
+
+def ejecutar_lote(archivo_excel, hoja_nombre="REP PLR", parametros=None, procesos=None, carpeta_base="Reportes"):
+    """
+    Analiza todos los centros del libro en un grupo de procesos
+
+    Args:
+        archivo_excel, hoja_nombre: Libro y hoja a analizar
+        parametros: Parámetros de ruteo; se combinan con PARAMETROS_LOTE
+        procesos: Procesos del grupo (None = todos los núcleos)
+        carpeta_base: Carpeta donde se crean las carpetas de reporte
+
+    Returns:
+        pd.DataFrame: Resumen combinado, o None si no se pudieron cargar los datos
+    """
+    parametros = {**PARAMETROS_LOTE, **(parametros or {})}
+    analizador = AnalizadorRutas(archivo_excel, hoja_nombre)
+    if not analizador.cargar_datos():
+        return None
+    columna_centro = analizador.columnas_clave['centro']
+    if columna_centro is None:
+        print("❌ No se encontró columna de centro")
+        return None
+
+    # Centros más grandes primero para repartir mejor la carga
+    grupos = sorted(analizador.df.groupby(columna_centro, sort=False), key=lambda grupo: -len(grupo[1]))
+    procesos = min(procesos or os.cpu_count() or 1, len(grupos)) or 1
+    print(f"\n🚀 Analizando {len(grupos)} centros con {procesos} procesos "
+          f"(método {parametros['metodo_ruteo']})...")
+
+    inicio = time.perf_counter()
+    filas = []
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        futuros = {
+            ejecutor.submit(analizar_centro, centro, df_centro, archivo_excel, hoja_nombre, parametros, carpeta_base): centro
+            for centro, df_centro in grupos
+        }
+        for futuro in as_completed(futuros):
+            try:
+                fila = futuro.result()
+            except Exception as e:
+                fila = {'Centro': futuros[futuro], 'Estado': f'Error: {e}'}
+            filas.append(fila)
+            icono = "✅" if fila['Estado'] == 'OK' else "❌"
+            print(f"{icono} {fila['Centro']}: {fila['Estado']} "
+                  f"({fila.get('Rutas', 0)} rutas, {fila.get('Tiempo (s)', 0)} s)")
+
+    df_resumen = pd.DataFrame(filas).sort_values('Centro').reset_index(drop=True)
+
+    # Resumen combinado en una carpeta propia del lote
+    carpeta_lote = os.path.join(carpeta_base, f"lote_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    os.makedirs(carpeta_lote, exist_ok=True)
+    archivo_resumen = os.path.join(carpeta_lote, "RESUMEN_LOTE.xlsx")
+    df_resumen.to_excel(archivo_resumen, index=False)
+
+    exitosos = (df_resumen['Estado'] == 'OK').sum()
+    print(f"\n🎯 Lote completado en {time.perf_counter() - inicio:.1f} s: {exitosos} de {len(df_resumen)} centros")
+    print(f"📋 Resumen combinado guardado: {archivo_resumen}")
+    return df_resumen
+
+
+def main():
+    """Función principal"""
+    archivo_excel = sys.argv[1] if len(sys.argv) > 1 else "Data/REP PLR ESTATUS ENTREGAS v25.xlsx"
+    hoja_nombre = sys.argv[2] if len(sys.argv) > 2 else "REP PLR"
+    metodo_ruteo = sys.argv[3] if len(sys.argv) > 3 else PARAMETROS_LOTE['metodo_ruteo']
+    procesos = int(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    if not os.path.exists(archivo_excel):
+        print(f"❌ No se encontró el archivo de datos: {archivo_excel}")
+        return
+    if metodo_ruteo not in AnalizadorRutas.METODOS_RUTEO:
+        print(f"❌ Método de ruteo desconocido: {metodo_ruteo}. Opciones: {list(AnalizadorRutas.METODOS_RUTEO)}")
+        return
+
+    ejecutar_lote(archivo_excel, hoja_nombre, {'metodo_ruteo': metodo_ruteo}, procesos)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,306 @@
+import os
 import pandas as pd
 import numpy as np
-from geopy.distance import geodesic
 from geopy.geocoders import Nominatim
 import matplotlib.pyplot as plt
 import folium
 from folium import plugins
+from branca.element import MacroElement
+from jinja2 import Template
+import re
+import json
+import hashlib
 import warnings
 from datetime import datetime, timedelta
+from cache_datos import CacheDatos
+from lectores_excel import leer_encabezados, leer_tabla
+from distancias import distancias_desde
+from matriz_distancias import AlmacenMatrizDistancias
+from indice_espacial import IndiceEspacial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from algoritmos_ruteo import rutas_por_ahorros, rutas_por_barrido, asignar_dias, cortar_secuencia, distancia_rutas, limitar_rutas, mejorar_entre_rutas, resolver_dias, secuenciar_rutas
+from conjunto_rutas import ConjuntoRutas
+from escritor_reportes import EscritorReporte
 warnings.filterwarnings('ignore')
 
+# Primer número decimal de una cadena (incluye negativos)
+PATRON_COORDENADA = re.compile(r'(-?\d+\.\d+)')
+# A partir de este largo se asume que el valor trae varias coordenadas concatenadas
+LONGITUD_MAXIMA_COORDENADA = 100
+
+# Columnas que usan los reportes y la vista web además de las columnas clave
+COLUMNAS_ADICIONALES = ['Provincia', 'Cantón', 'Distrito', 'Fe.Entrega', 'dia entrega', 'Viaje']
+
+# Días de la semana en el orden de datetime.weekday() (0 = lunes)
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+# Colores de folium.Icon en hexadecimal, para los círculos de las capas agrupadas (estilo CSS)
+COLORES_HEX = {
+    'red': '#d63e2a', 'darkred': '#a23336', 'lightred': '#ff8e7f', 'orange': '#f69730', 'beige': '#ffcb92',
+    'green': '#72b026', 'darkgreen': '#728224', 'lightgreen': '#bbf970', 'blue': '#38aadd', 'darkblue': '#0067a3',
+    'lightblue': '#8adaff', 'purple': '#d252b9', 'darkpurple': '#5b396b', 'pink': '#ff91ea', 'cadetblue': '#436978',
+    'white': '#fbfbfb', 'gray': '#575757', 'lightgray': '#a3a3a3', 'black': '#303030',
+}
+
+# Script del mapa Waze: agrega los clientes (un solo arreglo JSON) a los grupos de cada
+# ruta y arma el popup con el enlace de Waze al abrirlo
+SCRIPT_CLIENTES_WAZE = """
+(function() {
+    var grupos = [%(grupos)s];
+    var colores = %(colores)s;
+    var agrupar = %(agrupar)s;
+    // [lat, lon, posición de la ruta, parada, cliente, cajas, distancia al centro]
+    var clientes = %(clientes)s;
+
+    function escapar(texto) {
+        return String(texto).replace(/[&<>"']/g, function(c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+
+    function popupCliente(c) {
+        var waze = 'https://waze.com/ul?ll=' + c[0] + ',' + c[1] + '&navigate=yes';
+        return '<div style="text-align: center;">' +
+            '<h5>Cliente: ' + escapar(c[4]) + '</h5>' +
+            '<p><strong>Parada:</strong> ' + c[3] + '</p>' +
+            '<p><strong>Cajas:</strong> ' + c[5].toLocaleString('en-US') + '</p>' +
+            '<p><strong>Distancia:</strong> ' + c[6].toFixed(1) + ' km</p>' +
+            '<hr><a href="' + waze + '" target="_blank" style="background-color: #33ccff; color: white; ' +
+            'padding: 8px 16px; text-decoration: none; border-radius: 5px; display: inline-block; margin-top: 5px;">' +
+            '<i class="fas fa-car"></i> Abrir en Waze</a></div>';
+    }
+
+    clientes.forEach(function(c) {
+        var marcador = agrupar
+            ? L.circleMarker([c[0], c[1]], {radius: 7, color: '#333333', weight: 1, fillColor: colores[c[2]], fillOpacity: 0.85})
+            : L.marker([c[0], c[1]], {icon: L.AwesomeMarkers.icon({icon: 'info-sign', prefix: 'glyphicon', markerColor: colores[c[2]]})});
+        marcador.bindPopup(function() { return popupCliente(c); }, {maxWidth: 300});
+        grupos[c[2]].addLayer(marcador);
+    });
+})();
+"""
+
+# Script de la capa agrupada de una ruta: crea un círculo por punto con su popup y lo agrega al
+# grupo de la ruta (MarkerCluster), de modo que cada punto queda en el mapa y abre su popup
+SCRIPT_PUNTOS_RUTA = """
+(function() {
+    var grupo = %(grupo)s;
+    var estilo = %(estilo)s;
+    var etiquetas = %(etiquetas)s;
+    // [lat, lon, valores del popup en el orden de las etiquetas]
+    var puntos = %(puntos)s;
+
+    function escapar(texto) {
+        return String(texto).replace(/[&<>"']/g, function(c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+
+    puntos.forEach(function(p) {
+        var marcador = L.circleMarker([p[0], p[1]], estilo);
+        marcador.bindPopup(function() {
+            return etiquetas.map(function(etiqueta, j) {
+                return '<strong>' + escapar(etiqueta) + ':</strong> ' + escapar(p[j + 2]);
+            }).join('<br>');
+        });
+        grupo.addLayer(marcador);
+    });
+})();
+"""
+
+
+class ScriptMapa(MacroElement):
+    """Código JavaScript que se ejecuta en el mapa después de los elementos agregados antes que él"""
+    _template = Template("{% macro script(this, kwargs) %}{{ this.codigo }}{% endmacro %}")
+
+    def __init__(self, codigo):
+        super().__init__()
+        self._name = 'ScriptMapa'
+        self.codigo = codigo
+
+
+# Atributos por cliente de la vista web: nombre en el reporte -> columna del Excel (None = columna de centro)
+ATRIBUTOS_WEB = {'Centro': None, 'dia': 'dia entrega', 'Viaje': 'Viaje', 'Provincia': 'Provincia', 'Cantón': 'Cantón', 'Distrito': 'Distrito'}
+# Atributos de la página /datos_web: el día es el de la semana de Fe.Entrega, precalculado al cargar
+ATRIBUTOS_DATOS_WEB = {**ATRIBUTOS_WEB, 'dia': 'dia_semana'}
+
+
+def _generar_artefacto(tarea):
+    """Genera un archivo (mapa o reporte) en un proceso del grupo (ver AnalizadorRutas.generar_artefactos)"""
+    generador, nombre_archivo, metodo, argumentos, opciones = tarea
+    return getattr(generador, metodo)(*argumentos, nombre_archivo=nombre_archivo, **opciones)
+
+
 class AnalizadorRutas:
-    def __init__(self, archivo_excel, hoja_nombre="REP PLR"):
+    # Métodos de construcción de rutas: nombre -> (método, descripción)
+    METODOS_RUTEO = {
+        'proximidad': ('_generar_rutas_por_proximidad', 'por proximidad al centro'),
+        'vecino_cercano': ('_generar_rutas_vecino_cercano', 'por vecino más cercano'),
+        'ahorros': ('_generar_rutas_ahorros', 'por ahorros (Clarke-Wright)'),
+        'barrido': ('_generar_rutas_barrido', 'por barrido angular alrededor del centro'),
+    }
+    
+    # Modos de dibujo de los clientes en los mapas: un folium.Marker por cliente, o una capa
+    # agrupada por ruta (MarkerCluster con un círculo por cliente creado en el navegador desde
+    # un arreglo JSON); 'auto' elige según el tamaño. El valor 'geojson' se conserva por
+    # compatibilidad (formulario, ejecución por lotes, README): la capa ya no es un
+    # FeatureCollection GeoJSON porque GeoJsonPopup nunca se enlaza dentro de un MarkerCluster
+    MODOS_MAPA = ('auto', 'marcadores', 'geojson')
+    UMBRAL_MAPA_AGRUPADO = 500  # Paradas a partir de las cuales 'auto' usa capas agrupadas
+    
+    def __init__(self, archivo_excel, hoja_nombre="REP PLR", usar_cache=True, solo_columnas_clave=True, motor_lectura='auto', metodo_distancia='haversine'):
         """
         Inicializa el analizador de rutas
         
         Args:
             archivo_excel (str): Ruta al archivo Excel
             hoja_nombre (str): Nombre de la hoja a analizar
+            usar_cache (bool): Si True, reutiliza la copia columnar del Excel en Data/.cache
+            solo_columnas_clave (bool): Si True, lee solo las columnas que usa el análisis
+            motor_lectura (str): 'auto', 'openpyxl', 'calamine' o 'csv' (ver lectores_excel)
+            metodo_distancia (str): 'haversine', 'equirectangular' o 'geodesica' (ver distancias)
         """
         self.archivo_excel = archivo_excel
         self.hoja_nombre = hoja_nombre
         self.df = None
         self.centros_disponibles = []
+        self.cache_datos = CacheDatos() if usar_cache else None
+        self.solo_columnas_clave = solo_columnas_clave
+        self.motor_lectura = motor_lectura
+        self.metodo_distancia = metodo_distancia
+        self.almacen_distancias = AlmacenMatrizDistancias(metodo=metodo_distancia)
+        self.columnas_clave = None
+        self.ultima_mejora_rutas = None  # Resumen de la última búsqueda local
+        self.procesos = None  # Procesos para tareas en paralelo (None = todos los núcleos)
+        self.ultimos_artefactos = []  # Archivos generados por la última llamada a generar_artefactos
+        self.ultimas_rutas_generadas = None  # Rutas del último análisis normal (para la vista web)
+        self.ultima_proyeccion_generada = None  # Rutas por día de la última proyección semanal
+        self.afinidad_dias = None  # Entregas de cada cliente por día de la semana (ver _precalcular_dias_semana)
+        self.atributos_clientes = None  # Atributos de cada cliente para la vista web (ver _precalcular_atributos_clientes)
+        self.huella_datos = None  # Hash del contenido de self.df (ver _calcular_huella_datos)
+        self.al_progresar = None  # Función opcional (porcentaje, mensaje) que recibe el avance de cada análisis
+        self._tramo_progreso = (0, 100)  # Tramo del porcentaje que corresponde a la etapa en curso
+        
+    def _columnas_a_cargar(self, encabezados):
+        """Columnas del Excel que usa el análisis, resueltas solo con la fila de encabezados"""
+        seleccion = []
+        for col in encabezados:
+            col_lower = str(col).lower()
+            if (any(patron in col_lower for patron in ('centro', 'sucursal', 'cliente', 'lat', 'lon')) or
+                    ('caja' in col_lower and 'equiv' in col_lower) or
+                    ('ruta' in col_lower and 'dist' in col_lower) or
+                    col in COLUMNAS_ADICIONALES):
+                seleccion.append(col)
+        return seleccion
+    
+    def _leer_excel(self):
+        """Lee la hoja en dos fases: encabezados primero y luego solo las columnas necesarias"""
+        columnas = None
+        if self.solo_columnas_clave:
+            encabezados = leer_encabezados(self.archivo_excel, self.hoja_nombre, self.motor_lectura)
+            columnas = self._columnas_a_cargar(encabezados)
+            print(f"Leyendo {len(columnas)} de {len(encabezados)} columnas: {columnas}")
+        return leer_tabla(self.archivo_excel, self.hoja_nombre, columnas, self.motor_lectura)
         
     def cargar_datos(self):
-        """Carga los datos del archivo Excel"""
+        """Carga los datos del archivo Excel (o de la caché columnar si está vigente)"""
         try:
             print("Cargando datos del archivo Excel...")
-            self.df = pd.read_excel(self.archivo_excel, sheet_name=self.hoja_nombre)
+            if self.cache_datos is not None:
+                variante = 'columnas_clave|' + '|'.join(COLUMNAS_ADICIONALES) if self.solo_columnas_clave else None
+                self.df = self.cache_datos.cargar(self.archivo_excel, self.hoja_nombre, self._leer_excel, variante)
+            else:
+                self.df = self._leer_excel()
             print(f"Datos cargados exitosamente. Filas: {len(self.df)}")
             print(f"Columnas disponibles: {list(self.df.columns)}")
             
             # Ordenar datos por Centro en orden ascendente
             columnas_clave = self.identificar_columnas_clave()
+            self.columnas_clave = columnas_clave
             if columnas_clave['centro']:
                 print(f"Ordenando datos por '{columnas_clave['centro']}' en orden ascendente...")
                 self.df = self.df.sort_values(columnas_clave['centro'], ascending=True)
                 print("Datos ordenados exitosamente")
             
+            self._precalcular_dias_semana()
+            self._precalcular_atributos_clientes()
+            self._calcular_huella_datos()
             return True
         except Exception as e:
             print(f"Error al cargar el archivo: {e}")
             return False
     
+    def _precalcular_atributos_clientes(self):
+        """
+        Precalcula la tabla de atributos de cada cliente para la vista web
+        
+        Una fila por cliente (indexada por cliente) con los atributos de
+        ATRIBUTOS_DATOS_WEB ya convertidos a texto ('N/A' si faltan), que
+        tabla_datos_web une a las paradas de las rutas con un solo join.
+        """
+        self.atributos_clientes = None
+        if not self.columnas_clave or not self.columnas_clave['cliente']:
+            return
+        tabla = self.atributos_por_cliente(self.df, self.columnas_clave, ATRIBUTOS_DATOS_WEB).astype(object)
+        self.atributos_clientes = tabla.where(tabla.notna(), 'N/A').astype(str)
+    
+    def _calcular_huella_datos(self):
+        """
+        Calcula un hash del contenido de los datos cargados
+        
+        Identifica el conjunto de datos por sus valores (no por el nombre ni la
+        fecha del archivo), de modo que los resultados de análisis guardados
+        (ver cache_resultados) solo se reutilizan con exactamente los mismos datos.
+        """
+        valores = pd.util.hash_pandas_object(self.df, index=False).to_numpy()
+        huella = hashlib.sha1(valores.tobytes())
+        huella.update('|'.join(map(str, self.df.columns)).encode('utf-8'))
+        self.huella_datos = huella.hexdigest()
+    
+    def _precalcular_dias_semana(self):
+        """
+        Precalcula el día de la semana de cada entrega y la afinidad cliente × día
+        
+        Agrega a self.df la columna categórica 'dia_semana' (día en español de
+        Fe.Entrega) y guarda en self.afinidad_dias una tabla con una fila por
+        cliente y una columna por día (DIAS_SEMANA) con su número de entregas.
+        El filtro por día lee la columna sin volver a convertir fechas y la
+        proyección semanal usa la tabla para preferir el día habitual de cada
+        cliente.
+        """
+        self.afinidad_dias = None
+        if 'Fe.Entrega' not in self.df.columns:
+            return
+        
+        fechas = pd.to_datetime(self.df['Fe.Entrega'], errors='coerce')
+        codigos = fechas.dt.dayofweek.fillna(-1).astype(np.int8)
+        self.df['dia_semana'] = pd.Categorical.from_codes(codigos, categories=DIAS_SEMANA)
+        
+        col_cliente = self.columnas_clave['cliente'] if self.columnas_clave else None
+        if col_cliente:
+            self.afinidad_dias = (
+                self.df.groupby([col_cliente, 'dia_semana'], observed=True, sort=False).size()
+                .unstack(fill_value=0)
+                .reindex(columns=DIAS_SEMANA, fill_value=0)
+            )
+            print(f"📅 Afinidad por día de la semana calculada para {len(self.afinidad_dias)} clientes")
+    
+    def dias_preferidos(self, clientes, dias):
+        """
+        Día habitual de entrega de cada cliente entre los días indicados
+        
+        Args:
+            clientes: Códigos de cliente
+            dias: Nombres de los días entre los que se elige (ver DIAS_SEMANA)
+        
+        Returns:
+            np.ndarray: Posición en `dias` del día con más entregas de cada cliente (-1 si no tiene entregas en esos días)
+        """
+        if self.afinidad_dias is None:
+            return np.full(len(clientes), -1)
+        conteos = self.afinidad_dias.reindex(index=clientes, columns=dias).fillna(0).to_numpy()
+        return np.where(conteos.sum(axis=1) > 0, conteos.argmax(axis=1), -1)
+    
     def explorar_datos(self):
         """Explora la estructura de los datos"""
         if self.df is None:
@@ -176,75 +434,89 @@ class AnalizadorRutas:
         
         return df_depurado
     
-    def limpiar_coordenadas(self, df, columnas_clave):
-        """Limpia y separa coordenadas que están concatenadas"""
+    def _extraer_coordenadas(self, serie, dtype='float64'):
+        """
+        Extrae la primera coordenada de cada valor de forma vectorizada
+        
+        Cada valor distinto se procesa una sola vez (las coordenadas de un
+        cliente se repiten en todas sus entregas) y el resultado se expande
+        de vuelta a todas las filas.
+        
+        Returns:
+            tuple: (Serie con las coordenadas, cantidad de valores muy largos)
+        """
+        codigos, unicos = pd.factorize(serie)
+        unicos = pd.Series(unicos)
+        
+        if pd.api.types.is_numeric_dtype(unicos.dtype):
+            valores = np.array(unicos, dtype='float64')
+            largos = np.zeros(len(unicos), dtype=bool)
+        else:
+            texto = unicos.astype(str)
+            valores = np.array(pd.to_numeric(texto.str.extract(PATRON_COORDENADA, expand=False),
+                                             errors='coerce'), dtype='float64')
+            # Los valores muy largos contienen varias coordenadas concatenadas: se toma la primera sin validar rango
+            largos = (texto.str.len() > LONGITUD_MAXIMA_COORDENADA).to_numpy()
+        
+        # Verificar que la coordenada está en un rango válido para latitud/longitud
+        fuera_rango = ~largos & ((valores < -90) | (valores > 90))
+        valores[fuera_rango] = np.nan
+        
+        coordenadas = np.full(len(serie), np.nan, dtype=dtype)
+        validos = codigos >= 0
+        coordenadas[validos] = valores[codigos[validos]]
+        
+        total_largos = int(np.bincount(codigos[validos], minlength=len(unicos))[largos].sum()) if largos.any() else 0
+        return pd.Series(coordenadas, index=serie.index), total_largos
+    
+    def limpiar_coordenadas(self, df, columnas_clave, dtype='float64'):
+        """
+        Limpia y separa coordenadas que están concatenadas
+        
+        Args:
+            df: DataFrame con las columnas de coordenadas originales
+            columnas_clave: Diccionario con nombres de columnas
+            dtype: Tipo de las columnas limpias ('float64' o 'float32')
+        """
         df_limpio = df.copy()
         
-        # Función para extraer la primera coordenada de una cadena concatenada
-        def extraer_primera_coordenada(valor):
-            if pd.isna(valor) or valor == '':
-                return None
-            valor_str = str(valor)
-            
-            # Si el valor es muy largo, puede contener múltiples coordenadas concatenadas
-            if len(valor_str) > 100:
-                print(f"Valor de coordenada muy largo detectado ({len(valor_str)} caracteres): {valor_str[:100]}...")
-                # Buscar el primer patrón de coordenada válida (número con punto decimal)
-                import re
-                matches = re.findall(r'-?\d+\.\d+', valor_str)
-                if matches:
-                    # Tomar la primera coordenada encontrada
-                    primera_coord = float(matches[0])
-                    print(f"  Primera coordenada extraída: {primera_coord}")
-                    return primera_coord
-                else:
-                    print(f"  No se encontraron coordenadas válidas en el valor largo")
-                    return None
+        for clave, columna_limpia, etiqueta in (('latitud', 'latitud_limpia', 'latitud'),
+                                                 ('longitud', 'longitud_limpia', 'longitud')):
+            columna = columnas_clave[clave]
+            if not columna:
+                continue
             
-            # Para valores normales, buscar el primer número decimal (incluyendo negativos)
-            import re
-            match = re.search(r'-?\d+\.\d+', valor_str)
-            if match:
-                coord = float(match.group())
-                # Verificar que la coordenada está en el rango de Costa Rica
-                if -90 <= coord <= 90:  # Rango válido para latitud/longitud
-                    return coord
-                else:
-                    print(f"  Coordenada fuera de rango válido: {coord}")
-                    return None
-            return None
-        
-        # Limpiar latitud
-        if columnas_clave['latitud']:
-            print(f"Limpiando coordenadas de latitud de la columna: {columnas_clave['latitud']}")
-            df_limpio['latitud_limpia'] = df_limpio[columnas_clave['latitud']].apply(extraer_primera_coordenada)
-            lat_validas = df_limpio['latitud_limpia'].notna().sum()
-            print(f"Coordenadas de latitud válidas: {lat_validas}/{len(df_limpio)}")
+            print(f"Limpiando coordenadas de {etiqueta} de la columna: {columna}")
+            df_limpio[columna_limpia], total_largos = self._extraer_coordenadas(df_limpio[columna], dtype)
+            if total_largos:
+                print(f"  {total_largos} valores de coordenada muy largos (más de {LONGITUD_MAXIMA_COORDENADA} caracteres): se tomó la primera coordenada")
             
-            # Mostrar algunas coordenadas de ejemplo
-            if lat_validas > 0:
-                print("Ejemplos de coordenadas de latitud:")
-                for i, (idx, row) in enumerate(df_limpio.head(5).iterrows()):
-                    if not pd.isna(row['latitud_limpia']):
-                        print(f"  {i+1}. Original: {row[columnas_clave['latitud']]} -> Limpia: {row['latitud_limpia']}")
-        
-        # Limpiar longitud
-        if columnas_clave['longitud']:
-            print(f"Limpiando coordenadas de longitud de la columna: {columnas_clave['longitud']}")
-            df_limpio['longitud_limpia'] = df_limpio[columnas_clave['longitud']].apply(extraer_primera_coordenada)
-            lon_validas = df_limpio['longitud_limpia'].notna().sum()
-            print(f"Coordenadas de longitud válidas: {lon_validas}/{len(df_limpio)}")
+            validas = df_limpio[columna_limpia].notna().sum()
+            print(f"Coordenadas de {etiqueta} válidas: {validas}/{len(df_limpio)}")
             
             # Mostrar algunas coordenadas de ejemplo
-            if lon_validas > 0:
-                print("Ejemplos de coordenadas de longitud:")
-                for i, (idx, row) in enumerate(df_limpio.head(5).iterrows()):
-                    if not pd.isna(row['longitud_limpia']):
-                        print(f"  {i+1}. Original: {row[columnas_clave['longitud']]} -> Limpia: {row['longitud_limpia']}")
+            if validas > 0:
+                print(f"Ejemplos de coordenadas de {etiqueta}:")
+                ejemplos = df_limpio[[columna, columna_limpia]].head(5)
+                ejemplos = ejemplos[ejemplos[columna_limpia].notna()]
+                for i, (original, limpia) in enumerate(zip(ejemplos[columna], ejemplos[columna_limpia])):
+                    print(f"  {i+1}. Original: {original} -> Limpia: {limpia}")
         
         return df_limpio
     
-    def generar_sugerido_rutas(self, df_filtrado, columnas_clave, max_clientes_por_ruta=15, rutas_disponibles=None, generar_proyeccion_semanal=False, max_cajas_por_ruta=694):
+    def _tramo(self, inicio, fin, mensaje=None):
+        """Empieza una etapa del análisis que ocupa el tramo [inicio, fin] del porcentaje de avance"""
+        self._tramo_progreso = (inicio, fin)
+        self._informar_progreso(0.0, mensaje)
+    
+    def _informar_progreso(self, fraccion, mensaje=None):
+        """Informa a self.al_progresar el avance de la etapa en curso (fraccion de 0 a 1)"""
+        if self.al_progresar is None:
+            return
+        inicio, fin = self._tramo_progreso
+        self.al_progresar(inicio + (fin - inicio) * min(max(fraccion, 0.0), 1.0), mensaje)
+    
+    def generar_sugerido_rutas(self, df_filtrado, columnas_clave, max_clientes_por_ruta=15, rutas_disponibles=None, generar_proyeccion_semanal=False, max_cajas_por_ruta=694, metodo_ruteo='proximidad', opciones_ruteo=None, mejora_local=None, secuenciar=True, carpetas_salida=None, perfil_capacidad=None, modo_mapa='auto'):
         """
         Genera sugeridos de rutas optimizadas
         
@@ -254,7 +526,24 @@ class AnalizadorRutas:
             max_clientes_por_ruta: Máximo número de clientes por ruta
             rutas_disponibles: Número de rutas disponibles para asignar
             generar_proyeccion_semanal: Si True, genera proyección para toda la semana
+            max_cajas_por_ruta: Máximo de cajas equivalentes por ruta
+            metodo_ruteo: Método de construcción de rutas (ver METODOS_RUTEO)
+            opciones_ruteo: Parámetros adicionales del método de ruteo (p. ej. {'angulo_inicial': 90} para 'barrido')
+            mejora_local: Si es True (o un diccionario con parámetros de mejorar_rutas), mejora las rutas con búsqueda local entre rutas
+                (en la proyección semanal se aplica a cada día salvo que sea False)
+            secuenciar: Si True, ordena las paradas de cada ruta (ver secuenciar_rutas)
+            carpetas_salida: Carpeta por tipo de archivo de la proyección semanal, p. ej. {'excel': ..., 'mapa': ...}
+                (por defecto el directorio actual)
+            perfil_capacidad: Rutas disponibles por día en la proyección semanal, p. ej. {'Viernes': 3, 'Sábado': 2}
+                (los días que no aparecen usan rutas_disponibles; 0 = no se trabaja ese día)
+            modo_mapa: Modo de los mapas por día de la proyección semanal (ver MODOS_MAPA)
+        
+        Si self.al_progresar está definido, recibe el avance (0-100) por etapa, ruta y día.
         """
+        if metodo_ruteo not in self.METODOS_RUTEO:
+            print(f"Método de ruteo desconocido: {metodo_ruteo}. Opciones: {list(self.METODOS_RUTEO)}")
+            return None
+        
         if df_filtrado is None or len(df_filtrado) == 0:
             print("No hay datos para generar rutas")
             return
@@ -270,6 +559,7 @@ class AnalizadorRutas:
         df_limpio = df_filtrado.copy()
         
         # Limpiar coordenadas
+        self._tramo(0, 10, 'Limpiando coordenadas...')
         print("🧹 Limpiando coordenadas...")
         df_limpio = self.limpiar_coordenadas(df_limpio, columnas_clave)
         print(f"✅ Coordenadas limpiadas. Filas restantes: {len(df_limpio)}")
@@ -367,18 +657,35 @@ class AnalizadorRutas:
         else:
             print(f"✅ Centro de gravedad calculado: ({lat_centro:.4f}, {lon_centro:.4f}) - Costa Rica")
         
+        # Las rutas se construyen sobre una parada por cliente; df_ordenado conserva el detalle por entrega
+        df_paradas = self.agregar_paradas(df_ordenado, columnas_clave)
+        self._informar_progreso(1.0, f'{len(df_paradas)} paradas listas para rutear')
+        
         if generar_proyeccion_semanal:
             # Generar proyección semanal
-            proyeccion = self._generar_proyeccion_semanal(df_ordenado, columnas_clave, lat_centro, lon_centro, max_clientes_por_ruta, rutas_disponibles, max_cajas_por_ruta)
+            proyeccion = self._generar_proyeccion_semanal(df_paradas, columnas_clave, lat_centro, lon_centro, max_clientes_por_ruta, rutas_disponibles, max_cajas_por_ruta, carpetas_salida, perfil_capacidad,
+                                                          mejora_local if mejora_local is not None else True, modo_mapa)
             # Guardar las rutas para acceso web
             self.ultima_proyeccion_generada = proyeccion
             self.ultimas_rutas_generadas = None  # Resetear si es proyección
+            self._tramo_progreso = (0, 100)
             return proyeccion, df_ordenado, (lat_centro, lon_centro)
         else:
             # Generar rutas normales
-            print("🔄 Generando rutas por proximidad...")
-            rutas = self._generar_rutas_por_proximidad(df_ordenado, columnas_clave, lat_centro, lon_centro, max_clientes_por_ruta, rutas_disponibles, max_cajas_por_ruta)
+            nombre_metodo, descripcion = self.METODOS_RUTEO[metodo_ruteo]
+            print(f"🔄 Generando rutas {descripcion}...")
+            self._tramo(10, 50 if mejora_local or secuenciar else 100, f'Generando rutas {descripcion}...')
+            rutas = getattr(self, nombre_metodo)(df_paradas, columnas_clave, lat_centro, lon_centro, max_clientes_por_ruta, rutas_disponibles, max_cajas_por_ruta, **(opciones_ruteo or {}))
             print(f"✅ Rutas generadas: {len(rutas)} rutas")
+            self._informar_progreso(1.0, f'{len(rutas)} rutas generadas')
+            if mejora_local:
+                opciones_mejora = mejora_local if isinstance(mejora_local, dict) else {}
+                self._tramo(50, 65 if secuenciar else 100, 'Mejorando rutas con búsqueda local...')
+                rutas = self.mejorar_rutas(rutas, df_paradas, columnas_clave, (lat_centro, lon_centro), max_clientes_por_ruta, max_cajas_por_ruta, **opciones_mejora)
+            if secuenciar:
+                self._tramo(65 if mejora_local else 50, 100, 'Secuenciando paradas...')
+                self.secuenciar_rutas(rutas, (lat_centro, lon_centro))
+            self._tramo_progreso = (0, 100)
             # Guardar las rutas para acceso web
             self.ultimas_rutas_generadas = rutas
             self.ultima_proyeccion_generada = None  # Resetear si es normal
@@ -387,6 +694,163 @@ class AnalizadorRutas:
             print(f"✅ Método generar_sugerido_rutas completado exitosamente")
             return rutas, df_ordenado, (lat_centro, lon_centro)
     
+    def agregar_paradas(self, df, columnas_clave):
+        """
+        Agrupa las entregas en una parada por cliente
+        
+        Los métodos de ruteo trabajan sobre paradas, no sobre filas de entrega.
+        Cada parada conserva las columnas de la primera entrega del cliente y
+        agrega, calculado en una sola agrupación:
+        - cajas equivalentes: promedio por entrega (volumen que se usa para
+          los límites de cada ruta)
+        - 'cajas_total' y 'num_entregas': totales del cliente en el período
+        - latitud/longitud limpias: mediana de sus entregas
+        
+        Args:
+            df: DataFrame limpio con una fila por entrega
+            columnas_clave: Diccionario con nombres de columnas
+        
+        Returns:
+            DataFrame: Una fila por cliente, ordenada por cajas de mayor a menor
+        """
+        col_cliente = columnas_clave['cliente']
+        col_cajas = columnas_clave['cajas_equiv']
+        grupos = df.groupby(col_cliente, sort=False, dropna=False)
+        
+        paradas = df.drop_duplicates(subset=[col_cliente]).set_index(col_cliente)
+        paradas[col_cajas] = grupos[col_cajas].mean()
+        paradas['cajas_total'] = grupos[col_cajas].sum()
+        paradas['num_entregas'] = grupos.size()
+        paradas['latitud_limpia'] = grupos['latitud_limpia'].median()
+        paradas['longitud_limpia'] = grupos['longitud_limpia'].median()
+        paradas = paradas.reset_index()[list(df.columns) + ['cajas_total', 'num_entregas']]
+        
+        print(f"📍 {len(df)} entregas agrupadas en {len(paradas)} paradas (una por cliente)")
+        return paradas.sort_values(col_cajas, ascending=False, kind='stable').reset_index(drop=True)
+    
+    def obtener_matriz_distancias(self, df, columnas_clave, centro=None):
+        """
+        Obtiene la matriz de distancias persistida entre los clientes únicos del DataFrame
+        
+        Args:
+            df: DataFrame con coordenadas limpias (latitud_limpia/longitud_limpia)
+            columnas_clave: Diccionario con nombres de columnas
+            centro: Nombre del centro; si es None se toma de la columna de centro
+        
+        Returns:
+            tuple: (MatrizDistancias, DataFrame con una fila por cliente en el orden de la matriz)
+        """
+        df_clientes = df.drop_duplicates(subset=[columnas_clave['cliente']])
+        if centro is None:
+            centros = df_clientes[columnas_clave['centro']].unique() if columnas_clave['centro'] else []
+            centro = centros[0] if len(centros) == 1 else 'TODOS'
+        
+        matriz = self.almacen_distancias.obtener(
+            centro,
+            df_clientes[columnas_clave['cliente']].tolist(),
+            df_clientes['latitud_limpia'].to_numpy(dtype='float64'),
+            df_clientes['longitud_limpia'].to_numpy(dtype='float64')
+        )
+        return matriz, df_clientes
+    
+    def atributos_por_cliente(self, df, columnas_clave, atributos=ATRIBUTOS_WEB):
+        """
+        Tabla de atributos de cada cliente tomados de su primera fila, indexada por cliente
+        
+        Se construye una sola vez y se une a las paradas con un join, en lugar de
+        filtrar el DataFrame completo por cada cliente. Los atributos cuya
+        columna no existe quedan como 'N/A'.
+        
+        Args:
+            df: DataFrame con el detalle por entrega
+            columnas_clave: Diccionario con nombres de columnas
+            atributos: Nombre en la tabla -> columna del DataFrame (None = columna de centro)
+        
+        Returns:
+            pd.DataFrame: Una fila por cliente con una columna por atributo
+        """
+        primeras = df.drop_duplicates(subset=[columnas_clave['cliente']])
+        tabla = pd.DataFrame(index=pd.Index(primeras[columnas_clave['cliente']], name='cliente'))
+        for nombre, columna in atributos.items():
+            columna = columnas_clave['centro'] if columna is None else columna
+            tabla[nombre] = primeras[columna].to_numpy() if columna in primeras.columns else 'N/A'
+        return tabla
+    
+    def tabla_datos_web(self):
+        """
+        Tabla de la vista web con una fila por parada de las últimas rutas generadas
+        
+        Las paradas (rutas normales o proyección semanal) se unen a
+        self.atributos_clientes con un solo join. En la proyección el día es el
+        día proyectado de cada ruta.
+        
+        Returns:
+            pd.DataFrame: Columnas de la vista web, o None si no hay rutas generadas
+        """
+        if self.ultimas_rutas_generadas:
+            paradas = ConjuntoRutas.desde(self.ultimas_rutas_generadas).a_dataframe(('ruta', 'cliente', 'nombre_cliente', 'lat', 'lon', 'cajas'))
+        elif self.ultima_proyeccion_generada:
+            paradas = pd.DataFrame(
+                [(dia, ruta['ruta'], cliente['cliente'], cliente['nombre_cliente'], cliente['lat'], cliente['lon'], cliente['cajas'])
+                 for dia, rutas_dia in self.ultima_proyeccion_generada.items()
+                 for ruta in rutas_dia for cliente in ruta['clientes']],
+                columns=['dia_ruta', 'ruta', 'cliente', 'nombre_cliente', 'lat', 'lon', 'cajas']
+            )
+        else:
+            return None
+        
+        atributos = self.atributos_clientes
+        if atributos is None:
+            atributos = pd.DataFrame(columns=list(ATRIBUTOS_DATOS_WEB), index=pd.Index([], name='cliente'))
+        df_web = paradas.join(atributos, on='cliente')
+        df_web[list(ATRIBUTOS_DATOS_WEB)] = df_web[list(ATRIBUTOS_DATOS_WEB)].astype(object).fillna('N/A')
+        if 'dia_ruta' in df_web.columns:
+            df_web['dia'] = df_web['dia_ruta']
+        
+        return pd.DataFrame({
+            'Centro': df_web['Centro'],
+            'dia': df_web['dia'],
+            'Cliente': df_web['cliente'].astype(str),
+            'Nombre de': df_web['nombre_cliente'].astype(str),
+            'Ruta': df_web['ruta'].astype(str),
+            'Viaje': df_web['Viaje'],
+            'Latitud': df_web['lat'].astype('float64'),
+            'Longitud': df_web['lon'].astype('float64'),
+            'Provincia': df_web['Provincia'],
+            'Cantón': df_web['Cantón'],
+            'Distrito': df_web['Distrito'],
+            'Promedio de Cajas Equiv.': df_web['cajas'].astype('float64')
+        })
+    
+    def _tabla_clientes(self, df, columnas_clave, lat_centro, lon_centro):
+        """
+        Crea la tabla columnar de clientes (ver conjunto_rutas.ATRIBUTOS_CLIENTE)
+        con su distancia al centro calculada para todo el arreglo en una sola llamada
+        """
+        lats = np.array(df['latitud_limpia'], dtype='float64')
+        lons = np.array(df['longitud_limpia'], dtype='float64')
+        ids = np.array(df[columnas_clave['cliente']], dtype=object)
+        cajas = np.array(df[columnas_clave['cajas_equiv']], dtype='float64')
+        
+        # Agregar información de Ruta Dist si existe
+        if columnas_clave['ruta_dist']:
+            rutas_dist = np.array(df[columnas_clave['ruta_dist']].astype(object).where(df[columnas_clave['ruta_dist']].notna(), 'Sin asignar'), dtype=object)
+        else:
+            rutas_dist = np.full(len(df), 'Sin asignar', dtype=object)
+        
+        return {
+            'cliente': ids,
+            'nombre_cliente': np.array(df[columnas_clave['nombre_cliente']], dtype=object) if columnas_clave['nombre_cliente'] else ids,
+            'lat': lats,
+            'lon': lons,
+            'cajas': cajas,
+            # Totales de la parada cuando el DataFrame viene agregado por cliente (ver agregar_paradas)
+            'cajas_total': np.array(df['cajas_total'], dtype='float64') if 'cajas_total' in df.columns else cajas,
+            'num_entregas': np.array(df['num_entregas'], dtype=np.int64) if 'num_entregas' in df.columns else np.ones(len(df), dtype=np.int64),
+            'distancia_centro': distancias_desde(lat_centro, lon_centro, lats, lons, self.metodo_distancia),
+            'ruta_dist': rutas_dist
+        }
+    
     def _generar_rutas_por_proximidad(self, df, columnas_clave, lat_centro, lon_centro, max_clientes, rutas_disponibles=None, max_cajas_por_ruta=694):
         """Genera rutas agrupando clientes por proximidad al centro con límite de cajas por ruta"""
         # Verificar y corregir coordenadas del centro si es necesario
@@ -394,93 +858,308 @@ class AnalizadorRutas:
             print(f"⚠️  Corrigiendo coordenadas del centro de ({lat_centro:.4f}, {lon_centro:.4f}) a San José, Costa Rica")
             lat_centro, lon_centro = 9.9281, -84.0907  # San José, Costa Rica
         
-        rutas = []
-        clientes_asignados = set()
-        
-        # Crear lista de clientes con sus coordenadas y volúmenes
-        clientes = []
-        for idx, row in df.iterrows():
-            cliente_data = {
-                'cliente': row[columnas_clave['cliente']],
-                'nombre_cliente': row[columnas_clave['nombre_cliente']] if columnas_clave['nombre_cliente'] else row[columnas_clave['cliente']],
-                'lat': row['latitud_limpia'],
-                'lon': row['longitud_limpia'],
-                'cajas': row[columnas_clave['cajas_equiv']],
-                'distancia_centro': geodesic((lat_centro, lon_centro), 
-                                           (row['latitud_limpia'], row['longitud_limpia'])).kilometers
-            }
-            
-            # Agregar información de Ruta Dist si existe
-            if columnas_clave['ruta_dist'] and not pd.isna(row[columnas_clave['ruta_dist']]):
-                cliente_data['ruta_dist'] = row[columnas_clave['ruta_dist']]
-            else:
-                cliente_data['ruta_dist'] = 'Sin asignar'
-            
-            clientes.append(cliente_data)
+        # Un cliente por parada (la primera fila de cada cliente)
+        df_clientes = df.drop_duplicates(subset=[columnas_clave['cliente']])
+        clientes = self._tabla_clientes(df_clientes, columnas_clave, lat_centro, lon_centro)
+        
+        print(f"📦 Configuración de rutas:")
+        print(f"   • Máximo clientes por ruta: {max_clientes}")
+        print(f"   • Máximo cajas por ruta: {max_cajas_por_ruta}")
+        print(f"   • Rutas disponibles: {rutas_disponibles if rutas_disponibles else 'Sin límite'}")
+        
+        # Ordenar por distancia al centro y cortar en rutas consecutivas
+        orden = np.argsort(clientes['distancia_centro'], kind='stable')
+        rutas_indices = cortar_secuencia(orden, clientes['cajas'], max_clientes, max_cajas_por_ruta)
+        
+        rutas = self._numerar_rutas(rutas_indices, clientes, rutas_disponibles, por_volumen=False)
+        print(f"✅ Método _generar_rutas_por_proximidad completado exitosamente")
+        return rutas
+    
+    def _generar_rutas_vecino_cercano(self, df, columnas_clave, lat_centro, lon_centro, max_clientes, rutas_disponibles=None, max_cajas_por_ruta=694, vecinos_candidatos=8):
+        """
+        Genera rutas extendiendo cada una desde su última parada hacia el cliente libre más cercano
+        
+        Cada ruta empieza en el cliente sin asignar más cercano al centro y se
+        extiende con el vecino más cercano a su última parada que quepa en el
+        límite de cajas, hasta llenar el límite de clientes o de cajas. Las
+        consultas usan un índice espacial, por lo que el costo crece casi
+        linealmente con el número de clientes.
         
-        # Ordenar por distancia al centro
-        clientes.sort(key=lambda x: x['distancia_centro'])
+        Args:
+            vecinos_candidatos: Vecinos revisados en cada paso para encontrar uno que quepa
+        """
+        # Verificar y corregir coordenadas del centro si es necesario
+        if not (8 <= lat_centro <= 11) or not (-86 <= lon_centro <= -82):
+            print(f"⚠️  Corrigiendo coordenadas del centro de ({lat_centro:.4f}, {lon_centro:.4f}) a San José, Costa Rica")
+            lat_centro, lon_centro = 9.9281, -84.0907  # San José, Costa Rica
         
-        ruta_actual = []
-        volumen_ruta = 0
-        ruta_numero = 1
+        # Un cliente por parada (la primera fila de cada cliente)
+        df_clientes = df.drop_duplicates(subset=[columnas_clave['cliente']])
+        clientes = self._tabla_clientes(df_clientes, columnas_clave, lat_centro, lon_centro)
+        cajas = clientes['cajas']
+        indice = IndiceEspacial(clientes['lat'], clientes['lon'])
         
         print(f"📦 Configuración de rutas:")
         print(f"   • Máximo clientes por ruta: {max_clientes}")
         print(f"   • Máximo cajas por ruta: {max_cajas_por_ruta}")
         print(f"   • Rutas disponibles: {rutas_disponibles if rutas_disponibles else 'Sin límite'}")
         
-        for cliente in clientes:
-            if cliente['cliente'] in clientes_asignados:
-                continue
-            
-            # Verificar si agregar este cliente excedería los límites
-            excede_clientes = len(ruta_actual) >= max_clientes
-            excede_cajas = (volumen_ruta + cliente['cajas']) > max_cajas_por_ruta
-            
-            if excede_clientes or excede_cajas:
-                if ruta_actual:
-                    promedio_cajas_ruta = volumen_ruta / len(ruta_actual)
-                    print(f"   Ruta {ruta_numero}: {len(ruta_actual)} clientes, {volumen_ruta:,.0f} cajas (prom: {promedio_cajas_ruta:,.1f})")
-                    
-                    rutas.append({
-                        'ruta': ruta_numero,
-                        'clientes': ruta_actual.copy(),
-                        'total_cajas': volumen_ruta,
-                        'total_clientes': len(ruta_actual)
-                    })
-                    ruta_numero += 1
-                ruta_actual = []
-                volumen_ruta = 0
-            
-            # Verificar si hemos alcanzado el límite de rutas disponibles
-            if rutas_disponibles and ruta_numero > rutas_disponibles:
+        # Orden de inicio de rutas: clientes del más cercano al más lejano del centro
+        orden_centro = np.argsort(clientes['distancia_centro'], kind='stable')
+        posicion = 0
+        
+        rutas_indices = []
+        while indice.total_activos > 0:
+            if rutas_disponibles and len(rutas_indices) >= rutas_disponibles:
                 print(f"⚠️  Se alcanzó el límite de {rutas_disponibles} rutas disponibles")
                 break
             
-            ruta_actual.append(cliente)
-            volumen_ruta += cliente['cajas']
-            clientes_asignados.add(cliente['cliente'])
-        
-        # Agregar la última ruta si tiene clientes
-        if ruta_actual and (not rutas_disponibles or ruta_numero <= rutas_disponibles):
-            promedio_cajas_ruta = volumen_ruta / len(ruta_actual)
-            print(f"   Ruta {ruta_numero}: {len(ruta_actual)} clientes, {volumen_ruta:,.0f} cajas (prom: {promedio_cajas_ruta:,.1f})")
-            
-            rutas.append({
-                'ruta': ruta_numero,
-                'clientes': ruta_actual.copy(),
-                'total_cajas': volumen_ruta,
-                'total_clientes': len(ruta_actual)
-            })
+            # Iniciar la ruta en el cliente libre más cercano al centro
+            while not indice.activos[orden_centro[posicion]]:
+                posicion += 1
+            inicial = int(orden_centro[posicion])
+            indice.desactivar(inicial)
+            ruta_actual = [inicial]
+            volumen_ruta = cajas[inicial]
+            
+            # Extender desde la última parada mientras haya un vecino que quepa
+            while len(ruta_actual) < max_clientes and indice.total_activos > 0:
+                ultimo = ruta_actual[-1]
+                candidatos, _ = indice.k_vecinos(clientes['lat'][ultimo], clientes['lon'][ultimo], vecinos_candidatos)
+                caben = candidatos[volumen_ruta + cajas[candidatos] <= max_cajas_por_ruta]
+                if len(caben) == 0:
+                    break
+                siguiente = int(caben[0])
+                indice.desactivar(siguiente)
+                ruta_actual.append(siguiente)
+                volumen_ruta += cajas[siguiente]
+            
+            rutas_indices.append(ruta_actual)
+            self._informar_progreso(1 - indice.total_activos / len(cajas), f'Ruta {len(rutas_indices)} armada')
+        
+        return self._numerar_rutas(rutas_indices, clientes, por_volumen=False)
+    
+    def _generar_rutas_ahorros(self, df, columnas_clave, lat_centro, lon_centro, max_clientes, rutas_disponibles=None, max_cajas_por_ruta=694, vecinos_candidatos=30):
+        """
+        Genera rutas con el algoritmo de ahorros de Clarke-Wright
+        
+        Parte de una ruta por cliente y une rutas por sus extremos en orden de
+        mayor ahorro de distancia, respetando los límites de clientes y cajas
+        (ver algoritmos_ruteo.rutas_por_ahorros). Si resultan más rutas que las
+        disponibles, se conservan las de mayor volumen.
+        
+        Args:
+            vecinos_candidatos: Vecinos por cliente considerados al calcular ahorros
+        """
+        # Verificar y corregir coordenadas del centro si es necesario
+        if not (8 <= lat_centro <= 11) or not (-86 <= lon_centro <= -82):
+            print(f"⚠️  Corrigiendo coordenadas del centro de ({lat_centro:.4f}, {lon_centro:.4f}) a San José, Costa Rica")
+            lat_centro, lon_centro = 9.9281, -84.0907  # San José, Costa Rica
+        
+        # Un cliente por parada (la primera fila de cada cliente)
+        df_clientes = df.drop_duplicates(subset=[columnas_clave['cliente']])
+        clientes = self._tabla_clientes(df_clientes, columnas_clave, lat_centro, lon_centro)
+        
+        print(f"📦 Configuración de rutas:")
+        print(f"   • Máximo clientes por ruta: {max_clientes}")
+        print(f"   • Máximo cajas por ruta: {max_cajas_por_ruta}")
+        print(f"   • Rutas disponibles: {rutas_disponibles if rutas_disponibles else 'Sin límite'}")
+        
+        rutas_indices = rutas_por_ahorros(
+            clientes['lat'], clientes['lon'], clientes['cajas'],
+            lat_centro, lon_centro, max_clientes, max_cajas_por_ruta,
+            vecinos=vecinos_candidatos, metodo=self.metodo_distancia
+        )
+        
+        return self._numerar_rutas(rutas_indices, clientes, rutas_disponibles)
+    
+    def _generar_rutas_barrido(self, df, columnas_clave, lat_centro, lon_centro, max_clientes, rutas_disponibles=None, max_cajas_por_ruta=694, angulo_inicial=None, angulos_probados=8):
+        """
+        Genera rutas con el algoritmo de barrido angular alrededor del centro
+        
+        Los clientes se ordenan por ángulo polar visto desde el centro y se
+        cortan en rutas con los límites de clientes y cajas, lo que da rutas
+        en forma de sector (ver algoritmos_ruteo.rutas_por_barrido). Si no se
+        indica un ángulo inicial se prueban varios en paralelo y se conserva
+        el que asigna más cajas con menor distancia total.
+        
+        Args:
+            angulo_inicial: Ángulo (grados, antihorario desde el este) donde empieza el barrido
+            angulos_probados: Ángulos iniciales equiespaciados a probar si no se indica uno
+        """
+        # Verificar y corregir coordenadas del centro si es necesario
+        if not (8 <= lat_centro <= 11) or not (-86 <= lon_centro <= -82):
+            print(f"⚠️  Corrigiendo coordenadas del centro de ({lat_centro:.4f}, {lon_centro:.4f}) a San José, Costa Rica")
+            lat_centro, lon_centro = 9.9281, -84.0907  # San José, Costa Rica
+        
+        # Un cliente por parada (la primera fila de cada cliente)
+        df_clientes = df.drop_duplicates(subset=[columnas_clave['cliente']])
+        clientes = self._tabla_clientes(df_clientes, columnas_clave, lat_centro, lon_centro)
+        lats, lons, cajas = clientes['lat'], clientes['lon'], clientes['cajas']
+        
+        print(f"📦 Configuración de rutas:")
+        print(f"   • Máximo clientes por ruta: {max_clientes}")
+        print(f"   • Máximo cajas por ruta: {max_cajas_por_ruta}")
+        print(f"   • Rutas disponibles: {rutas_disponibles if rutas_disponibles else 'Sin límite'}")
+        
+        angulos = [angulo_inicial] if angulo_inicial is not None else list(np.arange(angulos_probados) * 360.0 / angulos_probados)
+        
+        def evaluar(angulo):
+            rutas_indices = rutas_por_barrido(lats, lons, cajas, lat_centro, lon_centro, max_clientes, max_cajas_por_ruta, angulo)
+            conservadas, volumenes, _ = limitar_rutas(rutas_indices, cajas, rutas_disponibles)
+            distancia = float(distancia_rutas(conservadas, lats, lons, lat_centro, lon_centro, self.metodo_distancia).sum())
+            return float(volumenes.sum()), distancia, angulo, rutas_indices
+        
+        resultados = []
+        with ThreadPoolExecutor(max_workers=min(len(angulos), 8)) as ejecutor:
+            for resultado in ejecutor.map(evaluar, angulos):
+                resultados.append(resultado)
+                self._informar_progreso(len(resultados) / len(angulos), f'Barrido {len(resultados)} de {len(angulos)} ángulos evaluado')
+        
+        # Mejor ángulo: más cajas asignadas y, a igualdad, menor distancia total
+        cajas_asignadas, distancia, angulo, rutas_indices = max(resultados, key=lambda r: (r[0], -r[1]))
+        print(f"🧭 Barrido desde {angulo:.1f}° ({len(angulos)} ángulos probados): {distancia:,.1f} km en total")
+        
+        return self._numerar_rutas(rutas_indices, clientes, rutas_disponibles)
+    
+    def _numerar_rutas(self, rutas_indices, clientes, rutas_disponibles=None, por_volumen=True):
+        """
+        Crea el ConjuntoRutas a partir de rutas de índices de la tabla de clientes y muestra su resumen
+        
+        Args:
+            rutas_indices: Rutas como listas de índices de `clientes`, en orden de visita
+            clientes: Tabla de clientes (ver _tabla_clientes)
+            rutas_disponibles: Máximo de rutas a conservar
+            por_volumen: Si True, numera las rutas de mayor a menor volumen y conserva las de mayor
+                volumen; si False, respeta el orden de construcción y conserva las primeras
+        """
+        if por_volumen:
+            rutas_indices, _, descartadas = limitar_rutas(rutas_indices, clientes['cajas'], rutas_disponibles)
+        elif rutas_disponibles:
+            rutas_indices, descartadas = rutas_indices[:rutas_disponibles], rutas_indices[rutas_disponibles:]
+        else:
+            descartadas = []
+        if descartadas:
+            print(f"⚠️  Se alcanzó el límite de {rutas_disponibles} rutas disponibles "
+                  f"({len(descartadas)} rutas y {sum(len(ruta) for ruta in descartadas)} clientes sin asignar)")
+        
+        rutas = ConjuntoRutas(clientes, rutas_indices)
+        for numero, total_clientes, volumen in zip(rutas.numeros, rutas.total_clientes, rutas.total_cajas):
+            print(f"   Ruta {numero}: {total_clientes} clientes, {volumen:,.0f} cajas (prom: {volumen / total_clientes:,.1f})")
         
         print(f"🎯 Total de rutas generadas: {len(rutas)}")
-        print(f"📊 Total de clientes asignados: {len(clientes_asignados)}")
-        print(f"✅ Método _generar_rutas_por_proximidad completado exitosamente")
+        print(f"📊 Total de clientes asignados: {len(rutas.indice_cliente)}")
         return rutas
     
+    def mejorar_rutas(self, rutas, df_ordenado, columnas_clave, centro_coords, max_clientes_por_ruta, max_cajas_por_ruta=694, max_iteraciones=50, tiempo_limite=10.0, vecinos=10):
+        """
+        Mejora rutas ya construidas con búsqueda local entre rutas
+        
+        Aplica movimientos relocate, swap y 2-opt* entre rutas distintas (ver
+        algoritmos_ruteo.mejorar_entre_rutas) evaluados contra la matriz de
+        distancias persistida del centro. Nunca supera los límites de clientes
+        ni de cajas; las rutas que quedan vacías se eliminan.
+        
+        Args:
+            rutas: ConjuntoRutas (o lista de rutas) generado por cualquier método de ruteo
+            df_ordenado: DataFrame de paradas (o entregas) usado para generar las rutas
+            columnas_clave: Diccionario con nombres de columnas
+            centro_coords: Coordenadas (lat, lon) del centro de distribución
+            max_clientes_por_ruta: Máximo número de clientes por ruta
+            max_cajas_por_ruta: Máximo de cajas equivalentes por ruta
+            max_iteraciones: Máximo de pasadas sobre todas las paradas
+            tiempo_limite: Segundos máximos de búsqueda
+            vecinos: Paradas cercanas revisadas para cada parada
+        
+        Returns:
+            ConjuntoRutas: Rutas mejoradas
+        """
+        rutas = ConjuntoRutas.desde(rutas)
+        if len(rutas.indice_cliente) == 0:
+            return rutas
+        
+        print(f"🔧 Mejorando rutas con búsqueda local (máx. {max_iteraciones} pasadas, {tiempo_limite:.0f} s)...")
+        matriz, df_clientes = self.obtener_matriz_distancias(df_ordenado, columnas_clave)
+        filas_cliente = pd.Index(df_clientes[columnas_clave['cliente']]).get_indexer(rutas.columna('cliente'))
+        cercanos, _ = IndiceEspacial(rutas.lat, rutas.lon, clientes_por_celda=vecinos).k_vecinos_todos(vecinos)
+        
+        # Rutas como índices de parada
+        rutas_indices = [list(range(inicio, fin)) for inicio, fin in zip(rutas.inicios[:-1].tolist(), rutas.inicios[1:].tolist())]
+        
+        rutas_indices, resumen = mejorar_entre_rutas(
+            rutas_indices, matriz.matriz, matriz.posiciones[filas_cliente],
+            rutas.distancia_centro, rutas.cajas, cercanos,
+            max_clientes_por_ruta, max_cajas_por_ruta, max_iteraciones, tiempo_limite
+        )
+        
+        reduccion = resumen['distancia_inicial'] - resumen['distancia_final']
+        porcentaje = reduccion / resumen['distancia_inicial'] * 100 if resumen['distancia_inicial'] > 0 else 0
+        movimientos = ', '.join(f"{nombre}: {cantidad}" for nombre, cantidad in resumen['movimientos'].items())
+        print(f"✅ Búsqueda local: {resumen['distancia_inicial']:,.1f} km → {resumen['distancia_final']:,.1f} km "
+              f"(-{reduccion:,.1f} km, -{porcentaje:.1f}%) en {resumen['iteraciones']} pasadas y {resumen['tiempo']:.1f} s")
+        print(f"   Movimientos aplicados: {movimientos}")
+        if resumen['tiempo_agotado']:
+            print(f"⚠️  Se agotó el tiempo límite de {tiempo_limite:.0f} s")
+        self.ultima_mejora_rutas = resumen
+        
+        return ConjuntoRutas(rutas.clientes, [rutas.indice_cliente[ruta] for ruta in rutas_indices])
+    
+    def secuenciar_rutas(self, rutas, centro_coords, procesos=None):
+        """
+        Ordena las paradas de cada ruta (vecino más cercano + 2-opt/Or-opt)
+        
+        Las rutas se secuencian en paralelo en un grupo de procesos cuando son
+        muchas (ver algoritmos_ruteo.secuenciar_rutas). Cada cliente recibe su
+        'secuencia' (1 = primera parada) y 'distancia_tramo' (km desde la parada
+        anterior o desde el centro), y cada ruta su 'distancia_total' en km
+        incluyendo el regreso al centro.
+        
+        Args:
+            rutas: ConjuntoRutas o lista de rutas (se modifican en el mismo lugar)
+            centro_coords: Coordenadas (lat, lon) del centro de distribución
+            procesos: Procesos a usar (None = self.procesos, 1 = en serie)
+        """
+        lat_centro, lon_centro = centro_coords
+        
+        def progreso(secuenciadas, total):
+            self._informar_progreso(secuenciadas / total, f'Ruta {secuenciadas} de {total} secuenciada')
+        
+        if isinstance(rutas, ConjuntoRutas):
+            if len(rutas.indice_cliente) == 0:
+                return
+            tramos = [rutas.tramo(posicion) for posicion in range(len(rutas))]
+            coordenadas = [(rutas.lat[tramo], rutas.lon[tramo]) for tramo in tramos]
+            secuencias = secuenciar_rutas(coordenadas, lat_centro, lon_centro, self.metodo_distancia, procesos or self.procesos,
+                                          progreso=progreso)
+            rutas.reordenar(*zip(*secuencias))
+            print(f"🧭 Paradas secuenciadas en {len(rutas)} rutas: {np.nansum(rutas.distancia_total):,.1f} km en total")
+            return
+        
+        rutas = [ruta for ruta in rutas if ruta['clientes']]
+        if not rutas:
+            return
+        coordenadas = [
+            (np.array([cliente['lat'] for cliente in ruta['clientes']], dtype='float64'),
+             np.array([cliente['lon'] for cliente in ruta['clientes']], dtype='float64'))
+            for ruta in rutas
+        ]
+        secuencias = secuenciar_rutas(coordenadas, lat_centro, lon_centro, self.metodo_distancia, procesos or self.procesos,
+                                      progreso=progreso)
+        
+        distancia_total = 0.0
+        for ruta, (orden, tramos, regreso) in zip(rutas, secuencias):
+            clientes = [ruta['clientes'][i] for i in orden]
+            for posicion, (cliente, tramo) in enumerate(zip(clientes, tramos), 1):
+                cliente['secuencia'] = posicion
+                cliente['distancia_tramo'] = tramo
+            ruta['clientes'] = clientes
+            ruta['distancia_total'] = float(sum(tramos) + regreso)
+            distancia_total += ruta['distancia_total']
+        print(f"🧭 Paradas secuenciadas en {len(rutas)} rutas: {distancia_total:,.1f} km en total")
+    
     def mostrar_resultados(self, rutas, df_ordenado, columnas_clave, centro_coords):
         """Muestra los resultados del análisis de rutas"""
+        rutas = ConjuntoRutas.desde(rutas)
         print("\n" + "="*60)
         print("ANÁLISIS DE RUTAS SUGERIDAS")
         print("="*60)
@@ -490,8 +1169,10 @@ class AnalizadorRutas:
         print(f"Total de rutas generadas: {len(rutas)}")
         
         # Calcular promedios en lugar de sumatorias
-        total_cajas = sum(ruta['total_cajas'] for ruta in rutas)
-        total_clientes = sum(ruta['total_clientes'] for ruta in rutas)
+        cajas_rutas = rutas.total_cajas
+        clientes_rutas = rutas.total_clientes
+        total_cajas = cajas_rutas.sum()
+        total_clientes = clientes_rutas.sum()
         promedio_cajas_por_cliente = total_cajas / total_clientes if total_clientes > 0 else 0
         
         print(f"Total de cajas equivalentes: {total_cajas:,.0f}")
@@ -500,24 +1181,128 @@ class AnalizadorRutas:
         print(f"\n{'Ruta':<6} {'Clientes':<10} {'Cajas Totales':<15} {'Promedio Cajas':<15}")
         print("-" * 50)
         
-        for ruta in rutas:
-            promedio_cajas = ruta['total_cajas'] / ruta['total_clientes']
-            print(f"{ruta['ruta']:<6} {ruta['total_clientes']:<10} {ruta['total_cajas']:<15,.0f} {promedio_cajas:<15,.1f}")
+        for numero, clientes_ruta, cajas_ruta in zip(rutas.numeros, clientes_rutas, cajas_rutas):
+            promedio_cajas = cajas_ruta / clientes_ruta
+            print(f"{numero:<6} {clientes_ruta:<10} {cajas_ruta:<15,.0f} {promedio_cajas:<15,.1f}")
         
         # Mostrar detalles de cada ruta
-        for ruta in rutas:
-            print(f"\n--- RUTA {ruta['ruta']} ---")
-            print(f"Total cajas: {ruta['total_cajas']:,.0f}")
-            print(f"Total clientes: {ruta['total_clientes']}")
-            print(f"Promedio cajas por cliente: {ruta['total_cajas'] / ruta['total_clientes']:,.1f}")
+        ids = rutas.columna('cliente')
+        for posicion, (numero, clientes_ruta, cajas_ruta) in enumerate(zip(rutas.numeros, clientes_rutas, cajas_rutas)):
+            print(f"\n--- RUTA {numero} ---")
+            print(f"Total cajas: {cajas_ruta:,.0f}")
+            print(f"Total clientes: {clientes_ruta}")
+            print(f"Promedio cajas por cliente: {cajas_ruta / clientes_ruta:,.1f}")
             
             print("\nClientes en esta ruta:")
-            for i, cliente in enumerate(ruta['clientes'], 1):
-                print(f"{i:2d}. {cliente['cliente']:<30} {cliente['cajas']:>8,.0f} cajas "
-                      f"(dist: {cliente['distancia_centro']:.1f} km)")
+            tramo = rutas.tramo(posicion)
+            for i, (cliente, cajas, distancia) in enumerate(zip(ids[tramo], rutas.cajas[tramo], rutas.distancia_centro[tramo]), 1):
+                print(f"{i:2d}. {cliente:<30} {cajas:>8,.0f} cajas "
+                      f"(dist: {distancia:.1f} km)")
+    
+    def generar_artefactos(self, tareas, procesos=None):
+        """
+        Genera en paralelo archivos independientes (mapas y reportes Excel)
+        
+        Cada tarea llama a un método de generación en un proceso del grupo,
+        sobre un analizador sin datos cargados para no copiar el DataFrame
+        completo a cada proceso. El tiempo total se acerca al del archivo más
+        lento en lugar de la suma de todos.
+        
+        Args:
+            tareas: Lista de (tipo, nombre_archivo, método, argumentos[, opciones]); tipo es 'mapa' o 'excel' y
+                el método recibe los argumentos, nombre_archivo y las opciones como parámetros con nombre
+                (p. ej. ('mapa', ruta, 'generar_mapa', (rutas, centro_coords)))
+            procesos: Procesos del grupo (None = self.procesos o todos los núcleos, 1 = en serie)
+        
+        El avance se informa (ver al_progresar) cada vez que termina un archivo.
+        
+        Returns:
+            list: Archivos generados como {'tipo', 'archivo', 'nombre'} (el formato de
+            OrganizadorArchivos.archivos_generados), incluidos los anexos de los reportes
+        """
+        generador = AnalizadorRutas(self.archivo_excel, self.hoja_nombre, usar_cache=False, metodo_distancia=self.metodo_distancia)
+        trabajos = [(generador, *tarea[1:4], tarea[4] if len(tarea) > 4 else {}) for tarea in tareas]
+        trabajadores = min(procesos or self.procesos or os.cpu_count() or 1, len(trabajos))
+        
+        inicio = datetime.now()
+        resultados = None
+        if trabajadores > 1:
+            print(f"🧩 Generando {len(trabajos)} archivos en paralelo con {trabajadores} procesos...")
+            try:
+                with ProcessPoolExecutor(max_workers=trabajadores) as ejecutor:
+                    futuros = {ejecutor.submit(_generar_artefacto, trabajo): tarea for trabajo, tarea in zip(trabajos, tareas)}
+                    for generados, futuro in enumerate(as_completed(futuros), 1):
+                        self._informar_progreso(generados / len(futuros), f'Archivo {generados} de {len(futuros)} generado: {os.path.basename(futuros[futuro][1])}')
+                    resultados = [futuro.result() for futuro in futuros]
+            except (OSError, RuntimeError) as e:
+                print(f"⚠️  No se pudieron generar los archivos en paralelo ({e}); se generan en serie")
+        if resultados is None:
+            resultados = []
+            for trabajo, tarea in zip(trabajos, tareas):
+                resultados.append(_generar_artefacto(trabajo))
+                self._informar_progreso(len(resultados) / len(trabajos), f'Archivo {len(resultados)} de {len(trabajos)} generado: {os.path.basename(tarea[1])}')
+        
+        archivos = []
+        for (tipo, nombre_archivo, *_), anexos in zip(tareas, resultados):
+            archivos.append({'tipo': tipo, 'archivo': nombre_archivo, 'nombre': os.path.basename(nombre_archivo)})
+            archivos += [{'tipo': 'datos', 'archivo': anexo, 'nombre': os.path.basename(anexo)} for anexo in anexos or []]
+        print(f"✅ {len(archivos)} archivos generados en {(datetime.now() - inicio).total_seconds():.1f} s")
+        self.ultimos_artefactos = archivos
+        return archivos
+    
+    def _usar_capas_agrupadas(self, modo_mapa, paradas):
+        """Indica si el mapa se dibuja con capas agrupadas según el modo pedido y la cantidad de paradas"""
+        if modo_mapa not in self.MODOS_MAPA:
+            raise ValueError(f"Modo de mapa desconocido: {modo_mapa}. Opciones: {list(self.MODOS_MAPA)}")
+        if modo_mapa == 'auto':
+            return paradas >= self.UMBRAL_MAPA_AGRUPADO
+        return modo_mapa == 'geojson'
+    
+    def _capa_agrupada_ruta(self, mapa, nombre, color, lats, lons, propiedades):
+        """
+        Capa agrupada de una ruta para mapas grandes (modo 'geojson')
+        
+        Los puntos viajan como un solo arreglo JSON y un script crea en el
+        navegador un círculo del color de la ruta por punto, con su popup, y lo
+        agrega a un MarkerCluster de la ruta; así el HTML no repite un ícono y
+        un popup por cliente y cada punto (agrupado o no) abre su popup.
+        
+        Args:
+            mapa: Mapa al que se agregan el grupo y su script
+            nombre: Nombre de la capa en el control de capas
+            color: Color de la ruta (nombre de folium.Icon)
+            lats, lons: Coordenadas de las paradas
+            propiedades: Diccionario etiqueta del popup -> valores por parada
+        
+        Returns:
+            plugins.MarkerCluster: Grupo de la ruta, ya agregado al mapa
+        """
+        grupo = plugins.MarkerCluster(name=nombre, options={'disableClusteringAtZoom': 15})
+        grupo.add_to(mapa)
+        
+        puntos = [
+            [round(lat, 6), round(lon, 6), *valores]
+            for lat, lon, *valores in zip(lats, lons, *propiedades.values())
+        ]
+        estilo = {'radius': 7, 'color': '#333333', 'weight': 1, 'fillColor': COLORES_HEX.get(color, color), 'fillOpacity': 0.85}
+        ScriptMapa(SCRIPT_PUNTOS_RUTA % {
+            'grupo': grupo.get_name(),
+            'estilo': json.dumps(estilo),
+            'etiquetas': json.dumps(list(propiedades), ensure_ascii=False),
+            'puntos': json.dumps(puntos, separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/'),
+        }).add_to(mapa)
+        return grupo
     
-    def generar_mapa(self, rutas, centro_coords, nombre_archivo="mapa_rutas.html"):
-        """Genera un mapa interactivo con las rutas"""
+    def generar_mapa(self, rutas, centro_coords, nombre_archivo="mapa_rutas.html", modo_mapa='auto'):
+        """
+        Genera un mapa interactivo con las rutas
+        
+        Args:
+            rutas: ConjuntoRutas (o lista de rutas) a dibujar
+            centro_coords: (lat, lon) del centro de distribución
+            nombre_archivo: Ruta del HTML a crear
+            modo_mapa: 'marcadores', 'geojson' o 'auto' (ver MODOS_MAPA)
+        """
         # Asegurar que el directorio existe
         import os
         os.makedirs(os.path.dirname(nombre_archivo) if os.path.dirname(nombre_archivo) else '.', exist_ok=True)
@@ -545,17 +1330,30 @@ class AnalizadorRutas:
                   'pink', 'lightblue', 'lightgreen', 'gray', 'black', 'lightgray']
         
         # Agregar clientes y rutas al mapa
-        for i, ruta in enumerate(rutas):
+        rutas = ConjuntoRutas.desde(rutas)
+        ids = rutas.columna('cliente')
+        agrupada = self._usar_capas_agrupadas(modo_mapa, len(rutas.indice_cliente))
+        for i, numero in enumerate(rutas.numeros):
             color = colores[i % len(colores)]
+            tramo = rutas.tramo(i)
+            
+            if agrupada:
+                self._capa_agrupada_ruta(mapa, f"Ruta {numero}", color, rutas.lat[tramo].tolist(), rutas.lon[tramo].tolist(), {
+                    'Parada': rutas.secuencia[tramo].tolist(),
+                    'Cliente': [str(cliente) for cliente in ids[tramo]],
+                    'Cajas': np.round(rutas.cajas[tramo]).astype(np.int64).tolist(),
+                })
+                continue
             
             # Crear grupo para esta ruta
-            grupo_ruta = folium.FeatureGroup(name=f"Ruta {ruta['ruta']}")
+            grupo_ruta = folium.FeatureGroup(name=f"Ruta {numero}")
             
             # Agregar clientes de esta ruta
-            for cliente in ruta['clientes']:
+            for lat, lon, secuencia, cliente, cajas in zip(rutas.lat[tramo].tolist(), rutas.lon[tramo].tolist(), rutas.secuencia[tramo],
+                                                           ids[tramo], rutas.cajas[tramo]):
                 folium.Marker(
-                    [cliente['lat'], cliente['lon']],
-                    popup=f"Cliente: {cliente['cliente']}<br>Cajas: {cliente['cajas']:,.0f}",
+                    [lat, lon],
+                    popup=f"Parada: {secuencia}<br>Cliente: {cliente}<br>Cajas: {cajas:,.0f}",
                     icon=folium.Icon(color=color, icon='info-sign')
                 ).add_to(grupo_ruta)
             
@@ -568,8 +1366,16 @@ class AnalizadorRutas:
         mapa.save(nombre_archivo)
         print(f"\nMapa guardado como: {nombre_archivo}")
     
-    def generar_mapa_con_waze(self, rutas, centro_coords, nombre_archivo="mapa_rutas_waze.html"):
-        """Genera un mapa interactivo con las rutas e integración Waze"""
+    def generar_mapa_con_waze(self, rutas, centro_coords, nombre_archivo="mapa_rutas_waze.html", modo_mapa='auto'):
+        """
+        Genera un mapa interactivo con las rutas e integración Waze
+        
+        Args:
+            rutas: ConjuntoRutas (o lista de rutas) a dibujar
+            centro_coords: (lat, lon) del centro de distribución
+            nombre_archivo: Ruta del HTML a crear
+            modo_mapa: 'marcadores', 'geojson' o 'auto' (ver MODOS_MAPA)
+        """
         # Asegurar que el directorio existe
         import os
         os.makedirs(os.path.dirname(nombre_archivo) if os.path.dirname(nombre_archivo) else '.', exist_ok=True)
@@ -596,46 +1402,32 @@ class AnalizadorRutas:
                   'beige', 'darkblue', 'darkgreen', 'cadetblue', 'darkpurple', 'white', 
                   'pink', 'lightblue', 'lightgreen', 'gray', 'black', 'lightgray']
         
-        # Agregar clientes y rutas al mapa
-        for i, ruta in enumerate(rutas):
-            color = colores[i % len(colores)]
-            
-            # Crear grupo para esta ruta
-            grupo_ruta = folium.FeatureGroup(name=f"Ruta {ruta['ruta']}")
-            
-            # Agregar clientes de esta ruta
-            for cliente in ruta['clientes']:
-                # Crear enlace Waze
-                waze_url = f"https://waze.com/ul?ll={cliente['lat']},{cliente['lon']}&navigate=yes"
-                
-                # Crear popup con enlace Waze
-                popup_html = f"""
-                <div style="text-align: center;">
-                    <h5>Cliente: {cliente['cliente']}</h5>
-                    <p><strong>Cajas:</strong> {cliente['cajas']:,.0f}</p>
-                    <p><strong>Distancia:</strong> {cliente['distancia_centro']:.1f} km</p>
-                    <hr>
-                    <a href="{waze_url}" target="_blank" style="
-                        background-color: #33ccff; 
-                        color: white; 
-                        padding: 8px 16px; 
-                        text-decoration: none; 
-                        border-radius: 5px; 
-                        display: inline-block;
-                        margin-top: 5px;
-                    ">
-                        <i class="fas fa-car"></i> Abrir en Waze
-                    </a>
-                </div>
-                """
-                
-                folium.Marker(
-                    [cliente['lat'], cliente['lon']],
-                    popup=folium.Popup(popup_html, max_width=300),
-                    icon=folium.Icon(color=color, icon='info-sign')
-                ).add_to(grupo_ruta)
-            
+        # Un grupo por ruta (MarkerCluster en modo agrupado); los clientes se agregan
+        # desde un solo arreglo JSON y el popup con el enlace de Waze se arma al abrirlo
+        rutas = ConjuntoRutas.desde(rutas)
+        agrupar = self._usar_capas_agrupadas(modo_mapa, len(rutas.indice_cliente))
+        grupos = []
+        for numero in rutas.numeros:
+            grupo_ruta = (plugins.MarkerCluster(name=f"Ruta {numero}", options={'disableClusteringAtZoom': 15})
+                          if agrupar else folium.FeatureGroup(name=f"Ruta {numero}"))
             grupo_ruta.add_to(mapa)
+            grupos.append(grupo_ruta.get_name())
+        
+        clientes = list(zip(
+            np.round(rutas.lat, 6).tolist(), np.round(rutas.lon, 6).tolist(), rutas.posicion_ruta.tolist(),
+            rutas.secuencia.tolist(), [str(cliente) for cliente in rutas.columna('cliente')],
+            np.round(rutas.cajas).astype(np.int64).tolist(), np.round(rutas.distancia_centro, 1).tolist()
+        ))
+        colores_ruta = [colores[i % len(colores)] for i in range(len(rutas))]
+        if agrupar:
+            colores_ruta = [COLORES_HEX.get(color, color) for color in colores_ruta]
+        script = SCRIPT_CLIENTES_WAZE % {
+            'grupos': ', '.join(grupos),
+            'colores': json.dumps(colores_ruta),
+            'agrupar': 'true' if agrupar else 'false',
+            'clientes': json.dumps(clientes, separators=(',', ':'), ensure_ascii=False).replace('</', '<\\/'),
+        }
+        ScriptMapa(script).add_to(mapa)
         
         # Agregar control de capas
         folium.LayerControl().add_to(mapa)
@@ -673,153 +1465,154 @@ class AnalizadorRutas:
         mapa.save(nombre_archivo)
         print(f"\nMapa con integración Waze guardado como: {nombre_archivo}")
     
-    def generar_reporte_excel(self, rutas, df_ordenado, columnas_clave, nombre_archivo="reporte_rutas.xlsx"):
-        """Genera un reporte en Excel con las rutas sugeridas agrupadas por cliente"""
-        # Asegurar que el directorio existe
-        import os
-        os.makedirs(os.path.dirname(nombre_archivo) if os.path.dirname(nombre_archivo) else '.', exist_ok=True)
+    def generar_reporte_excel(self, rutas, df_ordenado, columnas_clave, nombre_archivo="reporte_rutas.xlsx", opciones_hojas=None):
+        """
+        Genera un reporte en Excel con las rutas sugeridas agrupadas por cliente
+        
+        El libro se escribe en streaming (ver escritor_reportes.EscritorReporte),
+        por lo que la memoria no crece con el tamaño de los datos originales.
+        
+        Args:
+            rutas: ConjuntoRutas (o lista de rutas) a reportar
+            df_ordenado: DataFrame con el detalle por entrega
+            columnas_clave: Diccionario con nombres de columnas
+            nombre_archivo: Ruta del libro a crear
+            opciones_hojas: Opciones por nombre de hoja para EscritorReporte.agregar_hoja, p. ej.
+                {'Datos Originales': {'max_filas': 50000, 'anexo': 'parquet'}} o {'Datos Originales': {'incluir': False}}
         
-        with pd.ExcelWriter(nombre_archivo, engine='openpyxl') as writer:
+        Returns:
+            list: Rutas de los archivos anexos generados
+        """
+        rutas = ConjuntoRutas.desde(rutas)
+        opciones_hojas = opciones_hojas or {}
+        with EscritorReporte(nombre_archivo) as escritor:
             
             # Hoja 1: Resumen de rutas
-            resumen_data = []
-            total_cajas = 0
-            total_clientes = 0
-            
-            for ruta in rutas:
-                resumen_data.append({
-                    'Ruta': ruta['ruta'],
-                    'Total Clientes': ruta['total_clientes'],
-                    'Total Cajas': ruta['total_cajas'],
-                    'Promedio Cajas por Cliente': ruta['total_cajas'] / ruta['total_clientes']
-                })
-                total_cajas += ruta['total_cajas']
-                total_clientes += ruta['total_clientes']
+            resumen = rutas.resumen()
+            total_cajas = resumen['total_cajas'].sum()
+            total_clientes = int(resumen['total_clientes'].sum())
+            df_resumen = pd.DataFrame({
+                'Ruta': resumen['ruta'].astype(object),
+                'Total Clientes': resumen['total_clientes'],
+                'Total Cajas': resumen['total_cajas'],
+                'Promedio Cajas por Cliente': resumen['total_cajas'] / resumen['total_clientes'],
+                'Distancia Total (km)': resumen['distancia_total']
+            })
             
             # Agregar fila de totales
-            resumen_data.append({
-                'Ruta': 'TOTAL',
-                'Total Clientes': total_clientes,
-                'Total Cajas': total_cajas,
-                'Promedio Cajas por Cliente': total_cajas / total_clientes if total_clientes > 0 else 0
+            df_resumen.loc[len(df_resumen)] = [
+                'TOTAL', total_clientes, total_cajas,
+                total_cajas / total_clientes if total_clientes > 0 else 0,
+                resumen['distancia_total'].sum()
+            ]
+            escritor.agregar_hoja('Resumen Rutas', df_resumen, **opciones_hojas.get('Resumen Rutas', {}))
+            
+            # Hoja 2: Detalle de clientes por ruta (agrupado por cliente), directo de los arreglos del conjunto
+            df_detalle_agrupado = rutas.a_dataframe().groupby(['ruta', 'cliente'], sort=False, dropna=False).agg(
+                secuencia=('secuencia', 'first'),
+                nombre_cliente=('nombre_cliente', 'first'),
+                ruta_dist=('ruta_dist', 'first'),
+                total_cajas=('cajas_total', 'sum'),
+                num_entregas=('num_entregas', 'sum'),
+                latitud=('lat', 'first'),
+                longitud=('lon', 'first'),
+                distancia_centro=('distancia_centro', 'first'),
+                distancia_tramo=('distancia_tramo', 'first')
+            ).reset_index()
+            df_detalle_agrupado = pd.DataFrame({
+                'Ruta': df_detalle_agrupado['ruta'],
+                'Secuencia': df_detalle_agrupado['secuencia'],
+                'Cliente': df_detalle_agrupado['cliente'],
+                'Nombre del Cliente': df_detalle_agrupado['nombre_cliente'],
+                'Ruta Dist.': df_detalle_agrupado['ruta_dist'],
+                'Total Cajas Equivalentes': df_detalle_agrupado['total_cajas'],
+                'Número de Entregas': df_detalle_agrupado['num_entregas'],
+                'Promedio Cajas por Entrega': df_detalle_agrupado['total_cajas'] / df_detalle_agrupado['num_entregas'],
+                'Latitud': df_detalle_agrupado['latitud'],
+                'Longitud': df_detalle_agrupado['longitud'],
+                'Distancia al Centro (km)': df_detalle_agrupado['distancia_centro'],
+                'Distancia Tramo (km)': df_detalle_agrupado['distancia_tramo']
             })
-            
-            df_resumen = pd.DataFrame(resumen_data)
-            df_resumen.to_excel(writer, sheet_name='Resumen Rutas', index=False)
-            
-            # Hoja 2: Detalle de clientes por ruta (agrupado por cliente)
-            detalle_agrupado = []
-            for ruta in rutas:
-                # Agrupar clientes por nombre para obtener totales
-                clientes_agrupados = {}
-                for cliente in ruta['clientes']:
-                    nombre_cliente = cliente['cliente']
-                    if nombre_cliente not in clientes_agrupados:
-                        clientes_agrupados[nombre_cliente] = {
-                            'ruta': ruta['ruta'],
-                            'cliente': nombre_cliente,
-                            'nombre_cliente': cliente.get('nombre_cliente', nombre_cliente),
-                            'total_cajas': 0,
-                            'latitud': cliente['lat'],
-                            'longitud': cliente['lon'],
-                            'distancia_centro': cliente['distancia_centro'],
-                            'ruta_dist': cliente.get('ruta_dist', 'Sin asignar'),
-                            'num_entregas': 0
-                        }
-                    clientes_agrupados[nombre_cliente]['total_cajas'] += cliente['cajas']
-                    clientes_agrupados[nombre_cliente]['num_entregas'] += 1
-                
-                # Agregar a la lista de detalles
-                for cliente_data in clientes_agrupados.values():
-                    detalle_agrupado.append({
-                        'Ruta': cliente_data['ruta'],
-                        'Cliente': cliente_data['cliente'],
-                        'Nombre del Cliente': cliente_data['nombre_cliente'],
-                        'Ruta Dist.': cliente_data['ruta_dist'],
-                        'Total Cajas Equivalentes': cliente_data['total_cajas'],
-                        'Número de Entregas': cliente_data['num_entregas'],
-                        'Promedio Cajas por Entrega': cliente_data['total_cajas'] / cliente_data['num_entregas'],
-                        'Latitud': cliente_data['latitud'],
-                        'Longitud': cliente_data['longitud'],
-                        'Distancia al Centro (km)': cliente_data['distancia_centro']
-                    })
-            
-            df_detalle_agrupado = pd.DataFrame(detalle_agrupado)
-            df_detalle_agrupado.to_excel(writer, sheet_name='Clientes por Ruta', index=False)
-            
-            # Hoja 3: Datos detallados con estructura web (como en las imágenes)
-            datos_detallados = []
-            for ruta in rutas:
-                for cliente in ruta['clientes']:
-                    # Obtener datos adicionales del DataFrame original
-                    cliente_id = cliente['cliente']
-                    cliente_row = df_ordenado[df_ordenado[columnas_clave['cliente']] == cliente_id].iloc[0] if len(df_ordenado[df_ordenado[columnas_clave['cliente']] == cliente_id]) > 0 else None
-                    
-                    datos_detallados.append({
-                        'Centro': cliente_row[columnas_clave['centro']] if cliente_row is not None else 'N/A',
-                        'dia': cliente_row.get('dia entrega', 'N/A') if cliente_row is not None else 'N/A',
-                        'Cliente': cliente_id,
-                        'Nombre de': cliente.get('nombre_cliente', cliente_id),
-                        'Ruta': ruta['ruta'],
-                        'Viaje': cliente_row.get('Viaje', 'N/A') if cliente_row is not None else 'N/A',
-                        'Latitud': cliente['lat'],
-                        'Longitud': cliente['lon'],
-                        'Provincia': cliente_row.get('Provincia', 'N/A') if cliente_row is not None else 'N/A',
-                        'Cantón': cliente_row.get('Cantón', 'N/A') if cliente_row is not None else 'N/A',
-                        'Distrito': cliente_row.get('Distrito', 'N/A') if cliente_row is not None else 'N/A',
-                        'Promedio de Cajas Equiv.': cliente['cajas']
-                    })
-            
-            df_detallado = pd.DataFrame(datos_detallados)
-            df_detallado.to_excel(writer, sheet_name='Datos Detallados Web', index=False)
+            escritor.agregar_hoja('Clientes por Ruta', df_detalle_agrupado, **opciones_hojas.get('Clientes por Ruta', {}))
+            
+            # Hoja 3: Datos detallados con estructura web, unida una sola vez a los atributos de cada cliente
+            df_paradas = rutas.a_dataframe(('ruta', 'cliente', 'nombre_cliente', 'lat', 'lon', 'cajas'))
+            atributos = self.atributos_por_cliente(df_ordenado, columnas_clave)
+            df_web = df_paradas.join(atributos, on='cliente')
+            encontrados = df_paradas['cliente'].isin(atributos.index)
+            if not encontrados.all():
+                for columna in atributos.columns:
+                    df_web[columna] = df_web[columna].astype(object).where(encontrados, 'N/A')
+            df_detallado = pd.DataFrame({
+                'Centro': df_web['Centro'],
+                'dia': df_web['dia'],
+                'Cliente': df_web['cliente'],
+                'Nombre de': df_web['nombre_cliente'],
+                'Ruta': df_web['ruta'],
+                'Viaje': df_web['Viaje'],
+                'Latitud': df_web['lat'],
+                'Longitud': df_web['lon'],
+                'Provincia': df_web['Provincia'],
+                'Cantón': df_web['Cantón'],
+                'Distrito': df_web['Distrito'],
+                'Promedio de Cajas Equiv.': df_web['cajas']
+            })
+            escritor.agregar_hoja('Datos Detallados Web', df_detallado, **opciones_hojas.get('Datos Detallados Web', {}))
             
             # Hoja 3: Resumen por cliente (todos los centros)
-            resumen_clientes = {}
-            for ruta in rutas:
-                for cliente in ruta['clientes']:
-                    nombre_cliente = cliente['cliente']
-                    if nombre_cliente not in resumen_clientes:
-                        resumen_clientes[nombre_cliente] = {
-                            'cliente': nombre_cliente,
-                            'total_cajas': 0,
-                            'num_entregas': 0,
-                            'rutas_asignadas': set(),
-                            'latitud': cliente['lat'],
-                            'longitud': cliente['lon']
-                        }
-                    resumen_clientes[nombre_cliente]['total_cajas'] += cliente['cajas']
-                    resumen_clientes[nombre_cliente]['num_entregas'] += 1
-                    resumen_clientes[nombre_cliente]['rutas_asignadas'].add(ruta['ruta'])
-            
-            # Convertir a lista para el DataFrame
-            resumen_clientes_list = []
-            for cliente_data in resumen_clientes.values():
-                resumen_clientes_list.append({
-                    'Cliente': cliente_data['cliente'],
-                    'Nombre del Cliente': cliente_data.get('nombre_cliente', cliente_data['cliente']),
-                    'Total Cajas Equivalentes': cliente_data['total_cajas'],
-                    'Número de Entregas': cliente_data['num_entregas'],
-                    'Promedio Cajas por Entrega': cliente_data['total_cajas'] / cliente_data['num_entregas'],
-                    'Rutas Asignadas': ', '.join(map(str, sorted(cliente_data['rutas_asignadas']))),
-                    'Latitud': cliente_data['latitud'],
-                    'Longitud': cliente_data['longitud']
-                })
-            
-            df_resumen_clientes = pd.DataFrame(resumen_clientes_list)
-            df_resumen_clientes.to_excel(writer, sheet_name='Resumen por Cliente', index=False)
+            df_paradas = rutas.a_dataframe(('ruta', 'cliente', 'nombre_cliente', 'cajas_total', 'num_entregas', 'lat', 'lon'))
+            por_cliente = df_paradas.groupby('cliente', sort=False, dropna=False)
+            resumen_clientes = por_cliente.agg(
+                nombre_cliente=('nombre_cliente', 'first'),
+                total_cajas=('cajas_total', 'sum'),
+                num_entregas=('num_entregas', 'sum'),
+                latitud=('lat', 'first'),
+                longitud=('lon', 'first')
+            )
+            rutas_asignadas = (df_paradas.drop_duplicates(['cliente', 'ruta']).sort_values('ruta', kind='stable')
+                               .groupby('cliente', sort=False, dropna=False)['ruta']
+                               .agg(lambda numeros: ', '.join(map(str, numeros))))
+            df_resumen_clientes = pd.DataFrame({
+                'Cliente': resumen_clientes.index,
+                'Nombre del Cliente': resumen_clientes['nombre_cliente'].to_numpy(),
+                'Total Cajas Equivalentes': resumen_clientes['total_cajas'].to_numpy(),
+                'Número de Entregas': resumen_clientes['num_entregas'].to_numpy(),
+                'Promedio Cajas por Entrega': (resumen_clientes['total_cajas'] / resumen_clientes['num_entregas']).to_numpy(),
+                'Rutas Asignadas': rutas_asignadas.reindex(resumen_clientes.index).to_numpy(),
+                'Latitud': resumen_clientes['latitud'].to_numpy(),
+                'Longitud': resumen_clientes['longitud'].to_numpy()
+            })
+            escritor.agregar_hoja('Resumen por Cliente', df_resumen_clientes, **opciones_hojas.get('Resumen por Cliente', {}))
             
             # Hoja 4: Datos originales filtrados
-            df_ordenado.to_excel(writer, sheet_name='Datos Originales', index=False)
+            escritor.agregar_hoja('Datos Originales', df_ordenado, **opciones_hojas.get('Datos Originales', {}))
         
         print(f"Reporte Excel guardado como: {nombre_archivo}")
         print(f"- Hoja 1: Resumen de rutas")
         print(f"- Hoja 2: Clientes agrupados por ruta")
         print(f"- Hoja 3: Resumen total por cliente")
         print(f"- Hoja 4: Datos originales")
+        return escritor.anexos
 
-    def _generar_proyeccion_semanal(self, df_limpio, columnas_clave, lat_centro, lon_centro, max_clientes_por_ruta, rutas_disponibles=None, max_cajas_por_ruta=694):
+    def _generar_proyeccion_semanal(self, df_limpio, columnas_clave, lat_centro, lon_centro, max_clientes_por_ruta, rutas_disponibles=None, max_cajas_por_ruta=694, carpetas_salida=None, perfil_capacidad=None, mejora_dias=True, modo_mapa='auto'):
         """
         Genera proyección de rutas para toda la semana
+        
+        Los clientes se reparten entre los días hábiles siguientes a hoy con
+        asignar_dias: cada cliente va a su día habitual de entrega (según
+        self.afinidad_dias) si cabe, las demás cajas se balancean entre los días y cada día usa
+        a lo sumo sus rutas disponibles (rutas_disponibles, o el valor del día
+        en perfil_capacidad; el sábado y el domingo solo se trabajan si el perfil
+        les asigna rutas).
+        
+        Después cada día se resuelve como una tarea independiente en un grupo de
+        procesos (ver algoritmos_ruteo.resolver_dias): búsqueda local entre las
+        rutas del día (mejora_dias: True, False o un diccionario con
+        max_iteraciones, tiempo_limite y vecinos) y secuenciación de sus paradas.
+        
+        El reporte Excel y los mapas de cada día (con el modo modo_mapa, ver
+        MODOS_MAPA) se generan en paralelo (ver generar_artefactos) dentro de
+        carpetas_salida['excel'] y carpetas_salida['mapa'].
         """
         from datetime import datetime, timedelta
         
@@ -832,7 +1625,7 @@ class AnalizadorRutas:
         fecha_actual = datetime.now()
         
         # Definir días de la semana
-        dias_semana = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+        dias_semana = DIAS_SEMANA
         
         # Calcular qué día de la semana es hoy
         dia_actual = fecha_actual.weekday()  # 0=Lunes, 1=Martes, ..., 6=Domingo
@@ -841,94 +1634,87 @@ class AnalizadorRutas:
         print(f"PROYECCIÓN SEMANAL DE RUTAS - Hoy es {dias_semana[dia_actual]}")
         print(f"{'='*60}")
         
-        # Crear lista de clientes con sus datos
-        clientes = []
-        for idx, row in df_limpio.iterrows():
-            cliente_data = {
-                'cliente': row[columnas_clave['cliente']],
-                'nombre_cliente': row[columnas_clave['nombre_cliente']] if columnas_clave['nombre_cliente'] else row[columnas_clave['cliente']],
-                'lat': row['latitud_limpia'],
-                'lon': row['longitud_limpia'],
-                'cajas': row[columnas_clave['cajas_equiv']],
-                'distancia_centro': geodesic((lat_centro, lon_centro), 
-                                           (row['latitud_limpia'], row['longitud_limpia'])).kilometers
-            }
-            
-            # Agregar información de Ruta Dist si existe
-            if columnas_clave['ruta_dist'] and not pd.isna(row[columnas_clave['ruta_dist']]):
-                cliente_data['ruta_dist'] = row[columnas_clave['ruta_dist']]
-            else:
-                cliente_data['ruta_dist'] = 'Sin asignar'
-            
-            clientes.append(cliente_data)
-        
-        # Ordenar clientes por volumen de cajas (descendente)
-        clientes.sort(key=lambda x: x['cajas'], reverse=True)
-        
-        # Distribuir clientes por días de la semana
-        proyeccion_semanal = {}
-        clientes_asignados = set()
-        
-        # Empezar desde el día siguiente al actual
+        # Días de trabajo a partir del día siguiente al actual y rutas disponibles en cada uno
+        perfil_capacidad = perfil_capacidad or {}
+        dias_trabajo = []
         for i in range(7):
-            dia_idx = (dia_actual + i + 1) % 7  # Siguiente día
-            dia_nombre = dias_semana[dia_idx]
-            
-            if dia_nombre in ['Sábado', 'Domingo']:
-                continue  # Saltar fines de semana
-            
-            proyeccion_semanal[dia_nombre] = []
-            rutas_dia = []
-            ruta_actual = []
-            volumen_ruta = 0
-            
-            # Asignar clientes no asignados a este día
-            for cliente in clientes:
-                if cliente['cliente'] in clientes_asignados:
-                    continue
-                
-                # Verificar si agregar este cliente excedería los límites
-                excede_clientes = len(ruta_actual) >= max_clientes_por_ruta
-                excede_cajas = (volumen_ruta + cliente['cajas']) > max_cajas_por_ruta
-                
-                if excede_clientes or excede_cajas:
-                    if ruta_actual:
-                        rutas_dia.append({
-                            'ruta': len(rutas_dia) + 1,
-                            'clientes': ruta_actual.copy(),
-                            'total_cajas': volumen_ruta,
-                            'total_clientes': len(ruta_actual)
-                        })
-                    ruta_actual = []
-                    volumen_ruta = 0
-                
-                ruta_actual.append(cliente)
-                volumen_ruta += cliente['cajas']
-                clientes_asignados.add(cliente['cliente'])
-            
-            # Agregar la última ruta del día si tiene clientes
-            if ruta_actual:
-                rutas_dia.append({
-                    'ruta': len(rutas_dia) + 1,
-                    'clientes': ruta_actual.copy(),
-                    'total_cajas': volumen_ruta,
-                    'total_clientes': len(ruta_actual)
+            dia_nombre = dias_semana[(dia_actual + i + 1) % 7]
+            if dia_nombre in ['Sábado', 'Domingo'] and not perfil_capacidad.get(dia_nombre):
+                continue  # Saltar fines de semana salvo que el perfil les asigne rutas
+            dias_trabajo.append(dia_nombre)
+        capacidades = [perfil_capacidad.get(dia, rutas_disponibles) for dia in dias_trabajo]
+        print("📅 Rutas disponibles por día: " + ", ".join(
+            f"{dia} {capacidad if capacidad is not None else 'sin límite'}" for dia, capacidad in zip(dias_trabajo, capacidades)
+        ))
+        
+        # Tabla de clientes y reparto entre días y rutas
+        self._tramo(10, 15, 'Repartiendo clientes entre los días de la semana...')
+        tabla = self._tabla_clientes(df_limpio, columnas_clave, lat_centro, lon_centro)
+        cajas = np.asarray(tabla['cajas'], dtype='float64')
+        # Cada cliente prefiere el día de la semana en que más entregas ha tenido
+        preferidos = self.dias_preferidos(tabla['cliente'], dias_trabajo)
+        if self.afinidad_dias is not None:
+            print(f"📅 {int((preferidos >= 0).sum())} de {len(cajas)} clientes tienen un día habitual de entrega")
+        rutas_por_dia, sin_asignar = asignar_dias(cajas, capacidades, max_clientes_por_ruta, max_cajas_por_ruta, preferidos)
+        if sin_asignar:
+            print(f"⚠️  {len(sin_asignar)} clientes ({cajas[sin_asignar].sum():,.0f} cajas) no caben en las rutas disponibles de la semana")
+        
+        # Resolver cada día en paralelo: búsqueda local entre sus rutas y secuenciación
+        mejora = None
+        if mejora_dias:
+            mejora = {'max_iteraciones': 50, 'tiempo_limite': 5.0, 'vecinos': 10}
+            mejora.update(mejora_dias if isinstance(mejora_dias, dict) else {})
+        print(f"🔄 Resolviendo {sum(1 for rutas in rutas_por_dia if rutas)} días"
+              f"{' con búsqueda local entre rutas' if mejora else ''}...")
+        self._tramo(15, 70, 'Resolviendo las rutas de cada día...')
+        resultados = resolver_dias(rutas_por_dia, tabla['lat'], tabla['lon'], cajas, lat_centro, lon_centro,
+                                   max_clientes_por_ruta, max_cajas_por_ruta, self.metodo_distancia, mejora, self.procesos,
+                                   progreso=lambda resueltos, total: self._informar_progreso(resueltos / total, f'Día {resueltos} de {total} resuelto'))
+        
+        columnas = {atributo: np.asarray(valores).tolist() for atributo, valores in tabla.items()}
+        proyeccion_semanal = {}
+        for dia, resultado in zip(dias_trabajo, resultados):
+            proyeccion_semanal[dia] = []
+            if resultado is None:
+                continue
+            rutas_dia, tramos_dia, regresos, resumen = resultado
+            if resumen:
+                print(f"   {dia}: {resumen['distancia_inicial']:,.1f} km → {resumen['distancia_final']:,.1f} km con búsqueda local")
+            
+            # Rutas del día de mayor a menor volumen
+            volumenes = np.array([cajas[ruta].sum() for ruta in rutas_dia])
+            for numero, posicion in enumerate(np.argsort(-volumenes, kind='stable').tolist(), 1):
+                clientes_ruta = []
+                for secuencia, (i, tramo) in enumerate(zip(rutas_dia[posicion], tramos_dia[posicion]), 1):
+                    cliente = {atributo: valores[i] for atributo, valores in columnas.items()}
+                    cliente['secuencia'] = secuencia
+                    cliente['distancia_tramo'] = tramo
+                    clientes_ruta.append(cliente)
+                proyeccion_semanal[dia].append({
+                    'ruta': numero,
+                    'clientes': clientes_ruta,
+                    'total_cajas': float(volumenes[posicion]),
+                    'total_clientes': len(clientes_ruta),
+                    'distancia_total': float(sum(tramos_dia[posicion]) + regresos[posicion])
                 })
-            
-            proyeccion_semanal[dia_nombre] = rutas_dia
-            
-            # Si no quedan clientes por asignar, salir del bucle
-            if len(clientes_asignados) == len(clientes):
-                break
+        distancia_semana = sum(ruta['distancia_total'] for rutas in proyeccion_semanal.values() for ruta in rutas)
+        print(f"🧭 Proyección resuelta: {sum(len(rutas) for rutas in proyeccion_semanal.values())} rutas, {distancia_semana:,.1f} km en total")
         
         # Mostrar proyección semanal
         self._mostrar_proyeccion_semanal(proyeccion_semanal, dias_semana, dia_actual)
         
-        # Generar reporte de proyección
-        self._generar_reporte_proyeccion_semanal(proyeccion_semanal, columnas_clave)
-        
-        # Generar mapas por día
-        self._generar_mapas_proyeccion_semanal(proyeccion_semanal, lat_centro, lon_centro)
+        # Generar reporte de proyección y mapas por día
+        carpetas_salida = carpetas_salida or {}
+        nombre_reporte = f"proyeccion_semanal_rutas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        tareas = [('excel', os.path.join(carpetas_salida.get('excel', ''), nombre_reporte),
+                   '_generar_reporte_proyeccion_semanal', (proyeccion_semanal, columnas_clave))]
+        tareas += [
+            ('mapa', os.path.join(carpetas_salida.get('mapa', ''), f"mapa_proyeccion_{dia.lower()}.html"),
+             '_generar_mapa_proyeccion_dia', (dia, rutas, lat_centro, lon_centro), {'modo_mapa': modo_mapa})
+            for dia, rutas in proyeccion_semanal.items() if rutas
+        ]
+        self._tramo(70, 100, 'Generando reporte y mapas por día...')
+        self.generar_artefactos(tareas)
         
         return proyeccion_semanal
 
@@ -981,11 +1767,11 @@ class AnalizadorRutas:
         print(f"Promedio cajas por cliente: {promedio_semanal:,.1f}")
         print(f"Promedio cajas por ruta: {total_cajas_semana/total_rutas_semana:,.0f}")
 
-    def _generar_reporte_proyeccion_semanal(self, proyeccion_semanal, columnas_clave):
+    def _generar_reporte_proyeccion_semanal(self, proyeccion_semanal, columnas_clave, nombre_archivo=None):
         """Genera reporte Excel de la proyección semanal agrupado por cliente"""
-        nombre_archivo = f"proyeccion_semanal_rutas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        nombre_archivo = nombre_archivo or f"proyeccion_semanal_rutas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         
-        with pd.ExcelWriter(nombre_archivo, engine='openpyxl') as writer:
+        with EscritorReporte(nombre_archivo) as escritor:
             
             # Hoja 1: Resumen semanal
             resumen_semanal = []
@@ -1008,7 +1794,7 @@ class AnalizadorRutas:
                 })
             
             df_resumen = pd.DataFrame(resumen_semanal)
-            df_resumen.to_excel(writer, sheet_name='Resumen Semanal', index=False)
+            escritor.agregar_hoja('Resumen Semanal', df_resumen)
             
             # Hoja 2: Datos detallados con estructura web para toda la semana
             datos_detallados_semana = []
@@ -1024,6 +1810,8 @@ class AnalizadorRutas:
                             'Cliente': cliente['cliente'],
                             'Nombre de': cliente.get('nombre_cliente', cliente['cliente']),
                             'Ruta': ruta['ruta'],
+                            'Secuencia': cliente.get('secuencia'),
+                            'Distancia Tramo (km)': cliente.get('distancia_tramo'),
                             'Viaje': 'N/A',  # Se puede obtener del DataFrame original si es necesario
                             'Latitud': cliente['lat'],
                             'Longitud': cliente['lon'],
@@ -1034,7 +1822,7 @@ class AnalizadorRutas:
                         })
             
             df_detallado_semana = pd.DataFrame(datos_detallados_semana)
-            df_detallado_semana.to_excel(writer, sheet_name='Datos Detallados Web', index=False)
+            escritor.agregar_hoja('Datos Detallados Web', df_detallado_semana)
             
             # Hoja 2: Clientes agrupados por día
             for dia, rutas in proyeccion_semanal.items():
@@ -1058,8 +1846,8 @@ class AnalizadorRutas:
                             'distancia_centro': cliente['distancia_centro'],
                             'ruta_dist': cliente.get('ruta_dist', 'Sin asignar')
                         }
-                        clientes_agrupados[nombre_cliente]['total_cajas'] += cliente['cajas']
-                        clientes_agrupados[nombre_cliente]['num_entregas'] += 1
+                        clientes_agrupados[nombre_cliente]['total_cajas'] += cliente.get('cajas_total', cliente['cajas'])
+                        clientes_agrupados[nombre_cliente]['num_entregas'] += cliente.get('num_entregas', 1)
                         clientes_agrupados[nombre_cliente]['rutas_asignadas'].add(ruta['ruta'])
                 
                 # Convertir a lista para el DataFrame
@@ -1079,7 +1867,7 @@ class AnalizadorRutas:
                     })
                 
                 df_detalle = pd.DataFrame(detalle_dia_agrupado)
-                df_detalle.to_excel(writer, sheet_name=f'Clientes_{dia}', index=False)
+                escritor.agregar_hoja(f'Clientes_{dia}', df_detalle)
             
             # Hoja 3: Resumen total por cliente (toda la semana)
             resumen_clientes_semana = {}
@@ -1100,8 +1888,8 @@ class AnalizadorRutas:
                                 'latitud': cliente['lat'],
                                 'longitud': cliente['lon']
                             }
-                        resumen_clientes_semana[nombre_cliente]['total_cajas'] += cliente['cajas']
-                        resumen_clientes_semana[nombre_cliente]['num_entregas'] += 1
+                        resumen_clientes_semana[nombre_cliente]['total_cajas'] += cliente.get('cajas_total', cliente['cajas'])
+                        resumen_clientes_semana[nombre_cliente]['num_entregas'] += cliente.get('num_entregas', 1)
                         resumen_clientes_semana[nombre_cliente]['dias_asignados'].add(dia)
                         resumen_clientes_semana[nombre_cliente]['rutas_asignadas'].add(f"{dia}-R{ruta['ruta']}")
             
@@ -1120,66 +1908,76 @@ class AnalizadorRutas:
                 })
             
             df_resumen_clientes = pd.DataFrame(resumen_clientes_list)
-            df_resumen_clientes.to_excel(writer, sheet_name='Resumen_Clientes_Semana', index=False)
+            escritor.agregar_hoja('Resumen_Clientes_Semana', df_resumen_clientes)
         
         print(f"\n📄 Reporte de proyección semanal guardado como: {nombre_archivo}")
         print(f"- Hoja 1: Resumen semanal")
         print(f"- Hoja 2: Clientes agrupados por día")
         print(f"- Hoja 3: Resumen total por cliente (toda la semana)")
 
-    def _generar_mapas_proyeccion_semanal(self, proyeccion_semanal, lat_centro, lon_centro):
-        """Genera mapas interactivos para cada día de la proyección"""
-        for dia, rutas in proyeccion_semanal.items():
-            if not rutas:
-                continue
-                
-            nombre_archivo = f"mapa_proyeccion_{dia.lower()}.html"
-            
-            # Crear mapa
-            mapa = folium.Map(location=(lat_centro, lon_centro), zoom_start=12)
+    def _generar_mapa_proyeccion_dia(self, dia, rutas, lat_centro, lon_centro, nombre_archivo=None, modo_mapa='auto'):
+        """Genera el mapa interactivo de un día de la proyección (modo_mapa: ver MODOS_MAPA)"""
+        nombre_archivo = nombre_archivo or f"mapa_proyeccion_{dia.lower()}.html"
+        
+        # Crear mapa
+        mapa = folium.Map(location=(lat_centro, lon_centro), zoom_start=12)
+        
+        # Agregar marcador del centro
+        folium.Marker(
+            (lat_centro, lon_centro),
+            popup="Centro de Distribución",
+            icon=folium.Icon(color='red', icon='info-sign')
+        ).add_to(mapa)
+        
+        # Colores para las rutas
+        colores = ['blue', 'green', 'purple', 'orange', 'darkred', 'lightred', 
+                  'beige', 'darkblue', 'darkgreen', 'cadetblue', 'darkpurple', 'white', 
+                  'pink', 'lightblue', 'lightgreen', 'gray', 'black', 'lightgray']
+        
+        # Agregar rutas al mapa
+        agrupada = self._usar_capas_agrupadas(modo_mapa, sum(len(ruta['clientes']) for ruta in rutas))
+        for i, ruta in enumerate(rutas):
+            color = colores[i % len(colores)]
             
-            # Agregar marcador del centro
-            folium.Marker(
-                (lat_centro, lon_centro),
-                popup="Centro de Distribución",
-                icon=folium.Icon(color='red', icon='info-sign')
+            # Crear coordenadas de la ruta
+            coordenadas = [(lat_centro, lon_centro)]  # Empezar desde el centro
+            for cliente in ruta['clientes']:
+                coordenadas.append((cliente['lat'], cliente['lon']))
+            coordenadas.append((lat_centro, lon_centro))  # Volver al centro
+            
+            # Agregar línea de la ruta
+            folium.PolyLine(
+                coordenadas,
+                weight=3,
+                color=color,
+                opacity=0.8,
+                popup=f"Ruta {ruta['ruta']}: {ruta['total_clientes']} clientes, {ruta['total_cajas']:,.0f} cajas"
             ).add_to(mapa)
             
-            # Colores para las rutas
-            colores = ['blue', 'green', 'purple', 'orange', 'darkred', 'lightred', 
-                      'beige', 'darkblue', 'darkgreen', 'cadetblue', 'darkpurple', 'white', 
-                      'pink', 'lightblue', 'lightgreen', 'gray', 'black', 'lightgray']
+            # Agregar clientes
+            if agrupada:
+                self._capa_agrupada_ruta(mapa, f"Ruta {ruta['ruta']}", color, [lat for lat, _ in coordenadas[1:-1]],
+                                         [lon for _, lon in coordenadas[1:-1]], {
+                    'Cliente': [str(cliente['cliente']) for cliente in ruta['clientes']],
+                    'Cajas': [round(cliente['cajas']) for cliente in ruta['clientes']],
+                    'Ruta': [ruta['ruta']] * len(ruta['clientes']),
+                    'Parada': [cliente.get('secuencia', '-') for cliente in ruta['clientes']],
+                })
+                continue
             
-            # Agregar rutas al mapa
-            for i, ruta in enumerate(rutas):
-                color = colores[i % len(colores)]
-                
-                # Crear coordenadas de la ruta
-                coordenadas = [(lat_centro, lon_centro)]  # Empezar desde el centro
-                for cliente in ruta['clientes']:
-                    coordenadas.append((cliente['lat'], cliente['lon']))
-                coordenadas.append((lat_centro, lon_centro))  # Volver al centro
-                
-                # Agregar línea de la ruta
-                folium.PolyLine(
-                    coordenadas,
-                    weight=3,
-                    color=color,
-                    opacity=0.8,
-                    popup=f"Ruta {ruta['ruta']}: {ruta['total_clientes']} clientes, {ruta['total_cajas']:,.0f} cajas"
+            for j, cliente in enumerate(ruta['clientes']):
+                folium.Marker(
+                    (cliente['lat'], cliente['lon']),
+                    popup=f"Cliente: {cliente['cliente']}<br>Cajas: {cliente['cajas']:,.0f}<br>Ruta: {ruta['ruta']} (parada {cliente.get('secuencia', '-')})",
+                    icon=folium.Icon(color=color, icon='info-sign')
                 ).add_to(mapa)
-                
-                # Agregar marcadores de clientes
-                for j, cliente in enumerate(ruta['clientes']):
-                    folium.Marker(
-                        (cliente['lat'], cliente['lon']),
-                        popup=f"Cliente: {cliente['cliente']}<br>Cajas: {cliente['cajas']:,.0f}<br>Ruta: {ruta['ruta']}",
-                        icon=folium.Icon(color=color, icon='info-sign')
-                    ).add_to(mapa)
-            
-            # Guardar mapa
-            mapa.save(nombre_archivo)
-            print(f"🗺️  Mapa para {dia} guardado como: {nombre_archivo}")
+        
+        if agrupada:
+            folium.LayerControl().add_to(mapa)
+        
+        # Guardar mapa
+        mapa.save(nombre_archivo)
+        print(f"🗺️  Mapa para {dia} guardado como: {nombre_archivo}")
 
 def main():
     """Función principal para ejecutar el análisis"""
@@ -1,17 +1,18 @@
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, send_file, redirect, url_for, stream_with_context
 import os
+import copy
 import json
-import pandas as pd
 from datetime import datetime
 from analisis_rutas import AnalizadorRutas
 from organizador_archivos import OrganizadorArchivos
-import threading
+from trabajos import GestorTrabajos, ColaLlenaError
+from cache_resultados import CacheResultados, clave_resultado
 import time
 
 app = Flask(__name__)
 app.secret_key = 'tu_clave_secreta_aqui'
 
-# Variables globales para el estado del análisis
+# Variables globales: analizador con los datos cargados y estado de la carga
 analizador = None
 organizador = OrganizadorArchivos()
 estado_analisis = {
@@ -22,6 +23,18 @@ estado_analisis = {
     'error': None
 }
 
+# Análisis en curso: cada uno es un trabajo con su propio estado (ver trabajos.GestorTrabajos)
+MAX_ANALISIS_SIMULTANEOS = 2
+MAX_ANALISIS_EN_COLA = 10
+gestor_trabajos = GestorTrabajos(max_trabajadores=MAX_ANALISIS_SIMULTANEOS, max_en_cola=MAX_ANALISIS_EN_COLA)
+
+# Resultados de análisis ya ejecutados con los mismos datos y parámetros (memoria y Data/.cache/resultados)
+cache_resultados = CacheResultados()
+
+# Eventos de progreso (SSE): separación mínima entre eventos y latido para mantener viva la conexión
+INTERVALO_EVENTOS_SSE = 0.25
+LATIDO_SSE = 15
+
 def verificar_archivo_datos():
     """Verifica si existe el archivo de datos"""
     archivo_excel = "Data/REP PLR ESTATUS ENTREGAS v25.xlsx"
@@ -99,179 +112,289 @@ def cargar_datos():
 
 @app.route('/ejecutar_analisis', methods=['POST'])
 def ejecutar_analisis():
-    """Ejecuta el análisis de rutas"""
-    global analizador, organizador, estado_analisis
+    """Encola un análisis de rutas y devuelve el identificador de su trabajo"""
+    global analizador, organizador
     
     try:
+        if analizador is None or analizador.df is None:
+            return jsonify({'success': False, 'error': 'Primero debe cargar los datos'})
+        
         data = request.get_json()
         centro = data.get('centro')
         tipo_analisis = data.get('tipo_analisis', 'normal')
         max_clientes = int(data.get('max_clientes', 15))
         max_cajas = int(data.get('max_cajas', 694))
         rutas_disponibles = data.get('rutas_disponibles')
-        if rutas_disponibles:
-            rutas_disponibles = int(rutas_disponibles)
+        rutas_disponibles = int(rutas_disponibles) if rutas_disponibles else None  # Vacío = sin límite
         dia_semana = data.get('dia_semana', '')
         generar_proyeccion = data.get('generar_proyeccion', False)
         waze_integration = data.get('waze_integration', False)
+        modo_mapa = data.get('modo_mapa') or 'auto'
+        if modo_mapa not in AnalizadorRutas.MODOS_MAPA:
+            return jsonify({'success': False, 'error': f'Modo de mapa desconocido: {modo_mapa}'})
+        # Rutas disponibles por día de la proyección semanal, p. ej. {"Viernes": 3, "Sábado": 2}
+        perfil_capacidad = {
+            dia: int(rutas) if rutas not in (None, '') else None
+            for dia, rutas in (data.get('perfil_capacidad') or {}).items()
+        }
         
-        # Crear carpeta para el reporte
-        carpeta_reporte = organizador.crear_carpeta_reporte(centro, tipo_analisis)
+        # Método de ruteo: campo explícito o tipo de análisis con nombre de método ('normal' = proximidad)
+        metodo_ruteo = data.get('metodo_ruteo') or (
+            tipo_analisis if tipo_analisis in AnalizadorRutas.METODOS_RUTEO else 'proximidad'
+        )
+        if metodo_ruteo not in AnalizadorRutas.METODOS_RUTEO:
+            return jsonify({'success': False, 'error': f'Método de ruteo desconocido: {metodo_ruteo}'})
+        
+        parametros = {
+            'centro': centro, 'tipo_analisis': tipo_analisis, 'max_clientes': max_clientes, 'max_cajas': max_cajas,
+            'rutas_disponibles': rutas_disponibles, 'dia_semana': dia_semana, 'generar_proyeccion': generar_proyeccion,
+            'waze_integration': waze_integration, 'metodo_ruteo': metodo_ruteo, 'modo_mapa': modo_mapa,
+            'perfil_capacidad': perfil_capacidad,
+        }
+        descripcion = f"{centro or 'TODOS'} ({tipo_analisis})"
         
-        # Ejecutar análisis en un hilo separado
-        thread = threading.Thread(target=ejecutar_analisis_thread, args=(
-            centro, tipo_analisis, max_clientes, rutas_disponibles, max_cajas, dia_semana, generar_proyeccion, waze_integration
-        ))
-        thread.start()
+        # Mismos datos y parámetros que un análisis anterior: se devuelve su resultado sin recalcular
+        clave_cache = clave_resultado(analizador.huella_datos, parametros_normalizados(parametros, analizador))
+        entrada = cache_resultados.obtener(clave_cache) if data.get('usar_cache', True) else None
+        if entrada is not None:
+            trabajo = gestor_trabajos.registrar_completado(
+                entrada['resultado'], descripcion, parametros, mensaje='Resultado tomado de un análisis anterior'
+            )
+            analizador_trabajo = copy.copy(analizador)
+            analizador_trabajo.ultimas_rutas_generadas = entrada['rutas']
+            analizador_trabajo.ultima_proyeccion_generada = entrada['proyeccion']
+            trabajo.contexto['analizador'] = analizador_trabajo
+            return jsonify({
+                'success': True,
+                'mensaje': 'Resultado tomado de un análisis anterior',
+                'desde_cache': True,
+                'id_trabajo': trabajo.id,
+                'estado_url': url_for('estado_trabajo', id_trabajo=trabajo.id),
+                'carpeta_reporte': entrada['resultado']['carpeta_reporte'],
+                'resultado': entrada['resultado']
+            })
+        
+        # Cada trabajo usa su propia copia del analizador (comparte los datos cargados, no los resultados)
+        # y su propio organizador; la carpeta del reporte se crea cuando el trabajo empieza
+        organizador_trabajo = OrganizadorArchivos(organizador.carpeta_base)
+        trabajo = gestor_trabajos.enviar(
+            ejecutar_analisis_thread, copy.copy(analizador), organizador_trabajo,
+            centro, tipo_analisis, max_clientes, rutas_disponibles, max_cajas, dia_semana, generar_proyeccion,
+            waze_integration, metodo_ruteo, modo_mapa, perfil_capacidad, clave_cache=clave_cache,
+            descripcion=descripcion, parametros=parametros
+        )
         
         return jsonify({
             'success': True,
-            'mensaje': 'Análisis iniciado',
-            'carpeta_reporte': carpeta_reporte
-        })
-        
+            'mensaje': 'Análisis en cola',
+            'desde_cache': False,
+            'id_trabajo': trabajo.id,
+            'estado_url': url_for('estado_trabajo', id_trabajo=trabajo.id),
+            'eventos_url': url_for('eventos_trabajo', id_trabajo=trabajo.id)
+        }), 202
+    
+    except ColaLlenaError as e:
+        # Contrapresión: el cliente debe reintentar más tarde
+        return jsonify({'success': False, 'error': str(e)}), 429, {'Retry-After': '30'}
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
-def ejecutar_analisis_thread(centro, tipo_analisis, max_clientes, rutas_disponibles, max_cajas, dia_semana, generar_proyeccion, waze_integration):
-    """Ejecuta el análisis en un hilo separado"""
-    global analizador, organizador, estado_analisis
+def parametros_normalizados(parametros, analizador):
+    """
+    Parámetros de un análisis en forma canónica para la clave de la caché de resultados
     
-    try:
-        estado_analisis['en_proceso'] = True
-        estado_analisis['progreso'] = 0
-        estado_analisis['mensaje'] = 'Iniciando análisis...'
-        
-        # Filtrar por centro
-        if centro and centro != "TODOS":
-            estado_analisis['progreso'] = 20
-            estado_analisis['mensaje'] = f'Filtrando datos del centro {centro}...'
-            
-            resultado = analizador.filtrar_por_centro(centro)
-            if resultado is None:
-                estado_analisis['error'] = f'Error al filtrar el centro {centro}'
-                return
-            
-            df_filtrado, columnas_clave = resultado
-        else:
-            estado_analisis['progreso'] = 20
-            estado_analisis['mensaje'] = 'Analizando todos los centros...'
-            
-            df_filtrado = analizador.df
-            columnas_clave = analizador.identificar_columnas_clave()
-        
-        # Filtrar por día de la semana si se especifica
-        if dia_semana:
-            estado_analisis['progreso'] = 30
-            estado_analisis['mensaje'] = f'Filtrando por día: {dia_semana}...'
-            
-            # Buscar columna de fecha de entrega
-            if 'Fe.Entrega' in df_filtrado.columns:
-                # Extraer el día de la semana de la fecha de entrega
-                df_filtrado['dia_semana'] = df_filtrado['Fe.Entrega'].dt.day_name()
-                
-                # Mapear nombres de días en español
-                mapeo_dias = {
-                    'Monday': 'Lunes',
-                    'Tuesday': 'Martes', 
-                    'Wednesday': 'Miércoles',
-                    'Thursday': 'Jueves',
-                    'Friday': 'Viernes',
-                    'Saturday': 'Sábado',
-                    'Sunday': 'Domingo'
-                }
-                
-                # Aplicar el mapeo
-                df_filtrado['dia_semana'] = df_filtrado['dia_semana'].map(mapeo_dias)
-                
-                # Filtrar por el día especificado
-                df_filtrado = df_filtrado[df_filtrado['dia_semana'] == dia_semana].copy()
-                
-                if len(df_filtrado) == 0:
-                    estado_analisis['error'] = f'No se encontraron datos para el día {dia_semana}'
-                    return
-                else:
-                    print(f"✅ Filtrado por día {dia_semana}: {len(df_filtrado)} registros encontrados")
-            else:
-                estado_analisis['error'] = 'No se encontró la columna Fe.Entrega para filtrar por día de la semana'
-                return
-        
-        # Generar rutas
-        estado_analisis['progreso'] = 40
-        estado_analisis['mensaje'] = 'Generando rutas optimizadas...'
-        
-        resultado_rutas = analizador.generar_sugerido_rutas(
-            df_filtrado, columnas_clave, max_clientes, rutas_disponibles, generar_proyeccion, max_cajas
-        )
+    Los valores equivalentes ('' y None, 0 y sin límite de rutas) se unifican, se
+    agrega el método de distancia del analizador y, en la proyección semanal, la
+    fecha de hoy (los días proyectados empiezan mañana).
+    """
+    normalizados = dict(parametros)
+    normalizados['centro'] = parametros['centro'] or 'TODOS'
+    normalizados['rutas_disponibles'] = parametros['rutas_disponibles'] or None
+    normalizados['dia_semana'] = parametros['dia_semana'] or ''
+    normalizados['generar_proyeccion'] = bool(parametros['generar_proyeccion'])
+    normalizados['waze_integration'] = bool(parametros['waze_integration'])
+    normalizados['perfil_capacidad'] = tuple(sorted((parametros['perfil_capacidad'] or {}).items()))
+    normalizados['metodo_distancia'] = analizador.metodo_distancia
+    if normalizados['generar_proyeccion']:
+        normalizados['fecha'] = datetime.now().date().isoformat()
+    return normalizados
+
+def progreso_en_tramo(trabajo, inicio, fin):
+    """Función de avance del analizador (0-100) llevada al tramo [inicio, fin] del progreso del trabajo"""
+    return lambda porcentaje, mensaje=None: trabajo.actualizar(inicio + (fin - inicio) * porcentaje / 100, mensaje)
+
+def ejecutar_analisis_thread(trabajo, analizador, organizador, centro, tipo_analisis, max_clientes, rutas_disponibles, max_cajas, dia_semana, generar_proyeccion, waze_integration, metodo_ruteo='proximidad', modo_mapa='auto', perfil_capacidad=None, clave_cache=None):
+    """
+    Ejecuta un análisis como trabajo del gestor
+    
+    Args:
+        trabajo: Trabajo donde se informa el progreso y los errores
+        analizador: Analizador del trabajo (copia del global con los datos ya cargados)
+        organizador: Organizador del trabajo (la carpeta del reporte se crea al empezar)
+        clave_cache: Clave con la que se guarda el resultado en cache_resultados (None = no guardar)
+    
+    Returns:
+        dict: Carpeta del reporte y archivos generados
+    """
+    trabajo.contexto['analizador'] = analizador
+    trabajo.actualizar(0, 'Iniciando análisis...')
+    organizador.crear_carpeta_reporte(centro, tipo_analisis)
+    
+    # Filtrar por centro
+    if centro and centro != "TODOS":
+        trabajo.actualizar(20, f'Filtrando datos del centro {centro}...')
         
-        if resultado_rutas is None:
-            estado_analisis['error'] = 'No se pudieron generar rutas'
-            return
+        resultado = analizador.filtrar_por_centro(centro)
+        if resultado is None:
+            trabajo.fallar(f'Error al filtrar el centro {centro}')
+            return None
         
-        resultado, df_ordenado, centro_coords = resultado_rutas
+        df_filtrado, columnas_clave = resultado
+    else:
+        trabajo.actualizar(20, 'Analizando todos los centros...')
         
-        # Generar archivos
-        estado_analisis['progreso'] = 60
-        estado_analisis['mensaje'] = 'Generando archivos de salida...'
+        df_filtrado = analizador.df
+        columnas_clave = analizador.identificar_columnas_clave()
+    
+    # Filtrar por día de la semana si se especifica
+    if dia_semana:
+        trabajo.actualizar(30, f'Filtrando por día: {dia_semana}...')
         
-        if generar_proyeccion:
-            # Proyección semanal
-            proyeccion_semanal = resultado
-            
-            # Mover archivos de proyección
-            archivos_proyeccion = [f for f in os.listdir('.') if f.startswith('proyeccion_semanal')]
-            for archivo in archivos_proyeccion:
-                organizador.mover_archivo(archivo, "excel")
-            
-            # Mover mapas de proyección
-            archivos_mapas = [f for f in os.listdir('.') if f.startswith('mapa_proyeccion')]
-            for archivo in archivos_mapas:
-                organizador.mover_archivo(archivo, "mapa")
-                
-        else:
-            # Análisis normal
-            rutas = resultado
+        # Día de la semana precalculado al cargar los datos (ver AnalizadorRutas._precalcular_dias_semana)
+        if 'dia_semana' in df_filtrado.columns:
+            df_filtrado = df_filtrado[df_filtrado['dia_semana'] == dia_semana]
             
-            # Generar mapa con integración Waze si se solicita
-            nombre_mapa = organizador.obtener_ruta_archivo("mapa_rutas.html", "mapa")
-            if waze_integration:
-                analizador.generar_mapa_con_waze(rutas, centro_coords, nombre_mapa)
+            if len(df_filtrado) == 0:
+                trabajo.fallar(f'No se encontraron datos para el día {dia_semana}')
+                return None
             else:
-                analizador.generar_mapa(rutas, centro_coords, nombre_mapa)
+                print(f"✅ Filtrado por día {dia_semana}: {len(df_filtrado)} registros encontrados")
+        else:
+            trabajo.fallar('No se encontró la columna Fe.Entrega para filtrar por día de la semana')
+            return None
+    
+    # Generar rutas (en la proyección incluye el reporte y los mapas por día)
+    trabajo.actualizar(40, 'Generando rutas optimizadas...')
+    analizador.al_progresar = progreso_en_tramo(trabajo, 40, 90 if generar_proyeccion else 60)
+    
+    resultado_rutas = analizador.generar_sugerido_rutas(
+        df_filtrado, columnas_clave, max_clientes, rutas_disponibles, generar_proyeccion, max_cajas,
+        metodo_ruteo=metodo_ruteo,
+        carpetas_salida={'excel': organizador.obtener_carpeta('excel'), 'mapa': organizador.obtener_carpeta('mapa')},
+        perfil_capacidad=perfil_capacidad, modo_mapa=modo_mapa
+    )
+    
+    if resultado_rutas is None:
+        trabajo.fallar('No se pudieron generar rutas')
+        return None
+    
+    resultado, df_ordenado, centro_coords = resultado_rutas
+    
+    # Generar archivos
+    trabajo.actualizar(60, 'Generando archivos de salida...')
+    
+    if generar_proyeccion:
+        # Proyección semanal: el reporte y los mapas por día ya se generaron en las carpetas del reporte
+        organizador.archivos_generados += analizador.ultimos_artefactos
             
-            # Generar reporte Excel
-            nombre_excel = organizador.obtener_ruta_archivo("reporte_rutas.xlsx", "excel")
-            analizador.generar_reporte_excel(rutas, df_ordenado, columnas_clave, nombre_excel)
-        
-        # Limpiar archivos temporales
-        estado_analisis['progreso'] = 80
-        estado_analisis['mensaje'] = 'Organizando archivos...'
-        
-        organizador.limpiar_archivos_temporales()
-        
-        # Generar resumen
-        estado_analisis['progreso'] = 90
-        estado_analisis['mensaje'] = 'Generando resumen...'
-        
-        organizador.generar_reporte_resumen()
-        
-        # Completar
-        estado_analisis['progreso'] = 100
-        estado_analisis['mensaje'] = 'Análisis completado exitosamente'
-        estado_analisis['resultado'] = {
-            'carpeta_reporte': organizador.carpeta_actual,
-            'archivos_generados': organizador.archivos_generados
-        }
-        
-    except Exception as e:
-        estado_analisis['error'] = f'Error durante el análisis: {str(e)}'
-    finally:
-        estado_analisis['en_proceso'] = False
+    else:
+        # Análisis normal: mapa (con integración Waze si se solicita) y reporte Excel en paralelo
+        rutas = resultado
+        metodo_mapa = 'generar_mapa_con_waze' if waze_integration else 'generar_mapa'
+        analizador.al_progresar = progreso_en_tramo(trabajo, 60, 90)
+        organizador.archivos_generados += analizador.generar_artefactos([
+            ('mapa', organizador.obtener_ruta_archivo("mapa_rutas.html", "mapa"), metodo_mapa, (rutas, centro_coords),
+             {'modo_mapa': modo_mapa}),
+            ('excel', organizador.obtener_ruta_archivo("reporte_rutas.xlsx", "excel"), 'generar_reporte_excel', (rutas, df_ordenado, columnas_clave)),
+        ])
+    
+    # Generar resumen
+    trabajo.actualizar(90, 'Generando resumen...')
+    
+    organizador.generar_reporte_resumen()
+    
+    # Completar
+    resultado_trabajo = {
+        'carpeta_reporte': organizador.carpeta_actual,
+        'archivos_generados': organizador.archivos_generados
+    }
+    if clave_cache:
+        cache_resultados.guardar(clave_cache, resultado_trabajo, analizador.ultimas_rutas_generadas, analizador.ultima_proyeccion_generada)
+    trabajo.actualizar(100, 'Análisis completado exitosamente')
+    return resultado_trabajo
 
 @app.route('/estado_analisis')
 def obtener_estado():
-    """Obtiene el estado actual del análisis"""
-    return jsonify(estado_analisis)
+    """Obtiene el estado del análisis más reciente (o de la carga de datos si no hay análisis)"""
+    trabajo = gestor_trabajos.ultimo()
+    if trabajo is None:
+        return jsonify(estado_analisis)
+    return jsonify(trabajo.a_diccionario())
+
+@app.route('/jobs', methods=['GET'])
+def listar_trabajos():
+    """Lista los trabajos de análisis conocidos"""
+    return jsonify({
+        'trabajos': [trabajo.a_diccionario() for trabajo in gestor_trabajos.listar()],
+        'en_cola': gestor_trabajos.en_cola(),
+        'max_en_cola': gestor_trabajos.max_en_cola,
+        'max_simultaneos': gestor_trabajos.max_trabajadores
+    })
+
+@app.route('/jobs/<id_trabajo>', methods=['GET'])
+def estado_trabajo(id_trabajo):
+    """Estado, progreso, resultado y error de un trabajo"""
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        return jsonify({'error': f'Trabajo no encontrado: {id_trabajo}'}), 404
+    return jsonify(trabajo.a_diccionario())
+
+@app.route('/jobs/<id_trabajo>/eventos')
+def eventos_trabajo(id_trabajo):
+    """
+    Progreso de un trabajo como Server-Sent Events (text/event-stream)
+    
+    Envía un evento 'progreso' cada vez que cambia el avance (como mucho uno
+    cada INTERVALO_EVENTOS_SSE segundos) y un evento 'fin' con el estado
+    completo cuando el trabajo termina; después cierra la conexión.
+    """
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        return jsonify({'error': f'Trabajo no encontrado: {id_trabajo}'}), 404
+    
+    def eventos():
+        version = None
+        while True:
+            version_actual = trabajo.esperar_cambio(version, LATIDO_SSE)
+            if version_actual == version:
+                yield ": latido\n\n"
+                continue
+            version = version_actual
+            if trabajo.terminado:
+                yield f"id: {version}\nevent: fin\ndata: {json.dumps(trabajo.a_diccionario(), default=str)}\n\n"
+                return
+            yield f"id: {version}\nevent: progreso\ndata: {json.dumps(trabajo.avance())}\n\n"
+            time.sleep(INTERVALO_EVENTOS_SSE)
+    
+    return Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/<id_trabajo>', methods=['DELETE'])
+def cancelar_trabajo(id_trabajo):
+    """Cancela un trabajo que todavía está en cola"""
+    trabajo = gestor_trabajos.obtener(id_trabajo)
+    if trabajo is None:
+        return jsonify({'error': f'Trabajo no encontrado: {id_trabajo}'}), 404
+    if not gestor_trabajos.cancelar(id_trabajo):
+        return jsonify({'success': False, 'error': f'El trabajo ya está {trabajo.estado}'}), 409
+    return jsonify({'success': True, 'estado': trabajo.estado})
+
+def obtener_analizador_resultados(id_trabajo=None):
+    """Analizador con las rutas de un trabajo (por defecto, el último completado)"""
+    trabajo = gestor_trabajos.obtener(id_trabajo) if id_trabajo else gestor_trabajos.ultimo('completado')
+    if trabajo is not None and 'analizador' in trabajo.contexto:
+        return trabajo.contexto['analizador']
+    return analizador
 
 @app.route('/centros')
 def obtener_centros():
@@ -306,8 +429,8 @@ def abrir_carpeta(carpeta):
 
 @app.route('/datos_web')
 def datos_web():
-    """Muestra los datos de las últimas rutas generadas en formato web con filtros."""
-    global analizador
+    """Muestra los datos de las últimas rutas generadas en formato web con filtros (?trabajo=<id> para otro análisis)."""
+    analizador = obtener_analizador_resultados(request.args.get('trabajo'))
     
     # Información de debug
     debug_info = {
@@ -364,105 +487,23 @@ def datos_web():
         <p>Por favor, ejecute un análisis primero.</p>
         """, 404
 
-    datos_para_web = []
+    # Paradas de las rutas unidas a los atributos de cada cliente precalculados al cargar los datos
     print(f"🔍 Procesando datos para web...")
-    if analizador.ultimas_rutas_generadas:
-        print(f"   Procesando {len(analizador.ultimas_rutas_generadas)} rutas normales")
-        for ruta_info in analizador.ultimas_rutas_generadas:
-            for cliente in ruta_info['clientes']:
-                # Obtener datos del DataFrame y convertir tipos numpy a Python nativos
-                cliente_row = analizador.df[analizador.df[analizador.columnas_clave['cliente']] == cliente['cliente']]
-                provincia = 'N/A'
-                canton = 'N/A'
-                distrito = 'N/A'
-                
-                if len(cliente_row) > 0:
-                    if 'Provincia' in analizador.df.columns:
-                        provincia_val = cliente_row['Provincia'].iloc[0]
-                        provincia = str(provincia_val) if not pd.isna(provincia_val) else 'N/A'
-                    if 'Cantón' in analizador.df.columns:
-                        canton_val = cliente_row['Cantón'].iloc[0]
-                        canton = str(canton_val) if not pd.isna(canton_val) else 'N/A'
-                    if 'Distrito' in analizador.df.columns:
-                        distrito_val = cliente_row['Distrito'].iloc[0]
-                        distrito = str(distrito_val) if not pd.isna(distrito_val) else 'N/A'
-                    
-                    # Obtener el día de la semana de la fecha de entrega
-                    dia_semana = 'N/A'
-                    if len(cliente_row) > 0 and 'Fe.Entrega' in cliente_row.columns:
-                        try:
-                            fecha_entrega = cliente_row['Fe.Entrega'].iloc[0]
-                            if pd.notna(fecha_entrega):
-                                # Extraer día de la semana
-                                dia_ingles = fecha_entrega.strftime('%A')
-                                mapeo_dias = {
-                                    'Monday': 'Lunes', 'Tuesday': 'Martes', 'Wednesday': 'Miércoles',
-                                    'Thursday': 'Jueves', 'Friday': 'Viernes', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
-                                }
-                                dia_semana = mapeo_dias.get(dia_ingles, 'N/A')
-                        except:
-                            dia_semana = 'N/A'
-                    
-                    datos_para_web.append({
-                        'Centro': str(cliente_row[analizador.columnas_clave['centro']].iloc[0]) if len(cliente_row) > 0 else 'N/A',
-                        'dia': dia_semana,
-                        'Cliente': str(cliente['cliente']),
-                        'Nombre de': str(cliente['nombre_cliente']),
-                        'Ruta': str(ruta_info['ruta']),
-                        'Viaje': 'N/A', # No disponible en la estructura actual
-                        'Latitud': float(cliente['lat']),
-                        'Longitud': float(cliente['lon']),
-                        'Provincia': provincia,
-                        'Cantón': canton,
-                        'Distrito': distrito,
-                        'Promedio de Cajas Equiv.': float(cliente['cajas'])
-                    })
-    elif analizador.ultima_proyeccion_generada:
-        print(f"   Procesando proyección semanal")
-        for dia, rutas_dia in analizador.ultima_proyeccion_generada.items():
-            for ruta_info in rutas_dia:
-                for cliente in ruta_info['clientes']:
-                    # Obtener datos del DataFrame y convertir tipos numpy a Python nativos
-                    cliente_row = analizador.df[analizador.df[analizador.columnas_clave['cliente']] == cliente['cliente']]
-                    provincia = 'N/A'
-                    canton = 'N/A'
-                    distrito = 'N/A'
-                    
-                    if len(cliente_row) > 0:
-                        if 'Provincia' in analizador.df.columns:
-                            provincia_val = cliente_row['Provincia'].iloc[0]
-                            provincia = str(provincia_val) if not pd.isna(provincia_val) else 'N/A'
-                        if 'Cantón' in analizador.df.columns:
-                            canton_val = cliente_row['Cantón'].iloc[0]
-                            canton = str(canton_val) if not pd.isna(canton_val) else 'N/A'
-                        if 'Distrito' in analizador.df.columns:
-                            distrito_val = cliente_row['Distrito'].iloc[0]
-                            distrito = str(distrito_val) if not pd.isna(distrito_val) else 'N/A'
-                    
-                    datos_para_web.append({
-                        'Centro': str(cliente_row[analizador.columnas_clave['centro']].iloc[0]) if len(cliente_row) > 0 else 'N/A',
-                        'dia': dia,
-                        'Cliente': str(cliente['cliente']),
-                        'Nombre de': str(cliente['nombre_cliente']),
-                        'Ruta': str(ruta_info['ruta']),
-                        'Viaje': 'N/A',
-                        'Latitud': float(cliente['lat']),
-                        'Longitud': float(cliente['lon']),
-                        'Provincia': provincia,
-                        'Cantón': canton,
-                        'Distrito': distrito,
-                        'Promedio de Cajas Equiv.': float(cliente['cajas'])
-                    })
-
+    tabla_web = analizador.tabla_datos_web()
+    datos_para_web = tabla_web.to_dict('records')
     print(f"   Total de datos procesados: {len(datos_para_web)}")
     
     # Obtener valores únicos para los filtros
-    centros = sorted(list(set(d['Centro'] for d in datos_para_web if d['Centro'] != 'N/A')))
-    dias = sorted(list(set(d['dia'] for d in datos_para_web if d['dia'] != 'N/A')))
-    rutas_unicas = sorted(list(set(d['Ruta'] for d in datos_para_web if d['Ruta'] != 'N/A')))
-    provincias = sorted(list(set(d['Provincia'] for d in datos_para_web if d['Provincia'] != 'N/A')))
-    cantones = sorted(list(set(d['Cantón'] for d in datos_para_web if d['Cantón'] != 'N/A')))
-    distritos = sorted(list(set(d['Distrito'] for d in datos_para_web if d['Distrito'] != 'N/A')))
+    def valores_filtro(columna):
+        valores = tabla_web[columna]
+        return sorted(valores[valores != 'N/A'].unique().tolist())
+    
+    centros = valores_filtro('Centro')
+    dias = valores_filtro('dia')
+    rutas_unicas = valores_filtro('Ruta')
+    provincias = valores_filtro('Provincia')
+    cantones = valores_filtro('Cantón')
+    distritos = valores_filtro('Distrito')
 
     return render_template('datos_web.html',
                            datos=datos_para_web,
@@ -476,7 +517,7 @@ def datos_web():
 @app.route('/api/datos_filtrados')
 def datos_filtrados():
     """API para obtener datos filtrados"""
-    global analizador
+    analizador = obtener_analizador_resultados(request.args.get('trabajo'))
     if analizador is None:
         return jsonify({'error': 'No hay datos cargados'})
     
@@ -488,45 +529,16 @@ def datos_filtrados():
     canton = request.args.get('canton', '')
     distrito = request.args.get('distrito', '')
     
-    # Crear datos filtrados
-    datos_filtrados = []
-    if hasattr(analizador, 'ultimas_rutas') and analizador.ultimas_rutas:
-        columnas_clave = analizador.identificar_columnas_clave()
-        
-        for ruta_data in analizador.ultimas_rutas:
-            for cliente in ruta_data['clientes']:
-                cliente_id = cliente['cliente']
-                cliente_row = analizador.df[analizador.df[columnas_clave['cliente']] == cliente_id].iloc[0] if len(analizador.df[analizador.df[columnas_clave['cliente']] == cliente_id]) > 0 else None
-                
-                if cliente_row is not None:
-                    # Aplicar filtros
-                    if centro and cliente_row[columnas_clave['centro']] != centro:
-                        continue
-                    if dia and cliente_row.get('dia entrega', '') != dia:
-                        continue
-                    if ruta and ruta_data['ruta'] != int(ruta) if ruta.isdigit() else True:
-                        continue
-                    if provincia and cliente_row.get('Provincia', '') != provincia:
-                        continue
-                    if canton and cliente_row.get('Cantón', '') != canton:
-                        continue
-                    if distrito and cliente_row.get('Distrito', '') != distrito:
-                        continue
-                    
-                    datos_filtrados.append({
-                        'Centro': cliente_row[columnas_clave['centro']],
-                        'dia': cliente_row.get('dia entrega', 'N/A'),
-                        'Cliente': cliente_id,
-                        'Nombre de': cliente.get('nombre_cliente', cliente_id),
-                        'Ruta': ruta_data['ruta'],
-                        'Viaje': cliente_row.get('Viaje', 'N/A'),
-                        'Latitud': cliente['lat'],
-                        'Longitud': cliente['lon'],
-                        'Provincia': cliente_row.get('Provincia', 'N/A'),
-                        'Cantón': cliente_row.get('Cantón', 'N/A'),
-                        'Distrito': cliente_row.get('Distrito', 'N/A'),
-                        'Promedio de Cajas Equiv.': cliente['cajas']
-                    })
+    # Filtrar la tabla de la vista web (una fila por parada) con máscaras por columna
+    tabla_web = analizador.tabla_datos_web()
+    if tabla_web is None:
+        return jsonify({'datos': []})
+    
+    filtros = {'Centro': centro, 'dia': dia, 'Ruta': ruta, 'Provincia': provincia, 'Cantón': canton, 'Distrito': distrito}
+    for columna, valor in filtros.items():
+        if valor:
+            tabla_web = tabla_web[tabla_web[columna].astype(str) == valor]
+    datos_filtrados = tabla_web.to_dict('records')
     
     return jsonify({'datos': datos_filtrados})
 
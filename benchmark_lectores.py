@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compara los motores de lectura del Excel de entregas (lectura completa vs. solo columnas clave)
+"""
+
+import os
+import sys
+import time
+import tempfile
+from analisis_rutas import AnalizadorRutas
+from lectores_excel import motores_disponibles, leer_encabezados, leer_tabla
+
+
+def medir(funcion, repeticiones):
+    """Devuelve el mejor tiempo (segundos) de varias ejecuciones y el último resultado"""
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def main():
+    """Función principal"""
+    archivo_excel = sys.argv[1] if len(sys.argv) > 1 else "Data/REP PLR ESTATUS ENTREGAS v25.xlsx"
+    hoja_nombre = sys.argv[2] if len(sys.argv) > 2 else "REP PLR"
+    repeticiones = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    if not os.path.exists(archivo_excel):
+        print(f"❌ No se encontró el archivo de datos: {archivo_excel}")
+        return
+
+    print("="*60)
+    print("BENCHMARK DE MOTORES DE LECTURA")
+    print("="*60)
+    print(f"Archivo: {archivo_excel} ({os.path.getsize(archivo_excel) / 1024 / 1024:.1f} MB)")
+    print(f"Motores disponibles: {motores_disponibles()}")
+
+    analizador = AnalizadorRutas(archivo_excel, hoja_nombre, usar_cache=False)
+    motores_excel = [m for m in motores_disponibles() if m != 'csv']
+    if not motores_excel:
+        print("❌ No hay motores de Excel instalados")
+        return
+
+    # Exportar la hoja a CSV una vez para medir el motor CSV con los mismos datos
+    df_completo = leer_tabla(archivo_excel, hoja_nombre, motor=motores_excel[0])
+    archivo_csv = os.path.join(tempfile.gettempdir(), "benchmark_rep_plr.csv")
+    df_completo.to_csv(archivo_csv, index=False)
+    print(f"Filas: {len(df_completo):,} | Columnas: {len(df_completo.columns)}")
+
+    resultados = []
+    for motor in motores_disponibles():
+        archivo = archivo_csv if motor == 'csv' else archivo_excel
+
+        tiempo_encabezados, encabezados = medir(lambda: leer_encabezados(archivo, hoja_nombre, motor), repeticiones)
+        columnas = analizador._columnas_a_cargar(encabezados)
+        tiempo_clave, _ = medir(lambda: leer_tabla(archivo, hoja_nombre, columnas, motor), repeticiones)
+        tiempo_completo, _ = medir(lambda: leer_tabla(archivo, hoja_nombre, None, motor), repeticiones)
+
+        resultados.append((motor, tiempo_encabezados, tiempo_clave, tiempo_completo, len(columnas)))
+
+    print(f"\n{'Motor':<10} {'Encabezados':>12} {'Columnas clave':>16} {'Completo':>10}")
+    print("-" * 52)
+    for motor, t_enc, t_clave, t_completo, n_columnas in resultados:
+        print(f"{motor:<10} {t_enc:>11.3f}s {t_enc + t_clave:>15.3f}s {t_completo:>9.3f}s")
+    print(f"\nColumnas clave leídas: {resultados[0][4]} de {len(df_completo.columns)}")
+    print("(Columnas clave = encabezados + lectura proyectada con usecols)")
+
+    os.remove(archivo_csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import os
+import sys
+import hashlib
+import pandas as pd
+
+# Carpeta por defecto donde se guardan las copias columnar del Excel
+CARPETA_CACHE = os.path.join("Data", ".cache")
+
+
+def parquet_disponible():
+    """Indica si hay un motor Parquet (pyarrow) instalado"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class CacheDatos:
+    def __init__(self, carpeta_cache=CARPETA_CACHE):
+        """
+        Inicializa la caché columnar de libros Excel
+
+        Cada entrada es un archivo Parquet identificado por la ruta del libro,
+        su tamaño, su fecha de modificación y el nombre de la hoja. Si el Excel
+        cambia, la clave cambia y la entrada anterior se descarta.
+
+        Args:
+            carpeta_cache (str): Carpeta donde se guardan los archivos Parquet
+        """
+        self.carpeta_cache = carpeta_cache
+        self.habilitada = parquet_disponible()
+        if not self.habilitada:
+            print("ℹ️  pyarrow no está instalado: la caché de datos está deshabilitada")
+
+    def _prefijo(self, archivo_excel, hoja_nombre, variante=None):
+        """Identifica el libro y la hoja, sin importar su versión"""
+        base = f"{os.path.abspath(archivo_excel)}|{hoja_nombre}|{variante or ''}"
+        return hashlib.sha1(base.encode('utf-8')).hexdigest()[:16]
+
+    def clave(self, archivo_excel, hoja_nombre, variante=None):
+        """
+        Calcula la clave de caché de un libro Excel
+
+        Args:
+            archivo_excel (str): Ruta al archivo Excel
+            hoja_nombre (str): Nombre de la hoja
+            variante (str): Texto adicional que distingue lecturas distintas
+                de la misma hoja (por ejemplo, un subconjunto de columnas)
+        """
+        info = os.stat(archivo_excel)
+        version = f"{info.st_size}|{info.st_mtime_ns}"
+        sufijo = hashlib.sha1(version.encode('utf-8')).hexdigest()[:16]
+        return f"{self._prefijo(archivo_excel, hoja_nombre, variante)}_{sufijo}"
+
+    def ruta_cache(self, clave):
+        """Ruta del archivo Parquet de una clave"""
+        return os.path.join(self.carpeta_cache, f"{clave}.parquet")
+
+    def leer(self, archivo_excel, hoja_nombre, variante=None):
+        """Devuelve el DataFrame en caché o None si no existe o está desactualizado"""
+        if not self.habilitada:
+            return None
+
+        ruta = self.ruta_cache(self.clave(archivo_excel, hoja_nombre, variante))
+        if not os.path.exists(ruta):
+            return None
+
+        try:
+            return pd.read_parquet(ruta)
+        except Exception as e:
+            print(f"⚠️  No se pudo leer la caché {ruta}: {e}")
+            return None
+
+    def escribir(self, df, archivo_excel, hoja_nombre, variante=None):
+        """Guarda el DataFrame en caché y elimina versiones anteriores del mismo libro"""
+        if not self.habilitada:
+            return None
+
+        os.makedirs(self.carpeta_cache, exist_ok=True)
+        clave = self.clave(archivo_excel, hoja_nombre, variante)
+        ruta = self.ruta_cache(clave)
+        ruta_temporal = f"{ruta}.tmp"
+
+        try:
+            self._normalizar_para_parquet(df).to_parquet(ruta_temporal, index=True)
+            os.replace(ruta_temporal, ruta)
+        except Exception as e:
+            print(f"⚠️  No se pudo escribir la caché {ruta}: {e}")
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+            return None
+
+        # Eliminar entradas de versiones anteriores del mismo libro y hoja
+        prefijo = clave.split('_')[0]
+        for nombre in os.listdir(self.carpeta_cache):
+            if nombre.startswith(f"{prefijo}_") and nombre != os.path.basename(ruta):
+                try:
+                    os.remove(os.path.join(self.carpeta_cache, nombre))
+                except OSError:
+                    pass
+
+        print(f"💾 Caché de datos guardada: {ruta}")
+        return ruta
+
+    def cargar(self, archivo_excel, hoja_nombre, lector, variante=None):
+        """
+        Lee desde la caché o, si no hay entrada válida, usa el lector y guarda el resultado
+
+        Sin entrada válida se devuelve la copia recién guardada (o, si no se pudo
+        guardar, el DataFrame normalizado), de modo que los datos son los mismos
+        con la caché fría o caliente.
+
+        Args:
+            archivo_excel (str): Ruta al archivo Excel
+            hoja_nombre (str): Nombre de la hoja
+            lector (callable): Función sin argumentos que lee el Excel original
+            variante (str): Ver `clave`
+        """
+        df = self.leer(archivo_excel, hoja_nombre, variante)
+        if df is not None:
+            print(f"⚡ Datos leídos desde la caché columnar ({len(df)} filas)")
+            return df
+
+        df = lector()
+        if self.habilitada and self.escribir(df, archivo_excel, hoja_nombre, variante) is not None:
+            guardado = self.leer(archivo_excel, hoja_nombre, variante)
+            if guardado is not None:
+                return guardado
+        return self._normalizar_para_parquet(df) if self.habilitada else df
+
+    def limpiar(self):
+        """Elimina todas las entradas de la caché"""
+        if not os.path.isdir(self.carpeta_cache):
+            return
+        for nombre in os.listdir(self.carpeta_cache):
+            if nombre.endswith('.parquet'):
+                os.remove(os.path.join(self.carpeta_cache, nombre))
+
+    @staticmethod
+    def _normalizar_para_parquet(df):
+        """
+        Convierte a texto las columnas con tipos mezclados
+
+        Las columnas de Excel con números y texto en la misma columna (por
+        ejemplo, coordenadas concatenadas) no tienen un tipo Arrow válido.
+        Los valores nulos se conservan como nulos.
+        """
+        df_normalizado = df.copy(deep=False)
+        for col in df.columns:
+            if df[col].dtype != object:
+                continue
+            tipo = pd.api.types.infer_dtype(df[col], skipna=True)
+            if tipo in ('mixed', 'mixed-integer'):
+                df_normalizado[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        # Parquet exige nombres de columna de texto
+        df_normalizado.columns = [str(col) for col in df_normalizado.columns]
+        return df_normalizado
+
+
+def main():
+    """Precalienta la caché leyendo el libro una vez"""
+    from analisis_rutas import AnalizadorRutas
+
+    archivo_excel = sys.argv[1] if len(sys.argv) > 1 else "Data/REP PLR ESTATUS ENTREGAS v25.xlsx"
+    hoja_nombre = sys.argv[2] if len(sys.argv) > 2 else "REP PLR"
+
+    if not os.path.exists(archivo_excel):
+        print(f"❌ No se encontró el archivo de datos: {archivo_excel}")
+        return
+
+    analizador = AnalizadorRutas(archivo_excel, hoja_nombre)
+    if analizador.cargar_datos():
+        print("✅ Caché de datos lista")
+
+
+if __name__ == "__main__":
+    main()
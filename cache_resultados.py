@@ -0,0 +1,182 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Carpeta por defecto donde se guardan los resultados de análisis ya ejecutados
+CARPETA_RESULTADOS = os.path.join("Data", ".cache", "resultados")
+# Límites por defecto de la caché
+MAX_ENTRADAS_MEMORIA = 32
+MAX_BYTES_DISCO = 256 * 1024 * 1024
+MAX_EDAD_SEGUNDOS = 24 * 60 * 60
+
+
+def clave_resultado(huella_datos, parametros):
+    """
+    Calcula la clave de un resultado de análisis
+
+    Args:
+        huella_datos (str): Hash del contenido de los datos cargados (ver AnalizadorRutas.huella_datos)
+        parametros (dict): Parámetros normalizados del análisis (valores simples, sin objetos)
+
+    Returns:
+        str: Clave hexadecimal
+    """
+    base = repr((huella_datos, sorted(parametros.items())))
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+
+class CacheResultados:
+    def __init__(self, carpeta=CARPETA_RESULTADOS, max_entradas_memoria=MAX_ENTRADAS_MEMORIA,
+                 max_bytes_disco=MAX_BYTES_DISCO, max_edad=MAX_EDAD_SEGUNDOS):
+        """
+        Caché de resultados de análisis en dos niveles
+
+        Cada entrada guarda la estructura de rutas generada (rutas normales o
+        proyección semanal) y las rutas de los archivos del reporte. Se busca
+        primero en memoria (LRU de max_entradas_memoria entradas) y luego en
+        disco (un archivo pickle por clave). Las entradas más antiguas que
+        max_edad se descartan, el disco se recorta a max_bytes_disco quitando
+        las de uso más antiguo, y una entrada cuyos archivos ya no existen
+        (p. ej. se borró la carpeta del reporte) se considera inválida.
+
+        Args:
+            carpeta (str): Carpeta del nivel en disco
+            max_entradas_memoria (int): Entradas que se conservan en memoria
+            max_bytes_disco (int): Tamaño máximo del nivel en disco
+            max_edad (float): Segundos que vive una entrada
+        """
+        self.carpeta = carpeta
+        self.max_entradas_memoria = max_entradas_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self.max_edad = max_edad
+        self._memoria = OrderedDict()
+        self._bloqueo = threading.Lock()
+
+    def _ruta(self, clave):
+        return os.path.join(self.carpeta, f"{clave}.pkl")
+
+    def _vigente(self, entrada):
+        """La entrada no venció y todos sus archivos siguen en disco"""
+        if time.time() - entrada['creado'] > self.max_edad:
+            return False
+        archivos = entrada['resultado'].get('archivos_generados', [])
+        return all(os.path.exists(archivo['archivo']) for archivo in archivos)
+
+    def obtener(self, clave):
+        """
+        Busca un resultado en memoria y luego en disco
+
+        Returns:
+            dict: Entrada con 'resultado', 'rutas', 'proyeccion' y 'creado', o None si no hay una vigente
+        """
+        with self._bloqueo:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                if self._vigente(entrada):
+                    self._memoria.move_to_end(clave)
+                    return entrada
+                del self._memoria[clave]
+                self._eliminar_disco(clave)
+                return None
+
+        ruta = self._ruta(clave)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, 'rb') as archivo:
+                entrada = pickle.load(archivo)
+        except Exception as e:
+            print(f"⚠️  No se pudo leer el resultado en caché {ruta}: {e}")
+            self._eliminar_disco(clave)
+            return None
+        if not self._vigente(entrada):
+            self._eliminar_disco(clave)
+            return None
+
+        # Marcar el uso para que el recorte por tamaño quite primero las entradas sin usar
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        with self._bloqueo:
+            self._guardar_memoria(clave, entrada)
+        return entrada
+
+    def guardar(self, clave, resultado, rutas=None, proyeccion=None):
+        """
+        Guarda el resultado de un análisis en memoria y en disco
+
+        Args:
+            clave (str): Ver clave_resultado
+            resultado (dict): Carpeta del reporte y archivos generados
+            rutas: Rutas del análisis normal (ConjuntoRutas)
+            proyeccion (dict): Rutas por día de la proyección semanal
+        """
+        entrada = {'creado': time.time(), 'resultado': resultado, 'rutas': rutas, 'proyeccion': proyeccion}
+        with self._bloqueo:
+            self._guardar_memoria(clave, entrada)
+
+        ruta = self._ruta(clave)
+        ruta_temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.carpeta, exist_ok=True)
+            with open(ruta_temporal, 'wb') as archivo:
+                pickle.dump(entrada, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(ruta_temporal, ruta)
+        except Exception as e:
+            print(f"⚠️  No se pudo guardar el resultado en caché {ruta}: {e}")
+            if os.path.exists(ruta_temporal):
+                os.remove(ruta_temporal)
+            return
+        self._depurar_disco()
+
+    def _guardar_memoria(self, clave, entrada):
+        """Agrega la entrada al LRU en memoria (con el bloqueo tomado)"""
+        self._memoria[clave] = entrada
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas_memoria:
+            self._memoria.popitem(last=False)
+
+    def _eliminar_disco(self, clave):
+        try:
+            os.remove(self._ruta(clave))
+        except OSError:
+            pass
+
+    def _depurar_disco(self):
+        """Elimina las entradas vencidas y recorta el disco a max_bytes_disco por uso más antiguo"""
+        if not os.path.isdir(self.carpeta):
+            return
+        ahora = time.time()
+        entradas = []
+        for nombre in os.listdir(self.carpeta):
+            if not nombre.endswith('.pkl'):
+                continue
+            ruta = os.path.join(self.carpeta, nombre)
+            try:
+                info = os.stat(ruta)
+            except OSError:
+                continue
+            if ahora - info.st_mtime > self.max_edad:
+                self._eliminar_disco(nombre[:-4])
+            else:
+                entradas.append((info.st_mtime, info.st_size, nombre[:-4]))
+
+        total = sum(tamano for _, tamano, _ in entradas)
+        for _, tamano, clave in sorted(entradas):
+            if total <= self.max_bytes_disco:
+                break
+            self._eliminar_disco(clave)
+            total -= tamano
+
+    def limpiar(self):
+        """Elimina todas las entradas de memoria y disco"""
+        with self._bloqueo:
+            self._memoria.clear()
+        if os.path.isdir(self.carpeta):
+            for nombre in os.listdir(self.carpeta):
+                if nombre.endswith('.pkl'):
+                    self._eliminar_disco(nombre[:-4])
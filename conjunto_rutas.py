@@ -0,0 +1,268 @@
+"""
+Conjunto de rutas en formato columnar
+
+Las rutas se guardan como arreglos de NumPy con una posición por parada
+(cliente, ruta, secuencia, coordenadas, cajas y distancias), ordenados por
+ruta y por secuencia, más una tabla de atributos por cliente compartida por
+todas las paradas. Así un análisis grande no crea un diccionario por
+cliente y los reportes pueden construir sus DataFrames directamente de los
+arreglos.
+
+Para el código que espera la estructura anterior (lista de diccionarios
+{'ruta', 'clientes', 'total_cajas', 'total_clientes'}), el conjunto se
+puede recorrer e indexar como una lista: cada ruta y cada cliente es una
+vista liviana (con __slots__) que acepta ruta['clientes'], cliente['lat'],
+cliente.get('secuencia', '-'), etc. y lee los valores de los arreglos.
+"""
+
+import itertools
+import numpy as np
+import pandas as pd
+
+# Atributos por cliente que se guardan en la tabla compartida
+ATRIBUTOS_CLIENTE = ('cliente', 'nombre_cliente', 'lat', 'lon', 'cajas', 'cajas_total',
+                     'num_entregas', 'distancia_centro', 'ruta_dist')
+
+# Columnas por parada, en el orden en que se exportan a DataFrame
+COLUMNAS_PARADA = ('ruta', 'secuencia', 'cliente', 'nombre_cliente', 'ruta_dist', 'lat', 'lon', 'cajas',
+                   'cajas_total', 'num_entregas', 'distancia_centro', 'distancia_tramo')
+
+
+def _escalar(valor):
+    """Convierte escalares de NumPy a tipos de Python"""
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+class ConjuntoRutas:
+    __slots__ = ('clientes', 'indice_cliente', 'numeros', 'inicios', 'posicion_ruta', 'ruta', 'secuencia',
+                 'lat', 'lon', 'cajas', 'distancia_centro', 'distancia_tramo', 'distancia_total')
+
+    def __init__(self, clientes, rutas_indices, numeros=None):
+        """
+        Crea el conjunto a partir de rutas expresadas como índices de cliente
+
+        Args:
+            clientes: Diccionario atributo -> arreglo con una fila por cliente (ver ATRIBUTOS_CLIENTE)
+            rutas_indices: Rutas como listas de índices de la tabla de clientes, en orden de visita
+            numeros: Número de cada ruta (por defecto 1, 2, ...)
+        """
+        self.clientes = clientes
+        largos = np.array([len(ruta) for ruta in rutas_indices], dtype=np.int64)
+        total = int(largos.sum())
+        self.inicios = np.r_[0, np.cumsum(largos)].astype(np.int64)
+        self.indice_cliente = np.fromiter(itertools.chain.from_iterable(rutas_indices), dtype=np.int64, count=total)
+        self.numeros = np.arange(1, len(largos) + 1) if numeros is None else np.asarray(numeros, dtype=np.int64)
+        self.posicion_ruta = np.repeat(np.arange(len(largos)), largos)
+        self.ruta = self.numeros[self.posicion_ruta]
+        self.secuencia = np.arange(total) - self.inicios[self.posicion_ruta] + 1
+        for atributo in ('lat', 'lon', 'cajas', 'distancia_centro'):
+            setattr(self, atributo, np.asarray(clientes[atributo], dtype='float64')[self.indice_cliente])
+        self.distancia_tramo = np.full(total, np.nan)
+        self.distancia_total = np.full(len(largos), np.nan)
+
+    @classmethod
+    def desde_diccionarios(cls, rutas):
+        """Crea el conjunto desde la estructura de lista de diccionarios (una fila de cliente por parada)"""
+        paradas = [cliente for ruta in rutas for cliente in ruta['clientes']]
+        clientes = {
+            atributo: np.array([parada.get(atributo, parada['cajas'] if atributo == 'cajas_total' else
+                                           1 if atributo == 'num_entregas' else
+                                           'Sin asignar' if atributo == 'ruta_dist' else
+                                           parada['cliente'] if atributo == 'nombre_cliente' else None)
+                                for parada in paradas],
+                               dtype=object if atributo in ('cliente', 'nombre_cliente', 'ruta_dist') else
+                               np.int64 if atributo == 'num_entregas' else 'float64')
+            for atributo in ATRIBUTOS_CLIENTE
+        }
+        rutas_indices = []
+        inicio = 0
+        for ruta in rutas:
+            rutas_indices.append(range(inicio, inicio + len(ruta['clientes'])))
+            inicio += len(ruta['clientes'])
+        conjunto = cls(clientes, rutas_indices, [ruta['ruta'] for ruta in rutas])
+        for posicion, parada in enumerate(paradas):
+            conjunto.distancia_tramo[posicion] = parada.get('distancia_tramo', np.nan)
+        for posicion, ruta in enumerate(rutas):
+            conjunto.distancia_total[posicion] = ruta.get('distancia_total', np.nan)
+        return conjunto
+
+    @classmethod
+    def desde(cls, rutas):
+        """Devuelve `rutas` como ConjuntoRutas (sin copiar si ya lo es)"""
+        return rutas if isinstance(rutas, cls) else cls.desde_diccionarios(rutas)
+
+    # --- Acceso como lista de rutas ---
+
+    def __len__(self):
+        return len(self.numeros)
+
+    def __getitem__(self, posicion):
+        if posicion < 0:
+            posicion += len(self)
+        if not 0 <= posicion < len(self):
+            raise IndexError(posicion)
+        return VistaRuta(self, posicion)
+
+    def __iter__(self):
+        return (VistaRuta(self, posicion) for posicion in range(len(self)))
+
+    def __repr__(self):
+        return f"ConjuntoRutas({len(self)} rutas, {len(self.indice_cliente)} paradas)"
+
+    # --- Totales por ruta ---
+
+    @property
+    def total_clientes(self):
+        return np.diff(self.inicios)
+
+    @property
+    def total_cajas(self):
+        return np.bincount(self.posicion_ruta, weights=self.cajas, minlength=len(self))
+
+    def columna(self, nombre):
+        """Arreglo por parada de una columna propia o de un atributo del cliente"""
+        if nombre in ('ruta', 'secuencia', 'lat', 'lon', 'cajas', 'distancia_centro', 'distancia_tramo', 'indice_cliente'):
+            return getattr(self, nombre)
+        return np.asarray(self.clientes[nombre])[self.indice_cliente]
+
+    def tramo(self, posicion):
+        """Rango de paradas [inicio, fin) de la ruta en la posición indicada"""
+        return slice(int(self.inicios[posicion]), int(self.inicios[posicion + 1]))
+
+    # --- Conversión a DataFrame ---
+
+    def a_dataframe(self, columnas=COLUMNAS_PARADA):
+        """DataFrame con una fila por parada, en orden de ruta y secuencia"""
+        return pd.DataFrame({columna: self.columna(columna) for columna in columnas})
+
+    def resumen(self):
+        """DataFrame con una fila por ruta: clientes, cajas y distancia total"""
+        return pd.DataFrame({
+            'ruta': self.numeros,
+            'total_clientes': self.total_clientes,
+            'total_cajas': self.total_cajas,
+            'distancia_total': self.distancia_total,
+        })
+
+    # --- Modificación ---
+
+    def reordenar(self, ordenes, tramos=None, regresos=None):
+        """
+        Cambia el orden de visita dentro de cada ruta
+
+        Args:
+            ordenes: Para cada ruta, el nuevo orden como índices locales de sus paradas
+            tramos: Para cada ruta, la distancia del tramo que llega a cada parada en el nuevo orden
+            regresos: Para cada ruta, la distancia de la última parada al centro
+        """
+        permutacion = np.fromiter(
+            itertools.chain.from_iterable(
+                (int(self.inicios[posicion]) + i for i in orden) for posicion, orden in enumerate(ordenes)
+            ),
+            dtype=np.int64, count=len(self.indice_cliente)
+        )
+        for atributo in ('indice_cliente', 'lat', 'lon', 'cajas', 'distancia_centro'):
+            setattr(self, atributo, getattr(self, atributo)[permutacion])
+        if tramos is not None:
+            self.distancia_tramo = np.fromiter(itertools.chain.from_iterable(tramos), dtype='float64',
+                                               count=len(self.indice_cliente))
+            if regresos is not None:
+                self.distancia_total = (np.bincount(self.posicion_ruta, weights=self.distancia_tramo, minlength=len(self))
+                                        + np.asarray(regresos, dtype='float64'))
+        else:
+            self.distancia_tramo = np.full(len(self.indice_cliente), np.nan)
+            self.distancia_total = np.full(len(self), np.nan)
+
+    def rutas_como_indices(self):
+        """Rutas como listas de índices de la tabla de clientes"""
+        return [self.indice_cliente[self.tramo(posicion)].tolist() for posicion in range(len(self))]
+
+
+class VistaRuta:
+    """Ruta de un ConjuntoRutas con acceso de diccionario ('ruta', 'clientes', 'total_cajas', ...)"""
+    __slots__ = ('conjunto', 'posicion')
+
+    CLAVES = ('ruta', 'clientes', 'total_cajas', 'total_clientes', 'distancia_total')
+
+    def __init__(self, conjunto, posicion):
+        self.conjunto = conjunto
+        self.posicion = posicion
+
+    def __getitem__(self, clave):
+        conjunto, posicion = self.conjunto, self.posicion
+        if clave == 'ruta':
+            return int(conjunto.numeros[posicion])
+        if clave == 'clientes':
+            tramo = conjunto.tramo(posicion)
+            return [VistaCliente(conjunto, fila) for fila in range(tramo.start, tramo.stop)]
+        if clave == 'total_cajas':
+            return float(conjunto.cajas[conjunto.tramo(posicion)].sum())
+        if clave == 'total_clientes':
+            return int(conjunto.inicios[posicion + 1] - conjunto.inicios[posicion])
+        if clave == 'distancia_total' and not np.isnan(conjunto.distancia_total[posicion]):
+            return float(conjunto.distancia_total[posicion])
+        raise KeyError(clave)
+
+    def get(self, clave, defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def __contains__(self, clave):
+        return self.get(clave) is not None
+
+    def keys(self):
+        return [clave for clave in self.CLAVES if clave in self]
+
+    def items(self):
+        return [(clave, self[clave]) for clave in self.keys()]
+
+    def __repr__(self):
+        return (f"{{'ruta': {self['ruta']}, 'total_clientes': {self['total_clientes']}, "
+                f"'total_cajas': {self['total_cajas']:.1f}}}")
+
+
+class VistaCliente:
+    """Parada de un ConjuntoRutas con acceso de diccionario ('cliente', 'lat', 'cajas', ...)"""
+    __slots__ = ('conjunto', 'fila')
+
+    PROPIAS = ('lat', 'lon', 'cajas', 'distancia_centro', 'secuencia', 'distancia_tramo')
+
+    def __init__(self, conjunto, fila):
+        self.conjunto = conjunto
+        self.fila = fila
+
+    def __getitem__(self, clave):
+        conjunto = self.conjunto
+        if clave in self.PROPIAS:
+            valor = getattr(conjunto, clave)[self.fila]
+            if clave == 'distancia_tramo' and np.isnan(valor):
+                raise KeyError(clave)
+            return _escalar(valor)
+        if clave in conjunto.clientes:
+            return _escalar(conjunto.clientes[clave][conjunto.indice_cliente[self.fila]])
+        raise KeyError(clave)
+
+    def __setitem__(self, clave, valor):
+        if clave not in self.PROPIAS:
+            raise KeyError(clave)
+        getattr(self.conjunto, clave)[self.fila] = valor
+
+    def get(self, clave, defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return defecto
+
+    def __contains__(self, clave):
+        return self.get(clave) is not None
+
+    def keys(self):
+        return [clave for clave in ATRIBUTOS_CLIENTE + ('secuencia', 'distancia_tramo') if clave in self]
+
+    def items(self):
+        return [(clave, self[clave]) for clave in self.keys()]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
@@ -0,0 +1,78 @@
+"""
+Cálculo vectorizado de distancias (km) entre coordenadas geográficas
+
+Métodos disponibles y su error frente a la geodésica WGS-84, medido sobre
+pares de puntos dentro de Costa Rica (lat. 8°-11.3° N, lon. 82.5°-86° O):
+
+- 'haversine': esfera de radio medio (6371.0088 km). Error relativo máximo
+  de 0.55% (hasta ~0.15 km en 25 km y ~2 km en 500 km). Las distancias
+  norte-sur se sobreestiman porque a estas latitudes el radio de curvatura
+  meridiano (~6337 km) es menor que el radio medio.
+- 'equirectangular': proyección plana local sobre la misma esfera. Difiere
+  de haversine en menos de 0.01% dentro del país, por lo que su error
+  frente a WGS-84 es también de 0.55%. Es el más rápido.
+- 'geodesica': geodésica exacta sobre el elipsoide WGS-84 (geopy, Karney),
+  con precisión submilimétrica. Se calcula punto por punto en Python, por
+  lo que es mucho más lento; útil como referencia.
+
+Todas las funciones aceptan escalares o arreglos de NumPy que se puedan
+combinar por broadcasting y devuelven un arreglo float64.
+"""
+
+import numpy as np
+
+# Radio medio de la Tierra (IUGG), en km
+RADIO_TIERRA_KM = 6371.0088
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distancia de gran círculo con la fórmula de haversine"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lon1, lat2, lon2))
+    h = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def equirectangular_km(lat1, lon1, lat2, lon2):
+    """Distancia con la aproximación equirectangular (plano local)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype='float64')) for v in (lat1, lon1, lat2, lon2))
+    x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return RADIO_TIERRA_KM * np.hypot(x, y)
+
+
+def geodesica_km(lat1, lon1, lat2, lon2):
+    """Distancia geodésica exacta sobre WGS-84 (un cálculo de geopy por par)"""
+    from geopy.distance import geodesic
+
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(v, dtype='float64') for v in (lat1, lon1, lat2, lon2)))
+    resultado = np.empty(lat1.shape, dtype='float64')
+    for i in np.ndindex(lat1.shape):
+        resultado[i] = geodesic((lat1[i], lon1[i]), (lat2[i], lon2[i])).kilometers
+    return resultado
+
+
+METODOS = {
+    'haversine': haversine_km,
+    'equirectangular': equirectangular_km,
+    'geodesica': geodesica_km,
+}
+
+
+def distancia_km(lat1, lon1, lat2, lon2, metodo='haversine'):
+    """
+    Calcula distancias en km entre coordenadas
+
+    Args:
+        lat1, lon1: Coordenadas de origen (escalares o arreglos)
+        lat2, lon2: Coordenadas de destino (escalares o arreglos)
+        metodo (str): 'haversine', 'equirectangular' o 'geodesica'
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de distancia desconocido: {metodo}. Opciones: {list(METODOS)}")
+    return METODOS[metodo](lat1, lon1, lat2, lon2)
+
+
+def distancias_desde(lat_origen, lon_origen, lats, lons, metodo='haversine'):
+    """Distancias (km) desde un punto (por ejemplo, el centro) a todos los clientes en una sola llamada"""
+    return distancia_km(lat_origen, lon_origen, lats, lons, metodo)
@@ -0,0 +1,171 @@
+import os
+import re
+from cache_datos import CacheDatos, parquet_disponible
+
+# Filas que se convierten y escriben en cada bloque
+FILAS_POR_BLOQUE = 5000
+# Filas de datos que admite una hoja de Excel (sin contar el encabezado)
+MAX_FILAS_EXCEL = 1048575
+# Formatos de archivo anexo para datos voluminosos
+FORMATOS_ANEXO = ('csv.gz', 'parquet')
+
+
+def xlsxwriter_disponible():
+    """Indica si xlsxwriter está instalado"""
+    try:
+        import xlsxwriter  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class EscritorReporte:
+    def __init__(self, nombre_archivo, filas_por_bloque=FILAS_POR_BLOQUE):
+        """
+        Escritor de libros Excel en streaming
+
+        Cada hoja se escribe por bloques de filas y se descarga a disco antes de
+        pasar a la siguiente, por lo que la memoria usada no depende del tamaño
+        de los datos. Usa xlsxwriter en modo constant_memory y, si no está
+        instalado, openpyxl en modo write_only. Los datos voluminosos pueden
+        guardarse además (o en lugar de la hoja) en un archivo anexo CSV.gz o
+        Parquet junto al libro.
+
+        Args:
+            nombre_archivo (str): Ruta del libro a crear
+            filas_por_bloque (int): Filas convertidas y escritas en cada bloque
+        """
+        self.nombre_archivo = nombre_archivo
+        self.filas_por_bloque = filas_por_bloque
+        self.anexos = []
+        os.makedirs(os.path.dirname(nombre_archivo) or '.', exist_ok=True)
+
+        if xlsxwriter_disponible():
+            import xlsxwriter
+
+            self.motor = 'xlsxwriter'
+            self.libro = xlsxwriter.Workbook(nombre_archivo, {
+                'constant_memory': True,
+                'strings_to_formulas': False,
+                'strings_to_urls': False,
+                'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+            })
+            self.formato_encabezado = self.libro.add_format({'bold': True, 'border': 1})
+        else:
+            from openpyxl import Workbook
+
+            self.motor = 'openpyxl'
+            self.libro = Workbook(write_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+        return False
+
+    def cerrar(self):
+        """Termina de escribir el libro"""
+        if self.libro is None:
+            return
+        if self.motor == 'xlsxwriter':
+            self.libro.close()
+        else:
+            # Un libro sin hojas no es válido
+            if not self.libro.worksheets:
+                self.libro.create_sheet('Hoja1')
+            self.libro.save(self.nombre_archivo)
+        self.libro = None
+
+    def agregar_hoja(self, nombre, df, incluir=True, max_filas=None, anexo=None):
+        """
+        Escribe un DataFrame como hoja del libro
+
+        Args:
+            nombre (str): Nombre de la hoja
+            df: DataFrame a escribir (sin índice)
+            incluir (bool): Si es False la hoja no se escribe en el libro (solo el anexo, si se pide)
+            max_filas (int): Máximo de filas en la hoja (None = todas, hasta el límite de Excel)
+            anexo (str): 'csv.gz' o 'parquet' para guardar además todas las filas en un archivo aparte
+
+        Returns:
+            str: Ruta del archivo anexo, o None si no se pidió
+        """
+        ruta_anexo = self.escribir_anexo(nombre, df, anexo) if anexo else None
+        if not incluir:
+            return ruta_anexo
+
+        limite = min(max_filas if max_filas is not None else MAX_FILAS_EXCEL, MAX_FILAS_EXCEL)
+        if len(df) > limite:
+            print(f"⚠️  Hoja '{nombre}': se escriben {limite:,} de {len(df):,} filas"
+                  f"{f' (todas en {ruta_anexo})' if ruta_anexo else ''}")
+        encabezados = [str(columna) for columna in df.columns]
+
+        if self.motor == 'xlsxwriter':
+            hoja = self.libro.add_worksheet(nombre)
+            hoja.write_row(0, 0, encabezados, self.formato_encabezado)
+            fila = 1
+            for valores in self._bloques(df, limite):
+                for valores_fila in valores:
+                    hoja.write_row(fila, 0, valores_fila)
+                    fila += 1
+        else:
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+
+            hoja = self.libro.create_sheet(nombre)
+            celdas = []
+            for texto in encabezados:
+                celda = WriteOnlyCell(hoja, value=texto)
+                celda.font = Font(bold=True)
+                celdas.append(celda)
+            hoja.append(celdas)
+            for valores in self._bloques(df, limite):
+                for valores_fila in valores:
+                    hoja.append(valores_fila)
+        return ruta_anexo
+
+    def _bloques(self, df, limite):
+        """Filas del DataFrame por bloques, como listas de valores de Python con None en los nulos"""
+        for inicio in range(0, min(len(df), limite), self.filas_por_bloque):
+            bloque = df.iloc[inicio:min(inicio + self.filas_por_bloque, limite)].astype(object)
+            yield bloque.where(bloque.notna(), None).to_numpy().tolist()
+
+    def escribir_anexo(self, nombre, df, formato):
+        """
+        Guarda todas las filas de una hoja en un archivo junto al libro
+
+        Args:
+            nombre (str): Nombre de la hoja (se usa en el nombre del archivo)
+            df: DataFrame a guardar
+            formato (str): 'csv.gz' o 'parquet'
+
+        Returns:
+            str: Ruta del archivo anexo
+        """
+        if formato not in FORMATOS_ANEXO:
+            raise ValueError(f"Formato de anexo desconocido: {formato}. Opciones: {list(FORMATOS_ANEXO)}")
+        if formato == 'parquet' and not parquet_disponible():
+            print("ℹ️  pyarrow no está instalado: el anexo se guarda como CSV.gz")
+            formato = 'csv.gz'
+
+        base = os.path.splitext(self.nombre_archivo)[0]
+        sufijo = re.sub(r'\W+', '_', nombre.lower()).strip('_')
+        ruta = f"{base}_{sufijo}.{formato}"
+
+        if formato == 'csv.gz':
+            df.to_csv(ruta, index=False, compression='gzip', chunksize=self.filas_por_bloque)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            df = CacheDatos._normalizar_para_parquet(df)
+            esquema = pa.Schema.from_pandas(df, preserve_index=False)
+            with pq.ParquetWriter(ruta, esquema) as escritor:
+                for inicio in range(0, len(df), self.filas_por_bloque):
+                    bloque = df.iloc[inicio:inicio + self.filas_por_bloque]
+                    escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+
+        self.anexos.append(ruta)
+        print(f"📎 Anexo de '{nombre}' guardado como: {ruta}")
+        return ruta
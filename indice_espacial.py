@@ -0,0 +1,215 @@
+import math
+import numpy as np
+from distancias import RADIO_TIERRA_KM
+
+
+class IndiceEspacial:
+    def __init__(self, lats, lons, clientes_por_celda=4):
+        """
+        Índice espacial en rejilla sobre coordenadas proyectadas
+
+        Las coordenadas se proyectan a un plano local en km (equirectangular
+        alrededor de la latitud media, ver distancias.py) y se agrupan en
+        celdas cuadradas de tamaño uniforme. Las consultas de k vecinos y de
+        radio solo revisan las celdas cercanas al punto, por lo que su costo
+        depende de la densidad local y no del total de clientes. Los puntos se
+        pueden desactivar (por ejemplo, al asignarlos a una ruta) para que no
+        aparezcan en consultas posteriores.
+
+        Args:
+            lats, lons: Coordenadas de los puntos
+            clientes_por_celda (int): Ocupación media deseada de cada celda
+        """
+        lats = np.asarray(lats, dtype='float64')
+        lons = np.asarray(lons, dtype='float64')
+        self.n = len(lats)
+        self.cos_lat = math.cos(math.radians(lats.mean())) if self.n else 1.0
+        self.x, self.y = self.proyectar(lats, lons)
+        self.activos = np.ones(self.n, dtype=bool)
+        self.total_activos = self.n
+
+        self.clientes_por_celda = clientes_por_celda
+        self._construir(np.arange(self.n))
+
+    def _construir(self, indices):
+        """Agrupa en celdas los puntos indicados (los activos)"""
+        self.indexados = len(indices)
+        # Tamaño de celda para que cada una tenga en promedio `clientes_por_celda` puntos
+        if len(indices):
+            x, y = self.x[indices], self.y[indices]
+            ancho = max(x.max() - x.min(), 1e-6)
+            alto = max(y.max() - y.min(), 1e-6)
+            self.tam_celda = max(np.sqrt(ancho * alto * self.clientes_por_celda / len(indices)), 1e-3)
+            self.x0, self.y0 = x.min(), y.min()
+        else:
+            self.tam_celda, self.x0, self.y0 = 1.0, 0.0, 0.0
+
+        # Celdas: índices de los puntos ordenados por celda y rango [inicio, fin) de cada celda
+        cx, cy = self._celda(self.x[indices], self.y[indices])
+        orden = np.lexsort((cy, cx))
+        self.orden = indices[orden]
+        self.max_cx = int(cx.max()) if len(indices) else 0
+        self.max_cy = int(cy.max()) if len(indices) else 0
+        self.inicio_celda = np.zeros((self.max_cx + 1, self.max_cy + 1), dtype=np.int64)
+        self.fin_celda = np.zeros((self.max_cx + 1, self.max_cy + 1), dtype=np.int64)
+        if len(indices):
+            cx, cy = cx[orden], cy[orden]
+            cortes = np.flatnonzero((np.diff(cx) != 0) | (np.diff(cy) != 0)) + 1
+            inicios = np.r_[0, cortes]
+            finales = np.r_[cortes, len(indices)]
+            self.inicio_celda[cx[inicios], cy[inicios]] = inicios
+            self.fin_celda[cx[inicios], cy[inicios]] = finales
+
+    def proyectar(self, lats, lons):
+        """Proyecta coordenadas a km en el plano local del índice"""
+        x = RADIO_TIERRA_KM * np.radians(np.asarray(lons, dtype='float64')) * self.cos_lat
+        y = RADIO_TIERRA_KM * np.radians(np.asarray(lats, dtype='float64'))
+        return x, y
+
+    def _celda(self, x, y):
+        return (np.floor((x - self.x0) / self.tam_celda).astype(np.int64),
+                np.floor((y - self.y0) / self.tam_celda).astype(np.int64))
+
+    def _ubicar(self, lat, lon):
+        """Proyección y celda de un solo punto de consulta"""
+        px = RADIO_TIERRA_KM * math.radians(lon) * self.cos_lat
+        py = RADIO_TIERRA_KM * math.radians(lat)
+        return px, py, math.floor((px - self.x0) / self.tam_celda), math.floor((py - self.y0) / self.tam_celda)
+
+    def desactivar(self, indices):
+        """Excluye puntos de las consultas siguientes"""
+        indices = np.atleast_1d(indices)
+        self.total_activos -= int(self.activos[indices].sum())
+        self.activos[indices] = False
+        # Reagrupar cuando quedan pocos puntos activos, para no recorrer celdas vacías
+        if 0 < self.total_activos <= self.indexados // 4:
+            self._construir(np.flatnonzero(self.activos))
+
+    def _anillo(self, cx, cy, r):
+        """Índices de los puntos activos en las celdas a distancia de Chebyshev r (dentro de la rejilla)"""
+        x_min, x_max = max(cx - r, 0), min(cx + r, self.max_cx)
+        y_min, y_max = max(cy - r + 1, 0), min(cy + r - 1, self.max_cy)
+        inicios, finales = [], []
+        for y in {cy - r, cy + r}:
+            if 0 <= y <= self.max_cy and x_min <= x_max:
+                inicios.append(self.inicio_celda[x_min:x_max + 1, y])
+                finales.append(self.fin_celda[x_min:x_max + 1, y])
+        for x in {cx - r, cx + r}:
+            if 0 <= x <= self.max_cx and y_min <= y_max:
+                inicios.append(self.inicio_celda[x, y_min:y_max + 1])
+                finales.append(self.fin_celda[x, y_min:y_max + 1])
+        if not inicios:
+            return np.empty(0, dtype=np.int64)
+        inicios = np.concatenate(inicios)
+        largos = np.concatenate(finales) - inicios
+        if not largos.any():
+            return np.empty(0, dtype=np.int64)
+        # Expandir los rangos [inicio, fin) de todas las celdas en una sola operación
+        desplazamientos = np.repeat(inicios - np.cumsum(largos) + largos, largos)
+        candidatos = self.orden[desplazamientos + np.arange(largos.sum())]
+        return candidatos[self.activos[candidatos]]
+
+    def _rango_anillos(self, cx, cy):
+        """Primer y último anillo alrededor de (cx, cy) que tocan la rejilla"""
+        r_min = max(0, -cx, cx - self.max_cx, -cy, cy - self.max_cy)
+        r_max = max(abs(cx), abs(cx - self.max_cx), abs(cy), abs(cy - self.max_cy))
+        return r_min, r_max
+
+    def k_vecinos(self, lat, lon, k=1):
+        """
+        Busca los k puntos activos más cercanos
+
+        Returns:
+            tuple: (índices, distancias en km), ordenados de menor a mayor distancia
+        """
+        if self.total_activos == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        k = min(k, self.total_activos)
+        px, py, cx, cy = self._ubicar(lat, lon)
+        candidatos = []
+        encontrados = 0
+        r, radio_maximo = self._rango_anillos(cx, cy)
+        while r <= radio_maximo:
+            anillo = self._anillo(cx, cy, r)
+            if len(anillo):
+                candidatos.append(anillo)
+                encontrados += len(anillo)
+            if encontrados >= k:
+                indices = np.concatenate(candidatos)
+                distancias = np.hypot(self.x[indices] - px, self.y[indices] - py)
+                kesima = np.partition(distancias, k - 1)[k - 1]
+                # Todo punto fuera de los anillos revisados está al menos a r celdas completas
+                if kesima <= r * self.tam_celda:
+                    break
+            r += 1
+        indices = np.concatenate(candidatos)
+        distancias = np.hypot(self.x[indices] - px, self.y[indices] - py)
+        seleccion = np.argsort(distancias, kind='stable')[:k]
+        return indices[seleccion], distancias[seleccion]
+
+    def k_vecinos_todos(self, k):
+        """
+        Busca los k vecinos más cercanos de cada punto activo (sin incluirse a sí mismo)
+
+        Las consultas se agrupan por celda: los puntos de una misma celda
+        comparten los anillos candidatos, por lo que las distancias se calculan
+        como una matriz por celda en lugar de una consulta por punto.
+
+        Returns:
+            tuple: (índices n×k, distancias n×k en km), cada fila ordenada de menor
+            a mayor distancia; las filas de puntos inactivos quedan en -1 / inf
+        """
+        k = max(min(k, self.total_activos - 1), 0)
+        vecinos = np.full((self.n, k), -1, dtype=np.int64)
+        distancias = np.full((self.n, k), np.inf)
+        if k == 0:
+            return vecinos, distancias
+
+        for cx, cy in np.argwhere(self.fin_celda > self.inicio_celda).tolist():
+            propios = self.orden[self.inicio_celda[cx, cy]:self.fin_celda[cx, cy]]
+            propios = propios[self.activos[propios]]
+            if len(propios) == 0:
+                continue
+            candidatos = []
+            encontrados = 0
+            r, radio_maximo = self._rango_anillos(cx, cy)
+            while r <= radio_maximo:
+                anillo = self._anillo(cx, cy, r)
+                if len(anillo):
+                    candidatos.append(anillo)
+                    encontrados += len(anillo)
+                if encontrados > k:
+                    indices = np.concatenate(candidatos)
+                    matriz = self._distancias_entre(propios, indices)
+                    kesimas = np.partition(matriz, k - 1, axis=1)[:, k - 1]
+                    # Todo punto fuera de los anillos revisados está al menos a r celdas completas
+                    if (kesimas <= r * self.tam_celda).all():
+                        break
+                r += 1
+            indices = np.concatenate(candidatos)
+            matriz = self._distancias_entre(propios, indices)
+            seleccion = np.argpartition(matriz, k - 1, axis=1)[:, :k]
+            d = np.take_along_axis(matriz, seleccion, axis=1)
+            orden = np.argsort(d, axis=1, kind='stable')
+            vecinos[propios] = indices[np.take_along_axis(seleccion, orden, axis=1)]
+            distancias[propios] = np.take_along_axis(d, orden, axis=1)
+        return vecinos, distancias
+
+    def _distancias_entre(self, origenes, destinos):
+        """Matriz de distancias (km) en el plano, excluyendo cada punto de sí mismo"""
+        matriz = np.hypot(self.x[origenes, None] - self.x[None, destinos],
+                          self.y[origenes, None] - self.y[None, destinos])
+        matriz[origenes[:, None] == destinos[None, :]] = np.inf
+        return matriz
+
+    def en_radio(self, lat, lon, radio_km):
+        """Índices y distancias (km) de los puntos activos a menos de radio_km"""
+        px, py, cx, cy = self._ubicar(lat, lon)
+        r_min, r_max = self._rango_anillos(cx, cy)
+        alcance = min(int(np.ceil(radio_km / self.tam_celda)), r_max)
+        bloques = [self._anillo(cx, cy, r) for r in range(r_min, alcance + 1)]
+        indices = np.concatenate(bloques) if bloques else np.empty(0, dtype=np.int64)
+        distancias = np.hypot(self.x[indices] - px, self.y[indices] - py)
+        dentro = distancias <= radio_km
+        orden = np.argsort(distancias[dentro], kind='stable')
+        return indices[dentro][orden], distancias[dentro][orden]
@@ -236,13 +236,13 @@ def main_interactivo():
         print("GENERANDO ARCHIVOS DE SALIDA")
         print("="*50)
         
-        # Mapa interactivo
+        # Mapa interactivo y reporte Excel, en paralelo
         nombre_mapa = f"{parametros['nombre_archivo']}_mapa.html"
-        analizador.generar_mapa(rutas, centro_coords, nombre_mapa)
-        
-        # Reporte Excel
         nombre_excel = f"{parametros['nombre_archivo']}.xlsx"
-        analizador.generar_reporte_excel(rutas, df_ordenado, columnas_clave, nombre_excel)
+        analizador.generar_artefactos([
+            ('mapa', nombre_mapa, 'generar_mapa', (rutas, centro_coords)),
+            ('excel', nombre_excel, 'generar_reporte_excel', (rutas, df_ordenado, columnas_clave)),
+        ])
         
         print("\n" + "="*60)
         print("ANÁLISIS COMPLETADO EXITOSAMENTE")
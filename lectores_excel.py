@@ -0,0 +1,120 @@
+import os
+import pandas as pd
+
+
+class LectorOpenpyxl:
+    """Lee hojas de Excel con openpyxl en modo de solo lectura (streaming)"""
+    nombre = 'openpyxl'
+
+    def disponible(self):
+        try:
+            import openpyxl  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def encabezados(self, archivo, hoja):
+        from openpyxl import load_workbook
+
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            for fila in libro[hoja].iter_rows(min_row=1, max_row=1, values_only=True):
+                return [valor for valor in fila if valor is not None]
+            return []
+        finally:
+            libro.close()
+
+    def leer(self, archivo, hoja, columnas=None):
+        return pd.read_excel(archivo, sheet_name=hoja, usecols=columnas, engine='openpyxl')
+
+
+class LectorCalamine:
+    """Lee hojas de Excel con python-calamine (lector escrito en Rust)"""
+    nombre = 'calamine'
+
+    def disponible(self):
+        try:
+            import python_calamine  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def encabezados(self, archivo, hoja):
+        return list(pd.read_excel(archivo, sheet_name=hoja, nrows=0, engine='calamine').columns)
+
+    def leer(self, archivo, hoja, columnas=None):
+        return pd.read_excel(archivo, sheet_name=hoja, usecols=columnas, engine='calamine')
+
+
+class LectorCSV:
+    """Lee una exportación CSV de la hoja (el nombre de hoja se ignora)"""
+    nombre = 'csv'
+
+    def disponible(self):
+        return True
+
+    def encabezados(self, archivo, hoja):
+        return list(pd.read_csv(archivo, nrows=0).columns)
+
+    def leer(self, archivo, hoja, columnas=None):
+        return pd.read_csv(archivo, usecols=columnas)
+
+
+# Motores de lectura registrados, en orden de preferencia para 'auto'
+MOTORES = {
+    'calamine': LectorCalamine(),
+    'openpyxl': LectorOpenpyxl(),
+    'csv': LectorCSV(),
+}
+
+
+def registrar_motor(lector):
+    """Registra un motor de lectura adicional (objeto con nombre, disponible, encabezados y leer)"""
+    MOTORES[lector.nombre] = lector
+
+
+def motores_disponibles():
+    """Lista los nombres de los motores que se pueden usar en este equipo"""
+    return [nombre for nombre, lector in MOTORES.items() if lector.disponible()]
+
+
+def obtener_lector(archivo, motor='auto'):
+    """
+    Devuelve el lector a usar para un archivo
+
+    Args:
+        archivo (str): Ruta al archivo de datos
+        motor (str): Nombre del motor o 'auto' para elegir el más rápido instalado
+    """
+    if motor == 'auto':
+        if os.path.splitext(archivo)[1].lower() == '.csv':
+            return MOTORES['csv']
+        for nombre in ('calamine', 'openpyxl'):
+            if MOTORES[nombre].disponible():
+                return MOTORES[nombre]
+        raise ImportError("No hay motor de lectura de Excel instalado (instale openpyxl)")
+
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de lectura desconocido: {motor}. Opciones: {list(MOTORES)}")
+    lector = MOTORES[motor]
+    if not lector.disponible():
+        raise ImportError(f"El motor de lectura '{motor}' no está instalado")
+    return lector
+
+
+def leer_encabezados(archivo, hoja, motor='auto'):
+    """Lee solo la fila de encabezados de la hoja"""
+    return obtener_lector(archivo, motor).encabezados(archivo, hoja)
+
+
+def leer_tabla(archivo, hoja, columnas=None, motor='auto'):
+    """
+    Lee la hoja completa o solo las columnas indicadas
+
+    Args:
+        archivo (str): Ruta al archivo de datos
+        hoja (str): Nombre de la hoja
+        columnas (list): Columnas a leer (None para todas)
+        motor (str): Ver `obtener_lector`
+    """
+    return obtener_lector(archivo, motor).leer(archivo, hoja, columnas)
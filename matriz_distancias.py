@@ -0,0 +1,215 @@
+import os
+import re
+import glob
+import hashlib
+import tempfile
+import numpy as np
+from distancias import distancia_km
+
+# Carpeta por defecto de las matrices de distancia persistidas
+CARPETA_MATRICES = os.path.join("Data", ".cache", "matrices")
+
+# Sufijo de los archivos de un centro: hash de 16 caracteres hexadecimales
+PATRON_CLAVE = '[0-9a-f]' * 16
+
+# Decimales con los que se comparan coordenadas (~0.1 m)
+DECIMALES_COORDENADAS = 6
+
+
+class MatrizDistancias:
+    """Matriz de distancias (km, float32) entre clientes, con el orden de filas del almacén"""
+
+    def __init__(self, matriz, ids, posiciones):
+        """
+        Args:
+            matriz: Arreglo n×n (normalmente np.memmap de solo lectura)
+            ids: Identificadores de cliente en el orden de las filas de la matriz
+            posiciones: Fila de la matriz de cada cliente, en el orden pedido por el llamador
+        """
+        self.matriz = matriz
+        self.ids = ids
+        self.posiciones = posiciones
+
+    def __len__(self):
+        return len(self.posiciones)
+
+    def submatriz(self, indices=None):
+        """Matriz densa entre los clientes indicados (índices en el orden del llamador)"""
+        filas = self.posiciones if indices is None else self.posiciones[np.asarray(indices)]
+        return np.asarray(self.matriz[np.ix_(filas, filas)])
+
+    def distancia(self, i, j):
+        """Distancia entre los clientes i y j (índices en el orden del llamador)"""
+        return float(self.matriz[self.posiciones[i], self.posiciones[j]])
+
+
+class AlmacenMatrizDistancias:
+    def __init__(self, carpeta=CARPETA_MATRICES, metodo='haversine', tam_bloque=2048):
+        """
+        Inicializa el almacén de matrices de distancia por centro
+
+        La matriz completa entre los clientes de un centro se calcula una vez
+        y se guarda como archivo .npy float32 que se abre con memoria mapeada.
+        La clave es un hash del conjunto de clientes y coordenadas; si cambia,
+        se reutiliza la matriz anterior del centro y solo se calculan las filas
+        de clientes nuevos o que cambiaron de ubicación.
+
+        Args:
+            carpeta (str): Carpeta donde se guardan las matrices
+            metodo (str): Método de distancia (ver distancias.py)
+            tam_bloque (int): Filas calculadas por bloque (limita la memoria usada)
+        """
+        self.carpeta = carpeta
+        self.metodo = metodo
+        self.tam_bloque = tam_bloque
+
+    @staticmethod
+    def _nombre_centro(centro):
+        """
+        Nombre de archivo seguro para un centro
+
+        Lleva un hash corto del nombre original para que centros que se limpian
+        igual ("CENTRO NORTE", "CENTRO-NORTE") no compartan archivos.
+        """
+        seguro = re.sub(r'[^0-9A-Za-z]+', '_', str(centro)).strip('_') or 'centro'
+        return f"{seguro}_{hashlib.sha1(str(centro).encode('utf-8')).hexdigest()[:8]}"
+
+    def _hash(self, ids, lats, lons):
+        """Hash del conjunto de clientes con sus coordenadas (independiente del orden)"""
+        h = hashlib.sha1(self.metodo.encode('utf-8'))
+        h.update('\x1f'.join(ids.tolist()).encode('utf-8'))
+        h.update(np.round(lats, DECIMALES_COORDENADAS).tobytes())
+        h.update(np.round(lons, DECIMALES_COORDENADAS).tobytes())
+        return h.hexdigest()[:16]
+
+    def _rutas(self, centro, clave):
+        base = os.path.join(self.carpeta, f"{self._nombre_centro(centro)}_{clave}")
+        return f"{base}.npy", f"{base}_clientes.npz"
+
+    def _entrada_anterior(self, centro):
+        """Última matriz guardada del centro (ids, lats, lons, matriz) o None"""
+        patron = os.path.join(self.carpeta, f"{self._nombre_centro(centro)}_{PATRON_CLAVE}_clientes.npz")
+        candidatos = sorted(glob.glob(patron), key=os.path.getmtime, reverse=True)
+        for ruta_clientes in candidatos:
+            ruta_matriz = ruta_clientes.replace('_clientes.npz', '.npy')
+            if not os.path.exists(ruta_matriz):
+                continue
+            with np.load(ruta_clientes, allow_pickle=False) as datos:
+                if str(datos['metodo']) != self.metodo:
+                    continue
+                return datos['ids'], datos['lats'], datos['lons'], np.load(ruta_matriz, mmap_mode='r')
+        return None
+
+    def _ruta_temporal(self, ruta_final, sufijo):
+        """
+        Archivo temporal único junto a ruta_final (oculto, para que no coincida con los patrones del centro)
+
+        Cada proceso escribe en su propio temporal, de modo que dos procesos que
+        calculan la misma matriz a la vez no se pisan.
+        """
+        descriptor, ruta = tempfile.mkstemp(dir=self.carpeta, prefix=f".{os.path.basename(ruta_final)}.", suffix=sufijo)
+        os.close(descriptor)
+        return ruta
+
+    def _publicar(self, ruta_temporal, ruta_final):
+        """
+        Mueve el temporal a su nombre final
+
+        Si otro proceso ya publicó el mismo archivo (misma clave, mismo contenido)
+        y no se puede reemplazar, se conserva el suyo y se descarta el temporal.
+        """
+        try:
+            os.replace(ruta_temporal, ruta_final)
+        except OSError:
+            if not os.path.exists(ruta_final):
+                raise
+            os.remove(ruta_temporal)
+
+    def _calcular_filas(self, matriz, filas, lats, lons):
+        """Calcula por bloques las filas (y columnas simétricas) indicadas"""
+        for inicio in range(0, len(filas), self.tam_bloque):
+            bloque = filas[inicio:inicio + self.tam_bloque]
+            distancias = distancia_km(lats[bloque, None], lons[bloque, None], lats[None, :], lons[None, :], self.metodo)
+            matriz[bloque, :] = distancias
+            matriz[:, bloque] = distancias.T
+
+    def obtener(self, centro, ids, lats, lons):
+        """
+        Devuelve la matriz de distancias entre los clientes de un centro
+
+        Args:
+            centro: Nombre del centro (agrupa las versiones de la matriz)
+            ids: Identificadores de cliente (uno por cliente, sin repetir)
+            lats, lons: Coordenadas de cada cliente
+
+        Returns:
+            MatrizDistancias: Matriz persistida y posiciones en el orden de `ids`
+        """
+        ids_texto = np.asarray([str(i) for i in ids])
+        lats = np.asarray(lats, dtype='float64')
+        lons = np.asarray(lons, dtype='float64')
+
+        # Las filas se guardan ordenadas por id para que la clave no dependa del orden
+        orden = np.argsort(ids_texto, kind='stable')
+        posiciones = np.empty(len(orden), dtype=np.int64)
+        posiciones[orden] = np.arange(len(orden))
+        ids_ord, lats_ord, lons_ord = ids_texto[orden], lats[orden], lons[orden]
+
+        clave = self._hash(ids_ord, lats_ord, lons_ord)
+        ruta_matriz, ruta_clientes = self._rutas(centro, clave)
+
+        if os.path.exists(ruta_matriz) and os.path.exists(ruta_clientes):
+            print(f"⚡ Matriz de distancias reutilizada para {centro} ({len(ids_ord)} clientes)")
+            return MatrizDistancias(np.load(ruta_matriz, mmap_mode='r'), ids_ord, posiciones)
+
+        os.makedirs(self.carpeta, exist_ok=True)
+        n = len(ids_ord)
+        ruta_temporal = self._ruta_temporal(ruta_matriz, '.npy')
+        matriz = np.lib.format.open_memmap(ruta_temporal, mode='w+', dtype='float32', shape=(n, n))
+
+        anterior = self._entrada_anterior(centro)
+        pendientes = np.arange(n)
+        if anterior is not None:
+            ids_ant, lats_ant, lons_ant, matriz_ant = anterior
+            indice_ant = {cliente: i for i, cliente in enumerate(ids_ant.tolist())}
+            fila_ant = np.array([indice_ant.get(cliente, -1) for cliente in ids_ord.tolist()], dtype=np.int64)
+            existe = fila_ant >= 0
+            # Un cliente se conserva si ya existía y no cambió de ubicación
+            conservado = existe.copy()
+            conservado[existe] = (
+                (np.round(lats_ant[fila_ant[existe]], DECIMALES_COORDENADAS) == np.round(lats_ord[existe], DECIMALES_COORDENADAS)) &
+                (np.round(lons_ant[fila_ant[existe]], DECIMALES_COORDENADAS) == np.round(lons_ord[existe], DECIMALES_COORDENADAS))
+            )
+            nuevas = np.flatnonzero(conservado)
+            viejas = fila_ant[conservado]
+            for inicio in range(0, len(nuevas), self.tam_bloque):
+                matriz[nuevas[inicio:inicio + self.tam_bloque, None], nuevas[None, :]] = \
+                    matriz_ant[viejas[inicio:inicio + self.tam_bloque, None], viejas[None, :]]
+            pendientes = np.flatnonzero(~conservado)
+            print(f"♻️  Matriz de distancias de {centro}: {len(nuevas)} clientes reutilizados, "
+                  f"{len(pendientes)} nuevos o reubicados")
+            del matriz_ant
+        else:
+            print(f"🧮 Calculando matriz de distancias para {centro} ({n} clientes)")
+
+        self._calcular_filas(matriz, pendientes, lats_ord, lons_ord)
+        matriz.flush()
+        del matriz
+        self._publicar(ruta_temporal, ruta_matriz)
+        ruta_temporal = self._ruta_temporal(ruta_clientes, '.npz')
+        np.savez(ruta_temporal, ids=ids_ord, lats=lats_ord, lons=lons_ord, metodo=np.array(self.metodo))
+        self._publicar(ruta_temporal, ruta_clientes)
+
+        self._eliminar_anteriores(centro, ruta_matriz)
+        return MatrizDistancias(np.load(ruta_matriz, mmap_mode='r'), ids_ord, posiciones)
+
+    def _eliminar_anteriores(self, centro, ruta_vigente):
+        """Conserva solo la matriz vigente de cada centro"""
+        base_vigente = ruta_vigente[:-len('.npy')]
+        patron = os.path.join(self.carpeta, f"{self._nombre_centro(centro)}_{PATRON_CLAVE}*")
+        for ruta in glob.glob(patron):
+            if not ruta.startswith(base_vigente):
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
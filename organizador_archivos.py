@@ -32,11 +32,18 @@ class OrganizadorArchivos:
         else:
             nombre_carpeta = f"analisis_{tipo_analisis}_{timestamp}"
         
-        # Crear ruta completa
-        self.carpeta_actual = os.path.join(self.carpeta_base, nombre_carpeta)
-        
-        # Crear carpetas si no existen
-        os.makedirs(self.carpeta_actual, exist_ok=True)
+        # Crear ruta completa (con sufijo si otro análisis creó la misma carpeta en el mismo segundo)
+        os.makedirs(self.carpeta_base, exist_ok=True)
+        carpeta = os.path.join(self.carpeta_base, nombre_carpeta)
+        sufijo = 1
+        while True:
+            try:
+                os.mkdir(carpeta)
+                break
+            except FileExistsError:
+                sufijo += 1
+                carpeta = os.path.join(self.carpeta_base, f"{nombre_carpeta}_{sufijo}")
+        self.carpeta_actual = carpeta
         
         # Crear subcarpetas
         subcarpetas = ['Mapas', 'Reportes_Excel', 'Datos_Originales']
@@ -132,13 +139,12 @@ class OrganizadorArchivos:
         
         print(f"📝 Información del reporte guardada: {archivo_info}")
     
-    def obtener_ruta_archivo(self, nombre_archivo, tipo="excel"):
+    def obtener_carpeta(self, tipo="excel"):
         """
-        Obtiene la ruta completa donde se debe guardar un archivo
+        Obtiene la carpeta donde se guardan los archivos de un tipo
         
         Args:
-            nombre_archivo (str): Nombre del archivo
-            tipo (str): Tipo de archivo
+            tipo (str): Tipo de archivo ('excel', 'mapa', 'datos')
         """
         if tipo == "excel":
             subcarpeta = "Reportes_Excel"
@@ -150,9 +156,19 @@ class OrganizadorArchivos:
             subcarpeta = ""
         
         if subcarpeta:
-            return os.path.join(self.carpeta_actual, subcarpeta, nombre_archivo)
+            return os.path.join(self.carpeta_actual, subcarpeta)
         else:
-            return os.path.join(self.carpeta_actual, nombre_archivo)
+            return self.carpeta_actual
+    
+    def obtener_ruta_archivo(self, nombre_archivo, tipo="excel"):
+        """
+        Obtiene la ruta completa donde se debe guardar un archivo
+        
+        Args:
+            nombre_archivo (str): Nombre del archivo
+            tipo (str): Tipo de archivo
+        """
+        return os.path.join(self.obtener_carpeta(tipo), nombre_archivo)
     
     def limpiar_archivos_temporales(self):
         """
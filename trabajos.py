@@ -0,0 +1,263 @@
+"""
+Cola de trabajos con identificador para la interfaz web
+
+Cada análisis enviado desde la web es un Trabajo con su propio estado,
+progreso, resultado y error, y se ejecuta en un grupo acotado de hilos
+(GestorTrabajos). Si ya hay demasiados trabajos esperando, el envío se
+rechaza con ColaLlenaError para que el cliente reintente más tarde en lugar
+de acumular trabajo sin límite.
+
+Cada cambio de un trabajo incrementa su versión y despierta a quienes esperan
+en esperar_cambio(), lo que permite enviar el progreso como eventos (SSE)
+en cuanto ocurre en lugar de consultarlo periódicamente.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Estados posibles de un trabajo
+ESTADOS_TRABAJO = ('en_cola', 'en_proceso', 'completado', 'error', 'cancelado')
+ESTADOS_FINALES = ('completado', 'error', 'cancelado')
+
+
+class ColaLlenaError(Exception):
+    """La cola de trabajos alcanzó su límite de trabajos en espera"""
+
+
+class Trabajo:
+    def __init__(self, descripcion="", parametros=None):
+        """
+        Trabajo enviado al gestor
+
+        Args:
+            descripcion (str): Texto breve para mostrar (p. ej. el centro analizado)
+            parametros (dict): Parámetros del trabajo (se devuelven en su estado)
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.descripcion = descripcion
+        self.parametros = parametros or {}
+        self.estado = 'en_cola'
+        self.progreso = 0
+        self.mensaje = 'En cola'
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.iniciado = None
+        self.finalizado = None
+        self.contexto = {}  # Objetos del trabajo que no se serializan (p. ej. el analizador usado)
+        self.futuro = None
+        self.version = 0  # Aumenta con cada cambio de estado, progreso o mensaje
+        self._bloqueo = threading.Condition()
+
+    @property
+    def terminado(self):
+        return self.estado in ESTADOS_FINALES
+
+    def _cambio(self):
+        """Registra un cambio y despierta a quienes lo esperan (con el bloqueo tomado)"""
+        self.version += 1
+        self._bloqueo.notify_all()
+
+    def esperar_cambio(self, version, tiempo_maximo=None):
+        """
+        Espera a que el trabajo cambie respecto de una versión conocida
+
+        Args:
+            version (int): Última versión conocida (None = no esperar)
+            tiempo_maximo (float): Segundos máximos de espera
+
+        Returns:
+            int: Versión actual (igual a `version` si se agotó el tiempo sin cambios)
+        """
+        with self._bloqueo:
+            self._bloqueo.wait_for(lambda: self.version != version, tiempo_maximo)
+            return self.version
+
+    def actualizar(self, progreso=None, mensaje=None):
+        """Registra el avance del trabajo (progreso de 0 a 100); solo cuenta como cambio si algo varía"""
+        with self._bloqueo:
+            progreso = self.progreso if progreso is None else max(0, min(100, int(progreso)))
+            mensaje = self.mensaje if mensaje is None else mensaje
+            if (progreso, mensaje) != (self.progreso, self.mensaje):
+                self.progreso, self.mensaje = progreso, mensaje
+                self._cambio()
+
+    def iniciar(self):
+        with self._bloqueo:
+            self.estado = 'en_proceso'
+            self.mensaje = 'Iniciando...'
+            self.iniciado = time.time()
+            self._cambio()
+
+    def completar(self, resultado=None, mensaje=None):
+        """Marca el trabajo como completado (salvo que ya haya terminado con error); sin mensaje conserva el último"""
+        with self._bloqueo:
+            if self.terminado:
+                return
+            self.estado = 'completado'
+            self.progreso = 100
+            if mensaje is not None:
+                self.mensaje = mensaje
+            self.resultado = resultado
+            self.finalizado = time.time()
+            self._cambio()
+
+    def fallar(self, error):
+        """Marca el trabajo como terminado con error"""
+        with self._bloqueo:
+            if self.terminado:
+                return
+            self.estado = 'error'
+            self.error = error
+            self.mensaje = error
+            self.finalizado = time.time()
+            self._cambio()
+
+    def cancelar(self):
+        with self._bloqueo:
+            self.estado = 'cancelado'
+            self.mensaje = 'Trabajo cancelado'
+            self.finalizado = time.time()
+            self._cambio()
+
+    def avance(self):
+        """Estado resumido del trabajo (sin parámetros ni resultado) para los eventos de progreso"""
+        with self._bloqueo:
+            return {
+                'id': self.id,
+                'version': self.version,
+                'estado': self.estado,
+                'progreso': self.progreso,
+                'mensaje': self.mensaje,
+            }
+
+    def a_diccionario(self):
+        """Estado del trabajo listo para serializar a JSON"""
+        with self._bloqueo:
+            return {
+                'id': self.id,
+                'version': self.version,
+                'descripcion': self.descripcion,
+                'estado': self.estado,
+                'en_proceso': self.estado == 'en_proceso',
+                'progreso': self.progreso,
+                'mensaje': self.mensaje,
+                'resultado': self.resultado,
+                'error': self.error,
+                'parametros': self.parametros,
+                'creado': self.creado,
+                'iniciado': self.iniciado,
+                'finalizado': self.finalizado,
+            }
+
+
+class GestorTrabajos:
+    def __init__(self, max_trabajadores=2, max_en_cola=10, max_historial=50):
+        """
+        Ejecuta trabajos en un grupo acotado de hilos
+
+        Args:
+            max_trabajadores (int): Trabajos que se ejecutan a la vez
+            max_en_cola (int): Trabajos que pueden esperar turno; más allá se rechazan con ColaLlenaError
+            max_historial (int): Trabajos terminados que se conservan para consultarlos
+        """
+        self.max_trabajadores = max_trabajadores
+        self.max_en_cola = max_en_cola
+        self.max_historial = max_historial
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_trabajadores, thread_name_prefix='trabajo')
+        self._trabajos = OrderedDict()
+        self._bloqueo = threading.Lock()
+
+    def en_cola(self):
+        """Número de trabajos esperando turno"""
+        with self._bloqueo:
+            return sum(1 for trabajo in self._trabajos.values() if trabajo.estado == 'en_cola')
+
+    def enviar(self, funcion, *args, descripcion="", parametros=None, **kwargs):
+        """
+        Encola un trabajo
+
+        La función recibe el Trabajo como primer argumento para informar su
+        avance con trabajo.actualizar(); lo que devuelve queda como resultado.
+
+        Returns:
+            Trabajo: El trabajo creado
+
+        Raises:
+            ColaLlenaError: Si ya hay max_en_cola trabajos esperando
+        """
+        with self._bloqueo:
+            esperando = sum(1 for trabajo in self._trabajos.values() if trabajo.estado == 'en_cola')
+            if esperando >= self.max_en_cola:
+                raise ColaLlenaError(f"Hay {esperando} trabajos en cola (máximo {self.max_en_cola}); intente más tarde")
+            trabajo = Trabajo(descripcion, parametros)
+            self._trabajos[trabajo.id] = trabajo
+            self._depurar()
+            trabajo.futuro = self._ejecutor.submit(self._ejecutar, trabajo, funcion, args, kwargs)
+        print(f"📥 Trabajo {trabajo.id} en cola: {descripcion}")
+        return trabajo
+
+    def registrar_completado(self, resultado, descripcion="", parametros=None, mensaje=None):
+        """
+        Registra como completado un trabajo cuyo resultado ya se conoce (p. ej. tomado de una caché)
+
+        Returns:
+            Trabajo: El trabajo creado, consultable como cualquier otro
+        """
+        trabajo = Trabajo(descripcion, parametros)
+        trabajo.iniciar()
+        trabajo.completar(resultado, mensaje)
+        with self._bloqueo:
+            self._trabajos[trabajo.id] = trabajo
+            self._depurar()
+        print(f"📤 Trabajo {trabajo.id} completado: {descripcion}")
+        return trabajo
+
+    def _ejecutar(self, trabajo, funcion, args, kwargs):
+        if trabajo.estado == 'cancelado':
+            return
+        trabajo.iniciar()
+        try:
+            trabajo.completar(funcion(trabajo, *args, **kwargs))
+        except Exception as e:
+            trabajo.fallar(f"Error durante el análisis: {e}")
+        print(f"📤 Trabajo {trabajo.id} {trabajo.estado}")
+
+    def obtener(self, id_trabajo):
+        """Trabajo con el identificador indicado (None si no existe)"""
+        with self._bloqueo:
+            return self._trabajos.get(id_trabajo)
+
+    def listar(self):
+        """Trabajos conocidos, del más antiguo al más reciente"""
+        with self._bloqueo:
+            return list(self._trabajos.values())
+
+    def ultimo(self, estado=None):
+        """Trabajo más reciente (opcionalmente solo entre los que tienen el estado indicado)"""
+        with self._bloqueo:
+            for trabajo in reversed(self._trabajos.values()):
+                if estado is None or trabajo.estado == estado:
+                    return trabajo
+        return None
+
+    def cancelar(self, id_trabajo):
+        """Cancela un trabajo que todavía está en cola; devuelve True si se canceló"""
+        trabajo = self.obtener(id_trabajo)
+        if trabajo is None or trabajo.estado != 'en_cola' or not trabajo.futuro.cancel():
+            return False
+        trabajo.cancelar()
+        return True
+
+    def _depurar(self):
+        """Olvida los trabajos terminados más antiguos más allá de max_historial"""
+        terminados = [id_trabajo for id_trabajo, trabajo in self._trabajos.items() if trabajo.terminado]
+        for id_trabajo in terminados[:max(0, len(terminados) - self.max_historial)]:
+            del self._trabajos[id_trabajo]
+
+    def cerrar(self, esperar=True):
+        """Detiene el grupo de hilos"""
+        self._ejecutor.shutdown(wait=esperar, cancel_futures=True)